@@ -0,0 +1,111 @@
+"""native json schedule settings
+
+Revision ID: 0e32dec17300
+Revises: dbd42e0db9a4
+Create Date: 2026-10-19 17:05:12.418730
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0e32dec17300'
+down_revision: Union[str, Sequence[str], None] = 'dbd42e0db9a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _load(value):
+    if value is None or isinstance(value, dict):
+        return value
+    try:
+        loaded = json.loads(value)
+    except (TypeError, ValueError):
+        return None
+    return loaded if isinstance(loaded, dict) else None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    from app.models.user import schedule_projection
+
+    bind = op.get_bind()
+    users = sa.table(
+        'users',
+        sa.column('id', sa.Integer()),
+        sa.column('content_templates', sa.Text()),
+        sa.column('schedule_settings', sa.Text()),
+    )
+
+    # Rows that aren't valid JSON objects can't be cast; clear them first
+    for row in bind.execute(sa.select(users.c.id, users.c.content_templates, users.c.schedule_settings)).fetchall():
+        values = {}
+        if row.content_templates is not None and _load(row.content_templates) is None:
+            values['content_templates'] = None
+        if row.schedule_settings is not None and _load(row.schedule_settings) is None:
+            values['schedule_settings'] = None
+        if values:
+            bind.execute(users.update().where(users.c.id == row.id).values(**values))
+
+    if bind.dialect.name == 'postgresql':
+        for column in ('content_templates', 'schedule_settings'):
+            op.alter_column(
+                'users', column,
+                type_=postgresql.JSONB(),
+                postgresql_using=f'{column}::jsonb',
+                existing_nullable=True
+            )
+    else:
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.alter_column('content_templates', type_=sa.JSON(), existing_nullable=True)
+            batch_op.alter_column('schedule_settings', type_=sa.JSON(), existing_nullable=True)
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('schedule_mode', sa.String(), nullable=True))
+        batch_op.add_column(sa.Column('schedule_utc_offset_minutes', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('schedule_daily_minute_utc', sa.Integer(), nullable=True))
+    op.create_index('ix_users_schedule_utc_offset_minutes', 'users', ['schedule_utc_offset_minutes'], unique=False)
+    op.create_index('ix_users_schedule_mode_daily_minute', 'users', ['schedule_mode', 'schedule_daily_minute_utc'], unique=False)
+
+    # Backfill the projections from the existing settings
+    projected = sa.table(
+        'users',
+        sa.column('id', sa.Integer()),
+        sa.column('schedule_settings', sa.Text()),
+        sa.column('schedule_mode', sa.String()),
+        sa.column('schedule_utc_offset_minutes', sa.Integer()),
+        sa.column('schedule_daily_minute_utc', sa.Integer()),
+    )
+    rows = bind.execute(sa.text('SELECT id, schedule_settings FROM users WHERE schedule_settings IS NOT NULL')).fetchall()
+    for row in rows:
+        bind.execute(
+            projected.update().where(projected.c.id == row.id).values(**schedule_projection(_load(row.schedule_settings)))
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_users_schedule_mode_daily_minute', table_name='users')
+    op.drop_index('ix_users_schedule_utc_offset_minutes', table_name='users')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('schedule_daily_minute_utc')
+        batch_op.drop_column('schedule_utc_offset_minutes')
+        batch_op.drop_column('schedule_mode')
+
+    if op.get_bind().dialect.name == 'postgresql':
+        for column in ('content_templates', 'schedule_settings'):
+            op.alter_column(
+                'users', column,
+                type_=sa.Text(),
+                postgresql_using=f'{column}::text',
+                existing_nullable=True
+            )
+    else:
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.alter_column('content_templates', type_=sa.Text(), existing_nullable=True)
+            batch_op.alter_column('schedule_settings', type_=sa.Text(), existing_nullable=True)
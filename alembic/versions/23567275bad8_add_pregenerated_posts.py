@@ -0,0 +1,42 @@
+"""add pregenerated posts
+
+Revision ID: 23567275bad8
+Revises: d806c4c89aa6
+Create Date: 2026-10-19 14:21:55.640281
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '23567275bad8'
+down_revision: Union[str, Sequence[str], None] = 'd806c4c89aa6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'pregenerated_posts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('scheduled_for', sa.DateTime(), nullable=False),
+        sa.Column('template_name', sa.String(), nullable=True),
+        sa.Column('request_key', sa.String(length=64), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_pregenerated_posts_user_slot', 'pregenerated_posts', ['user_id', 'scheduled_for'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_pregenerated_posts_user_slot', table_name='pregenerated_posts')
+    op.drop_table('pregenerated_posts')
@@ -0,0 +1,42 @@
+"""add token usage ledger
+
+Revision ID: 671df8f45b0a
+Revises: 23567275bad8
+Create Date: 2026-10-19 15:02:11.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '671df8f45b0a'
+down_revision: Union[str, Sequence[str], None] = '23567275bad8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'token_usage_ledger',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('feature', sa.String(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('requests', sa.Integer(), nullable=False),
+        sa.Column('prompt_tokens', sa.Integer(), nullable=False),
+        sa.Column('completion_tokens', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_token_usage_ledger_user_feature_day', 'token_usage_ledger', ['user_id', 'feature', 'day'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_token_usage_ledger_user_feature_day', table_name='token_usage_ledger')
+    op.drop_table('token_usage_ledger')
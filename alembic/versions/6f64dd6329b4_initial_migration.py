@@ -20,9 +20,56 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     """Upgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    pass
-    # ### end Alembic commands ###
+    # Tables used to come from init_db's create_all on first start. On a fresh
+    # PostgreSQL database later migrations add foreign keys to users, so the
+    # base tables must exist before them.
+    existing = sa.inspect(op.get_bind()).get_table_names()
+    if 'users' not in existing:
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('linkedin_id', sa.String(), nullable=True),
+            sa.Column('email', sa.String(), nullable=True),
+            sa.Column('name', sa.String(), nullable=True),
+            sa.Column('access_token', sa.String(), nullable=True),
+            sa.Column('linkedin_profile', sa.String(), nullable=True),
+            sa.Column('company', sa.String(), nullable=True),
+            sa.Column('industry', sa.String(), nullable=True),
+            sa.Column('auto_posting_notifications', sa.Boolean(), nullable=True),
+            sa.Column('general_notifications', sa.Boolean(), nullable=True),
+            sa.Column('weekly_email_reports', sa.Boolean(), nullable=True),
+            sa.Column('auto_posting', sa.Boolean(), nullable=True),
+            sa.Column('auto_commenting', sa.Boolean(), nullable=True),
+            sa.Column('post_frequency', sa.Integer(), nullable=True),
+            sa.Column('comment_frequency', sa.Integer(), nullable=True),
+            sa.Column('personality_type', sa.String(), nullable=True),
+            sa.Column('engagement_style', sa.String(), nullable=True),
+            sa.Column('industries', sa.String(), nullable=True),
+            sa.Column('avoid_topics', sa.String(), nullable=True),
+            sa.Column('content_templates', sa.Text(), nullable=True),
+            sa.Column('schedule_settings', sa.Text(), nullable=True),
+            sa.Column('subscription_active', sa.Boolean(), nullable=True),
+            sa.Column('subscription_plan', sa.String(), nullable=True),
+            sa.Column('subscription_expires', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_users_id', 'users', ['id'], unique=False)
+        op.create_index('ix_users_linkedin_id', 'users', ['linkedin_id'], unique=True)
+        op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    if 'subscriptions' not in existing:
+        op.create_table(
+            'subscriptions',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('plan', sa.String(), nullable=True),
+            sa.Column('status', sa.String(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_subscriptions_id', 'subscriptions', ['id'], unique=False)
 
 
 def downgrade() -> None:
@@ -0,0 +1,39 @@
+"""add profile network samples
+
+Revision ID: 8a9a5fb8e19b
+Revises: dcab7cdfb29f
+Create Date: 2026-10-19 11:26:03.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a9a5fb8e19b'
+down_revision: Union[str, Sequence[str], None] = 'dcab7cdfb29f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'profile_network_samples',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('sampled_at', sa.DateTime(), nullable=False),
+        sa.Column('followers', sa.Integer(), nullable=True),
+        sa.Column('connections', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_profile_network_samples_user_sampled', 'profile_network_samples', ['user_id', 'sampled_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_profile_network_samples_user_sampled', table_name='profile_network_samples')
+    op.drop_table('profile_network_samples')
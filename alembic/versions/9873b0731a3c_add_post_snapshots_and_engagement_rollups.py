@@ -0,0 +1,70 @@
+"""add post snapshots and engagement rollups
+
+Revision ID: 9873b0731a3c
+Revises: 9753460d12c2
+Create Date: 2026-10-19 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9873b0731a3c'
+down_revision: Union[str, Sequence[str], None] = '9753460d12c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'post_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('post_urn', sa.String(), nullable=False),
+        sa.Column('post_created_at', sa.DateTime(), nullable=True),
+        sa.Column('text', sa.String(), nullable=True),
+        sa.Column('likes', sa.Integer(), nullable=True),
+        sa.Column('comments', sa.Integer(), nullable=True),
+        sa.Column('shares', sa.Integer(), nullable=True),
+        sa.Column('impressions', sa.Integer(), nullable=True),
+        sa.Column('clicks', sa.Integer(), nullable=True),
+        sa.Column('captured_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'post_urn', name='uq_post_snapshots_user_post')
+    )
+    op.create_index(op.f('ix_post_snapshots_id'), 'post_snapshots', ['id'], unique=False)
+    op.create_index(op.f('ix_post_snapshots_user_id'), 'post_snapshots', ['user_id'], unique=False)
+
+    for table, bucket in (('engagement_rollups_daily', 'day'), ('engagement_rollups_weekly', 'week_start')):
+        op.create_table(
+            table,
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column(bucket, sa.Date(), nullable=False),
+            sa.Column('posts', sa.Integer(), nullable=True),
+            sa.Column('likes', sa.Integer(), nullable=True),
+            sa.Column('comments', sa.Integer(), nullable=True),
+            sa.Column('shares', sa.Integer(), nullable=True),
+            sa.Column('impressions', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+    op.create_index('ix_engagement_rollups_daily_user_day', 'engagement_rollups_daily', ['user_id', 'day'], unique=True)
+    op.create_index('ix_engagement_rollups_weekly_user_week', 'engagement_rollups_weekly', ['user_id', 'week_start'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_engagement_rollups_weekly_user_week', table_name='engagement_rollups_weekly')
+    op.drop_index('ix_engagement_rollups_daily_user_day', table_name='engagement_rollups_daily')
+    op.drop_table('engagement_rollups_weekly')
+    op.drop_table('engagement_rollups_daily')
+    op.drop_index(op.f('ix_post_snapshots_user_id'), table_name='post_snapshots')
+    op.drop_index(op.f('ix_post_snapshots_id'), table_name='post_snapshots')
+    op.drop_table('post_snapshots')
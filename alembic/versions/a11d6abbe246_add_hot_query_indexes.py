@@ -0,0 +1,51 @@
+"""add hot query indexes
+
+Revision ID: a11d6abbe246
+Revises: 0e32dec17300
+Create Date: 2026-10-19 17:48:03.551296
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a11d6abbe246'
+down_revision: Union[str, Sequence[str], None] = '0e32dec17300'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_email_index() -> bool:
+    inspector = sa.inspect(op.get_bind())
+    indexes = inspector.get_indexes('users') + [
+        {"column_names": constraint['column_names']} for constraint in inspector.get_unique_constraints('users')
+    ]
+    return any(index['column_names'] == ['email'] for index in indexes)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The partial index below covers the same scan for the only rows it touches
+    op.drop_index('ix_users_schedule_mode_daily_minute', table_name='users')
+    op.create_index(
+        'ix_users_auto_posting_schedule',
+        'users',
+        ['schedule_mode', 'schedule_daily_minute_utc'],
+        unique=False,
+        sqlite_where=sa.text('auto_posting = 1'),
+        postgresql_where=sa.text('auto_posting')
+    )
+    op.create_index('ix_subscriptions_user_status', 'subscriptions', ['user_id', 'status'], unique=False)
+    # Databases created before the initial migration may lack the email index
+    if not _has_email_index():
+        op.create_index('ix_users_email', 'users', ['email'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_subscriptions_user_status', table_name='subscriptions')
+    op.drop_index('ix_users_auto_posting_schedule', table_name='users')
+    op.create_index('ix_users_schedule_mode_daily_minute', 'users', ['schedule_mode', 'schedule_daily_minute_utc'], unique=False)
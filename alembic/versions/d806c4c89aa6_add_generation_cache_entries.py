@@ -0,0 +1,38 @@
+"""add generation cache entries
+
+Revision ID: d806c4c89aa6
+Revises: 8a9a5fb8e19b
+Create Date: 2026-10-19 13:02:48.117630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd806c4c89aa6'
+down_revision: Union[str, Sequence[str], None] = '8a9a5fb8e19b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'generation_cache_entries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('prompt_version', sa.String(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_generation_cache_entries_key_created', 'generation_cache_entries', ['cache_key', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_generation_cache_entries_key_created', table_name='generation_cache_entries')
+    op.drop_table('generation_cache_entries')
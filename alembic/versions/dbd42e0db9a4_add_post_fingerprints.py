@@ -0,0 +1,39 @@
+"""add post fingerprints
+
+Revision ID: dbd42e0db9a4
+Revises: 671df8f45b0a
+Create Date: 2026-10-19 15:40:37.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dbd42e0db9a4'
+down_revision: Union[str, Sequence[str], None] = '671df8f45b0a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'post_fingerprints',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('simhash', sa.BigInteger(), nullable=False),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_post_fingerprints_user_created', 'post_fingerprints', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_post_fingerprints_user_created', table_name='post_fingerprints')
+    op.drop_table('post_fingerprints')
@@ -0,0 +1,40 @@
+"""add smart schedule slots
+
+Revision ID: dcab7cdfb29f
+Revises: 9873b0731a3c
+Create Date: 2026-10-19 10:04:17.552930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dcab7cdfb29f'
+down_revision: Union[str, Sequence[str], None] = '9873b0731a3c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'smart_schedule_slots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('timezone', sa.String(), nullable=False),
+        sa.Column('histogram', sa.Text(), nullable=True),
+        sa.Column('slots', sa.Text(), nullable=True),
+        sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_smart_schedule_slots_user_id'), 'smart_schedule_slots', ['user_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_smart_schedule_slots_user_id'), table_name='smart_schedule_slots')
+    op.drop_table('smart_schedule_slots')
@@ -0,0 +1,53 @@
+"""add posts history
+
+Revision ID: fc6cdfefd6ea
+Revises: a11d6abbe246
+Create Date: 2026-10-19 18:32:44.170385
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fc6cdfefd6ea'
+down_revision: Union[str, Sequence[str], None] = 'a11d6abbe246'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'posts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('template', sa.String(), nullable=True),
+        sa.Column('prompt_version', sa.String(), nullable=True),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('linkedin_post_id', sa.String(), nullable=True),
+        sa.Column('api_path', sa.String(), nullable=True),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('generation_ms', sa.Integer(), nullable=True),
+        sa.Column('publish_ms', sa.Integer(), nullable=True),
+        sa.Column('published_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_posts_user_created', 'posts', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_posts_user_content_hash', 'posts', ['user_id', 'content_hash'], unique=False)
+    op.create_index('ix_posts_linkedin_post_id', 'posts', ['linkedin_post_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_posts_linkedin_post_id', table_name='posts')
+    op.drop_index('ix_posts_user_content_hash', table_name='posts')
+    op.drop_index('ix_posts_user_created', table_name='posts')
+    op.drop_table('posts')
@@ -0,0 +1,128 @@
+import logging
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+Row = Tuple[Hashable, Any]
+
+class BatchedWriter:
+    """
+    In-memory write buffer flushed to the DB in batches, for rows recorded on
+    request/publish paths that must never wait on a write.
+
+    - Crossing flush_threshold wakes one background flusher thread per buffer;
+      the scheduler also calls flush() periodically and on shutdown.
+    - A batch that fails is retried one row per transaction, so one bad row
+      can't hold back the others. Rows failing with IntegrityError (e.g. a user
+      that no longer exists) can never succeed and are dropped; other failures
+      are requeued ahead of newer rows, keeping at most max_pending.
+
+    Subclasses implement _write(db, rows) and, for keyed buffers that accumulate,
+    _merge(current, value). Subclass state read together with _pending is guarded
+    by the same _lock.
+    """
+
+    name = "buffer"
+
+    def __init__(self, flush_threshold: int, max_pending: int):
+        self.flush_threshold = flush_threshold
+        self.max_pending = max_pending
+        # Insertion-ordered, oldest first
+        self._pending: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    def _write(self, db: Session, rows: List[Row]):
+        raise NotImplementedError
+
+    def _merge(self, current: Any, value: Any) -> Any:
+        """Combine a value with the one already pending under the same key (default: replace)"""
+        return value
+
+    def _put(self, key: Hashable, value: Any):
+        """Add or merge one row; call with _lock held"""
+        if key in self._pending:
+            self._pending[key] = self._merge(self._pending[key], value)
+        else:
+            self._pending[key] = value
+
+    def _request_flush_if_full(self):
+        """Call after adding rows, without _lock held"""
+        with self._lock:
+            if len(self._pending) < self.flush_threshold:
+                return
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"{self.name}-flusher", daemon=True)
+                self._thread.start()
+        self._flush_requested.set()
+
+    def _run(self):
+        while True:
+            self._flush_requested.wait()
+            self._flush_requested.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing {self.name}: {str(e)}")
+
+    def _requeue(self, rows: List[Row]):
+        """Put unwritten rows back ahead of newer ones, keeping at most max_pending"""
+        with self._lock:
+            newer, self._pending = self._pending, {}
+            for key, value in rows:
+                self._put(key, value)
+            for key, value in newer.items():
+                self._put(key, value)
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                for key in list(self._pending)[:overflow]:
+                    del self._pending[key]
+                self.dropped += overflow
+                logger.error(f"{self.name} backlog full, dropped {overflow} pending rows")
+
+    def flush(self) -> int:
+        """Write pending rows, in one transaction when every row is valid. Returns rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = list(self._pending.items()), {}
+            if not batch:
+                return 0
+
+            db = SessionLocal()
+            try:
+                try:
+                    self._write(db, batch)
+                    db.commit()
+                    return len(batch)
+                except Exception as e:
+                    db.rollback()
+                    logger.warning(f"Batched {self.name} flush failed, retrying row by row: {str(e)}")
+
+                written = 0
+                failed: List[Row] = []
+                for row in batch:
+                    try:
+                        self._write(db, [row])
+                        db.commit()
+                        written += 1
+                    except IntegrityError as e:
+                        db.rollback()
+                        with self._lock:
+                            self.dropped += 1
+                        logger.error(f"Dropping {self.name} row {row[0]}: {str(e)}")
+                    except Exception as e:
+                        db.rollback()
+                        logger.error(f"Error flushing {self.name} row {row[0]}: {str(e)}")
+                        failed.append(row)
+                if failed:
+                    self._requeue(failed)
+                return written
+            finally:
+                db.close()
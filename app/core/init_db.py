@@ -1,6 +1,10 @@
 from app.models.database import Base, engine
 from app.models.user import User
 from app.models.subscription import Subscription
+from app.models.analytics import PostSnapshot, DailyEngagementRollup, WeeklyEngagementRollup, SmartScheduleSlots, ProfileNetworkSample
+from app.models.generation import GenerationCacheEntry, PregeneratedPost, PostFingerprint
+from app.models.usage import TokenUsageLedger
+from app.models.post import Post
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
@@ -0,0 +1,52 @@
+from typing import Dict, List
+from sqlalchemy import or_, select, text
+from sqlalchemy.orm import Session
+from app.models.subscription import Subscription
+from app.models.user import User
+
+def hot_queries() -> Dict[str, tuple]:
+    """The per-request/per-minute query shapes and the index each one should use"""
+    return {
+        "scheduler_scan": (
+            select(User.id).where(
+                User.auto_posting == True,
+                User.schedule_mode.isnot(None),
+                or_(User.schedule_mode != "daily", User.schedule_daily_minute_utc == 0)
+            ),
+            "ix_users_auto_posting_schedule"
+        ),
+        "require_subscription": (
+            select(Subscription.id).where(Subscription.user_id == 0, Subscription.status == "active").limit(1),
+            "ix_subscriptions_user_status"
+        ),
+        "billing_email_lookup": (
+            select(User.id).where(User.email == "someone@example.com"),
+            "ix_users_email"
+        ),
+    }
+
+def explain(db: Session, statement) -> List[str]:
+    dialect = db.get_bind().dialect
+    compiled = statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+    prefix = "EXPLAIN QUERY PLAN " if dialect.name == "sqlite" else "EXPLAIN "
+    rows = db.execute(text(prefix + str(compiled))).fetchall()
+    # SQLite: (id, parent, notused, detail); PostgreSQL: one text column per plan line
+    return [str(row[-1]) for row in rows]
+
+def check_query_plans(db: Session) -> Dict:
+    """EXPLAIN every hot query and report whether it uses its expected index"""
+    results = {}
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            # On small tables a seq scan is cheapest; this asks whether the index is usable at all
+            db.execute(text("SET LOCAL enable_seqscan = off"))
+        for name, (statement, index_name) in hot_queries().items():
+            plan = explain(db, statement)
+            results[name] = {
+                "expected_index": index_name,
+                "uses_index": any(index_name in line for line in plan),
+                "plan": plan
+            }
+    finally:
+        db.rollback()
+    return {"ok": all(result["uses_index"] for result in results.values()), "queries": results}
@@ -1,13 +1,14 @@
 import logging
 import asyncio
+import time
 from datetime import datetime, timezone
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from fastapi import FastAPI
 from sqlalchemy.orm import Session
-from app.models.database import SessionLocal
+from app.models.database import SessionLocal, AsyncSessionLocal
+from app.models.user import utc_offset
 from app.services.auto_posting_service import run_auto_posting
-import json
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,27 +21,42 @@ def start_scheduler(app: FastAPI):
     
     async def check_and_post():
         """Check all users and post if it's their scheduled time"""
-        db: Session = SessionLocal()
         try:
             logger.info("🔄 Checking scheduled posts...")
             
+            from sqlalchemy import select, or_
             from app.models.user import User
+            from app.services.smart_schedule_service import aload_smart_slots
             
-            # Only get users who have auto_posting enabled
-            active_users = db.query(User).filter(User.auto_posting == True).all()
-            
-            if not active_users:
-                logger.info("📝 No users with active auto-posting found")
-                return
-            
-            logger.info(f"👥 Found {len(active_users)} users with auto-posting enabled")
+            # The scan runs on the async engine so DB waits don't block the event loop
+            async with AsyncSessionLocal() as db:
+                # Only users with auto_posting enabled; daily-mode users only on their minute
+                now = datetime.now(timezone.utc)
+                result = await db.execute(select(User).where(
+                    User.auto_posting == True,
+                    User.schedule_mode.isnot(None),
+                    or_(
+                        User.schedule_mode != "daily",
+                        User.schedule_daily_minute_utc == now.hour * 60 + now.minute
+                    )
+                ))
+                active_users = result.scalars().all()
+                
+                if not active_users:
+                    logger.info("📝 No users due for auto-posting found")
+                    return
+                
+                logger.info(f"👥 Found {len(active_users)} users with auto-posting enabled and a matching schedule")
+                
+                # Precomputed smart-mode slots for all active users, loaded in one query
+                smart_slots = await aload_smart_slots(db, [user.id for user in active_users])
             
             # Check each user's schedule
             for user in active_users:
                 try:
-                    if should_user_post_now(user):
+                    if should_user_post_now(user, smart_slots.get(user.id)):
                         logger.info(f"⏰ Time to post for user {user.id}")
-                        await asyncio.get_event_loop().run_in_executor(None, post_for_user, db, user)
+                        await asyncio.get_event_loop().run_in_executor(None, post_for_user_in_new_session, user.id)
                     else:
                         logger.debug(f"⏸️ Not time to post for user {user.id}")
                 except Exception as e:
@@ -50,6 +66,53 @@ def start_scheduler(app: FastAPI):
             logger.error(f"❌ Error in scheduled check: {str(e)}")
             import traceback
             logger.error(traceback.format_exc())
+
+    def refresh_smart_slots():
+        """Precompute smart-mode posting slots from stored post snapshots"""
+        from app.services.smart_schedule_service import refresh_smart_schedules
+        db: Session = SessionLocal()
+        try:
+            refresh_smart_schedules(db)
+        except Exception as e:
+            logger.error(f"❌ Error refreshing smart schedules: {str(e)}")
+        finally:
+            db.close()
+
+    def sample_network_growth():
+        """Append follower/connection samples for growth charts"""
+        from app.services.network_growth_service import sample_network_sizes
+        db: Session = SessionLocal()
+        try:
+            sample_network_sizes(db)
+        except Exception as e:
+            logger.error(f"❌ Error sampling network growth: {str(e)}")
+        finally:
+            db.close()
+
+    def flush_usage_ledger():
+        """Write buffered token usage to the ledger table"""
+        from app.services.usage_ledger import usage_ledger
+        try:
+            usage_ledger.flush()
+        except Exception as e:
+            logger.error(f"❌ Error flushing usage ledger: {str(e)}")
+
+    def flush_post_history():
+        """Write buffered publish attempts to the posts table"""
+        from app.services.post_history import post_history
+        try:
+            post_history.flush()
+        except Exception as e:
+            logger.error(f"❌ Error flushing post history: {str(e)}")
+
+    def pregenerate_posts():
+        """Generate drafts for upcoming slots ahead of time at low priority"""
+        from app.services.pregeneration_service import run_pregeneration
+        db: Session = SessionLocal()
+        try:
+            run_pregeneration(db)
+        except Exception as e:
+            logger.error(f"❌ Error pre-generating posts: {str(e)}")
         finally:
             db.close()
 
@@ -62,22 +125,67 @@ def start_scheduler(app: FastAPI):
         max_instances=1
     )
     
+    # Nightly smart-schedule precomputation (off the posting tick)
+    scheduler.add_job(
+        refresh_smart_slots,
+        CronTrigger(hour=2, minute=30),
+        id="refresh_smart_slots",
+        replace_existing=True,
+        max_instances=1
+    )
+    
+    # Hourly batch pre-generation of drafts for the upcoming window
+    scheduler.add_job(
+        pregenerate_posts,
+        CronTrigger(minute=5),
+        id="pregenerate_posts",
+        replace_existing=True,
+        max_instances=1
+    )
+    
+    # Batched token usage writes
+    scheduler.add_job(
+        flush_usage_ledger,
+        CronTrigger(minute="*"),
+        id="flush_usage_ledger",
+        replace_existing=True,
+        max_instances=1
+    )
+    
+    # Batched post history writes
+    scheduler.add_job(
+        flush_post_history,
+        CronTrigger(minute="*"),
+        id="flush_post_history",
+        replace_existing=True,
+        max_instances=1
+    )
+    
+    # Low-frequency follower/connection sampling
+    scheduler.add_job(
+        sample_network_growth,
+        CronTrigger(hour="*/6", minute=15),
+        id="sample_network_growth",
+        replace_existing=True,
+        max_instances=1
+    )
+    
     scheduler.start()
     logger.info("🚀 Scheduler started - checking for scheduled posts every minute")
 
-def should_user_post_now(user) -> bool:
+def should_user_post_now(user, smart_slots=None) -> bool:
     """Check if this specific user should post right now"""
     try:
         if not user.schedule_settings:
             logger.debug(f"User {user.id} has no schedule settings")
             return False
             
-        schedule = json.loads(user.schedule_settings)
+        schedule = user.schedule_settings
         current_time = datetime.now(timezone.utc)
         
-        # Get user's timezone offset
+        # Get user's timezone offset (same value the SQL pre-filter used)
         user_timezone = schedule.get('timezone', 'UTC+0')
-        timezone_offset = parse_timezone_offset(user_timezone)
+        timezone_offset = utc_offset(user)
         
         # Convert current UTC time to user's timezone
         user_current_time = current_time.replace(tzinfo=timezone.utc) + timezone_offset
@@ -120,6 +228,14 @@ def should_user_post_now(user) -> bool:
                         logger.debug(f"❌ Time mismatch: scheduled={scheduled_time}, current={current_hour_minute}")
             else:
                 logger.info(f"❌ No schedule for today ({current_date})")
+        
+        elif schedule.get('mode') == 'smart':
+            # Slots are precomputed nightly; no analysis happens on the tick
+            current_hour_minute = user_current_time.strftime('%H:%M')
+            if smart_slots and current_hour_minute in smart_slots:
+                logger.info(f"✅ Smart post time match for user {user.id}: {current_hour_minute}")
+                return True
+            logger.debug(f"❌ Smart slot mismatch for user {user.id}: slots={smart_slots}, current={current_hour_minute}")
             
     except Exception as e:
         logger.error(f"Error checking schedule for user {user.id}: {str(e)}")
@@ -129,33 +245,32 @@ def should_user_post_now(user) -> bool:
     
     return False
 
-def parse_timezone_offset(timezone_str):
-    """Parse timezone string like 'UTC+2' into timedelta"""
-    from datetime import timedelta
-    
-    if timezone_str == 'UTC+0' or timezone_str == 'UTC':
-        return timedelta(0)
-    
-    if timezone_str.startswith('UTC+'):
-        hours = int(timezone_str[4:])
-        return timedelta(hours=hours)
-    elif timezone_str.startswith('UTC-'):
-        hours = int(timezone_str[4:])
-        return timedelta(hours=-hours)
-    else:
-        logger.warning(f"Unknown timezone format: {timezone_str}, defaulting to UTC")
-        return timedelta(0)
+def post_for_user_in_new_session(user_id: int):
+    """Executor entry point: the posting pipeline is sync, so it gets its own sync session"""
+    from app.models.user import User
+    db: Session = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            return False
+        return post_for_user(db, user)
+    finally:
+        db.close()
 
 def post_for_user(db: Session, user):
     """Post content for a specific user"""
     try:
         from app.services.auto_posting_service import (
-            get_content_template_settings, 
-            get_valid_tone, 
-            generate_linkedin_post
+            build_post_request_for_user,
+            generate_linkedin_post,
+            ensure_publishable_draft
         )
-        from app.services.linkedin_service import post_linkedin_content
-        from app.schemas.post_generator import PostGenerateRequest
+        from app.services.near_duplicate_service import fingerprint_index
+        from app.services.linkedin_service import publish_linkedin_content
+        from app.services.pregeneration_service import take_pregenerated_post
+        from app.services.prompt_templates import persona_fragment, PROMPT_VERSION
+        from app.services.post_history import post_history
+        from app.services.usage_ledger import usage_ledger, QuotaExceededError
         
         logger.info(f"🎯 Generating post for user {user.id}")
         
@@ -164,32 +279,30 @@ def post_for_user(db: Session, user):
             logger.warning(f"User {user.id} has no access token")
             return False
         
-        # Get content template settings
-        content_templates = get_content_template_settings(user)
-        if not content_templates:
+        # Build the generation request from the user's content template
+        template_name, post_request = build_post_request_for_user(user)
+        if not post_request:
             logger.warning(f"User {user.id} has no content templates")
             return False
         
-        # Pick the first available template (you can make this smarter)
-        template_name = next(iter(content_templates.keys()), "story")
-        template = content_templates[template_name]
-        
-        # Create post request from template with valid tone
-        raw_tone = template.get("tone", user.personality_type or "professional")
-        valid_tone = get_valid_tone(raw_tone)
+        persona = persona_fragment(user)
         
-        post_request = PostGenerateRequest(
-            topic=template.get("topic", "Professional Growth"),
-            industry=template.get("industry", user.industry or "General"),
-            tone=valid_tone,
-            post_type=template.get("post_type", "story"),
-            post_length=template.get("post_length", 150),
-            include_hashtags=template.get("include_hashtags", True),
-            include_emojis=template.get("include_emojis", True)
-        )
+        # Prefer a draft prepared off-peak by the pre-generation job
+        started = time.monotonic()
+        content = take_pregenerated_post(db, user.id, datetime.now(timezone.utc))
+        if content:
+            logger.info(f"📦 Using pre-generated draft for user {user.id}")
+        else:
+            try:
+                usage_ledger.check_quota(user)
+            except QuotaExceededError as e:
+                logger.warning(f"💸 Skipping post for user {user.id}: {e.detail}")
+                return False
+            content = generate_linkedin_post(post_request, user_id=user.id, persona=persona)
         
-        # Generate the content
-        content = generate_linkedin_post(post_request)
+        # Reject drafts on avoided topics, and near-repeats (single-template users otherwise post the same thing daily)
+        if content:
+            content = ensure_publishable_draft(db, user, post_request, content, persona)
         if not content:
             logger.warning(f"Failed to generate post content for user {user.id}")
             return False
@@ -197,9 +310,19 @@ def post_for_user(db: Session, user):
         logger.info(f"📝 Generated content for user {user.id}: {content[:100]}...")
         
         # Post to LinkedIn
-        success = post_linkedin_content(user.access_token, content)
+        generated = time.monotonic()
+        result = publish_linkedin_content(user.access_token, content)
+        post_history.record(
+            user.id, content, result,
+            template=template_name,
+            prompt_version=PROMPT_VERSION,
+            generation_ms=int((generated - started) * 1000),
+            publish_ms=int((time.monotonic() - generated) * 1000)
+        )
+        success = result["success"]
         if success:
             logger.info(f"✅ Successfully posted to LinkedIn for user {user.id}")
+            fingerprint_index.add(db, user.id, content)
             
             # Mark this time slot as used (optional - to prevent duplicate posts)
             # You could add logic here to remove this time slot or mark it as used
@@ -220,6 +343,12 @@ def shutdown_scheduler():
     try:
         scheduler.shutdown(wait=True)
         logger.info("🛑 Scheduler stopped successfully")
+        
+        # Don't lose usage and post history recorded since the last periodic flush
+        from app.services.usage_ledger import usage_ledger
+        from app.services.post_history import post_history
+        usage_ledger.flush()
+        post_history.flush()
     except Exception as e:
         logger.error(f"Error stopping scheduler: {str(e)}")
 
@@ -0,0 +1,138 @@
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+from sqlalchemy.orm import Session
+from app.models.database import SessionLocal, IS_SQLITE
+
+logger = logging.getLogger(__name__)
+
+# Off by default; mainly useful on SQLite, where only one writer can hold the lock
+WRITE_QUEUE_ENABLED = os.getenv("WRITE_QUEUE_ENABLED", "false").lower() == "true"
+WRITE_QUEUE_MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "50"))
+# How long the writer waits for more work before committing a partial batch
+WRITE_QUEUE_BATCH_WAIT_SECONDS = float(os.getenv("WRITE_QUEUE_BATCH_WAIT_MS", "10")) / 1000
+WRITE_QUEUE_RESULT_TIMEOUT_SECONDS = float(os.getenv("WRITE_QUEUE_RESULT_TIMEOUT_SECONDS", "30"))
+
+WriteFn = Callable[[Session], Any]
+
+class WriteQueue:
+    """
+    Single writer thread that runs small write functions in shared transactions,
+    so a burst of writes takes the SQLite write lock once. If any write in a
+    batch fails, the batch is rolled back and each write is retried alone.
+    """
+
+    def __init__(self, max_batch: int = WRITE_QUEUE_MAX_BATCH, batch_wait: float = WRITE_QUEUE_BATCH_WAIT_SECONDS):
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # Committed transactions and the writes in them; failed counts writes whose caller got an error
+        self.batches = 0
+        self.writes = 0
+        self.failed = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 10):
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def submit(self, fn: WriteFn) -> Future:
+        self.start()
+        future: Future = Future()
+        self._queue.put((fn, future))
+        return future
+
+    def _next_batch(self) -> Optional[list]:
+        item = self._queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=self.batch_wait)
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._execute(batch)
+
+    def _execute(self, batch: list):
+        db = SessionLocal()
+        try:
+            results = [(future, fn(db)) for fn, future in batch]
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            results = None
+            if len(batch) == 1:
+                self.failed += 1
+                batch[0][1].set_exception(e)
+            else:
+                logger.warning(f"Write batch of {len(batch)} failed, retrying individually: {str(e)}")
+        finally:
+            db.close()
+
+        if results is None:
+            if len(batch) > 1:
+                # Something in the batch failed: retry each write on its own so one
+                # bad write doesn't fail the others
+                for item in batch:
+                    self._execute([item])
+            return
+
+        self.batches += 1
+        self.writes += len(batch)
+        for future, result in results:
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": WRITE_QUEUE_ENABLED,
+            "sqlite": IS_SQLITE,
+            "pending": self._queue.qsize(),
+            "batches": self.batches,
+            "writes": self.writes,
+            "failed": self.failed
+        }
+
+write_queue = WriteQueue()
+
+def run_write(db: Session, fn: WriteFn) -> Any:
+    """
+    Run fn(session) and commit. With the queue enabled the write goes through the
+    writer thread, so fn should return plain values and callers should refresh
+    objects they read back through db; otherwise it runs on db itself.
+    """
+    if WRITE_QUEUE_ENABLED:
+        return write_queue.submit(fn).result(timeout=WRITE_QUEUE_RESULT_TIMEOUT_SECONDS)
+    try:
+        result = fn(db)
+        db.commit()
+        return result
+    except Exception:
+        db.rollback()
+        raise
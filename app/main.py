@@ -1,4 +1,4 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI()
@@ -156,6 +156,13 @@ async def on_shutdown():
         print("✅ Scheduler stopped")
     except Exception as e:
         print(f"❌ Scheduler stop failed: {e}")
+    
+    try:
+        from app.core.write_queue import write_queue
+        write_queue.stop()
+        print("✅ Write queue drained")
+    except Exception as e:
+        print(f"❌ Write queue stop failed: {e}")
 
 # --- debug & health endpoints ---
 
@@ -174,6 +181,45 @@ async def debug_routes():
         "routes": sorted(routes, key=lambda x: x['path'])
     }
 
+# Operational endpoints below expose process internals; ADMIN_EMAILS only
+from app.routes.profile import require_admin
+
+@app.get("/debug/llm", dependencies=[Depends(require_admin)])
+async def debug_llm():
+    from app.services.llm_gateway import gateway
+    from app.services.generation_cache import generation_cache
+    from app.services.usage_ledger import usage_ledger
+    from app.services.near_duplicate_service import fingerprint_index
+    return {
+        **gateway.stats(),
+        "generation_cache": generation_cache.stats(),
+        "usage_ledger": usage_ledger.stats(),
+        "fingerprints": fingerprint_index.stats()
+    }
+
+@app.get("/debug/db", dependencies=[Depends(require_admin)])
+async def debug_db():
+    from app.models.database import pool_stats
+    from app.core.write_queue import write_queue
+    from app.services.auth_cache import auth_cache
+    from app.services.post_history import post_history
+    return {
+        **pool_stats(),
+        "write_queue": write_queue.stats(),
+        "auth_cache": auth_cache.stats(),
+        "post_history": post_history.stats()
+    }
+
+@app.get("/debug/query-plans", dependencies=[Depends(require_admin)])
+def debug_query_plans():
+    from app.models.database import SessionLocal
+    from app.core.query_plans import check_query_plans
+    db = SessionLocal()
+    try:
+        return check_query_plans(db)
+    finally:
+        db.close()
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "message": "PostStudio Pro Backend is running"}
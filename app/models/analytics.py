@@ -0,0 +1,83 @@
+# app/models/analytics.py
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.sql import func
+from app.models.database import Base
+
+class PostSnapshot(Base):
+    """Latest known statistics for a single LinkedIn post"""
+    __tablename__ = "post_snapshots"
+    __table_args__ = (
+        UniqueConstraint("user_id", "post_urn", name="uq_post_snapshots_user_post"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    post_urn = Column(String, nullable=False)
+    post_created_at = Column(DateTime, nullable=True)
+    text = Column(String, nullable=True)
+
+    likes = Column(Integer, default=0)
+    comments = Column(Integer, default=0)
+    shares = Column(Integer, default=0)
+    impressions = Column(Integer, default=0)
+    clicks = Column(Integer, default=0)
+
+    captured_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class DailyEngagementRollup(Base):
+    """Per-user engagement totals for posts created on a given UTC day"""
+    __tablename__ = "engagement_rollups_daily"
+    __table_args__ = (
+        Index("ix_engagement_rollups_daily_user_day", "user_id", "day", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    day = Column(Date, nullable=False)
+
+    posts = Column(Integer, default=0)
+    likes = Column(Integer, default=0)
+    comments = Column(Integer, default=0)
+    shares = Column(Integer, default=0)
+    impressions = Column(Integer, default=0)
+
+class WeeklyEngagementRollup(Base):
+    """Per-user engagement totals for posts created in a given ISO week (Monday start)"""
+    __tablename__ = "engagement_rollups_weekly"
+    __table_args__ = (
+        Index("ix_engagement_rollups_weekly_user_week", "user_id", "week_start", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    week_start = Column(Date, nullable=False)
+
+    posts = Column(Integer, default=0)
+    likes = Column(Integer, default=0)
+    comments = Column(Integer, default=0)
+    shares = Column(Integer, default=0)
+    impressions = Column(Integer, default=0)
+
+class SmartScheduleSlots(Base):
+    """Precomputed engagement-by-hour histogram and posting slots for smart scheduling"""
+    __tablename__ = "smart_schedule_slots"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, unique=True, index=True)
+    timezone = Column(String, nullable=False, default="UTC+0")
+    histogram = Column(Text, nullable=True)  # JSON list of 24 avg-engagement values, user local hours
+    slots = Column(Text, nullable=True)      # JSON list of "HH:MM" in user local time
+    computed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class ProfileNetworkSample(Base):
+    """Follower/connection counts, appended only when they change"""
+    __tablename__ = "profile_network_samples"
+    __table_args__ = (
+        Index("ix_profile_network_samples_user_sampled", "user_id", "sampled_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    sampled_at = Column(DateTime, nullable=False)
+    followers = Column(Integer, default=0)
+    connections = Column(Integer, default=0)
@@ -0,0 +1,46 @@
+# app/models/generation.py
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.models.database import Base
+
+class GenerationCacheEntry(Base):
+    """One cached completion variant for a normalized generation request"""
+    __tablename__ = "generation_cache_entries"
+    __table_args__ = (
+        Index("ix_generation_cache_entries_key_created", "cache_key", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    cache_key = Column(String(64), nullable=False)
+    prompt_version = Column(String, nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PregeneratedPost(Base):
+    """A draft generated ahead of a user's scheduled slot, ready to publish"""
+    __tablename__ = "pregenerated_posts"
+    __table_args__ = (
+        Index("ix_pregenerated_posts_user_slot", "user_id", "scheduled_for"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    scheduled_for = Column(DateTime, nullable=False)  # UTC
+    template_name = Column(String, nullable=True)
+    request_key = Column(String(64), nullable=False)
+    content = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="ready")  # ready | used | expired
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PostFingerprint(Base):
+    """64-bit SimHash of a post a user has published, for near-duplicate checks"""
+    __tablename__ = "post_fingerprints"
+    __table_args__ = (
+        Index("ix_post_fingerprints_user_created", "user_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    simhash = Column(BigInteger, nullable=False)  # stored signed; see near_duplicate_service
+    source = Column(String, nullable=False, default="scheduled")  # scheduled | manual
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,32 @@
+# app/models/post.py
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.models.database import Base
+
+class Post(Base):
+    """A post the app published (or tried to publish) to LinkedIn"""
+    __tablename__ = "posts"
+    __table_args__ = (
+        Index("ix_posts_user_created", "user_id", "created_at"),
+        Index("ix_posts_user_content_hash", "user_id", "content_hash"),
+        Index("ix_posts_linkedin_post_id", "linkedin_post_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    source = Column(String, nullable=False, default="scheduled")  # scheduled | manual | test
+    template = Column(String, nullable=True)
+    prompt_version = Column(String, nullable=True)
+    content_hash = Column(String(64), nullable=False)  # sha256 of the published text
+    content = Column(Text, nullable=False)
+
+    status = Column(String, nullable=False)  # published | failed
+    linkedin_post_id = Column(String, nullable=True)  # URN returned by LinkedIn
+    api_path = Column(String, nullable=True)  # rest/posts | v2/ugcPosts
+    error = Column(String, nullable=True)
+
+    # Timing of the publish pipeline
+    generation_ms = Column(Integer, nullable=True)
+    publish_ms = Column(Integer, nullable=True)
+    published_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.models.database import Base
 from datetime import datetime
@@ -11,4 +11,9 @@ class Subscription(Base):
     status = Column(String, default="active")
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+
+    __table_args__ = (
+        # require_subscription: user_id = ? AND status = 'active'
+        Index("ix_subscriptions_user_status", "user_id", "status"),
+    )
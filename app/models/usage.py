@@ -0,0 +1,20 @@
+# app/models/usage.py
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.models.database import Base
+
+class TokenUsageLedger(Base):
+    """LLM token usage per user, feature and UTC day"""
+    __tablename__ = "token_usage_ledger"
+    __table_args__ = (
+        Index("ix_token_usage_ledger_user_feature_day", "user_id", "feature", "day", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    feature = Column(String, nullable=False)
+    day = Column(Date, nullable=False)
+    requests = Column(Integer, nullable=False, default=0)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,8 +1,17 @@
 # app/models/user.py
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
+import re
+from datetime import timedelta
+from typing import Dict, Optional
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, Index, event, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from app.models.database import Base
 
+# JSONB on PostgreSQL, JSON (stored as text) elsewhere
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+TIMEZONE_RE = re.compile(r"^UTC(?:([+-])(\d{1,2})(?::?(\d{2}))?)?$")
+
 class User(Base):
     __tablename__ = "users"
     
@@ -32,8 +41,15 @@ class User(Base):
     avoid_topics = Column(String, nullable=True)
 
     # === Content & schedule settings ===
-    content_templates = Column(Text, nullable=True)
-    schedule_settings = Column(Text, nullable=True)
+    content_templates = Column(JSONType, nullable=True)
+    schedule_settings = Column(JSONType, nullable=True)
+
+    # Projections of schedule_settings kept in sync on write, so the scheduler
+    # can filter in SQL. Bulk query.update() callers must set them too (see schedule_projection)
+    schedule_mode = Column(String, nullable=True)
+    schedule_utc_offset_minutes = Column(Integer, nullable=True, index=True)
+    # Daily mode only: dailyTime converted to minutes after UTC midnight
+    schedule_daily_minute_utc = Column(Integer, nullable=True)
     
     # === Subscription fields ===
     subscription_active  = Column(Boolean, default=False)
@@ -42,3 +58,55 @@ class User(Base):
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # Per-minute scheduler scan: only users with auto-posting on are indexed
+        Index(
+            "ix_users_auto_posting_schedule",
+            "schedule_mode",
+            "schedule_daily_minute_utc",
+            sqlite_where=text("auto_posting = 1"),
+            postgresql_where=text("auto_posting")
+        ),
+    )
+
+def timezone_offset_minutes(timezone_str: Optional[str]) -> int:
+    """'UTC+2' / 'UTC-5' / 'UTC+5:30' as minutes east of UTC (unknown formats count as UTC)"""
+    match = TIMEZONE_RE.match((timezone_str or "UTC").strip())
+    if not match or not match.group(1):
+        return 0
+    minutes = int(match.group(2)) * 60 + int(match.group(3) or 0)
+    return minutes if match.group(1) == "+" else -minutes
+
+def utc_offset(user: "User") -> timedelta:
+    """The user's schedule timezone: the projection column, or parsed if not flushed yet"""
+    minutes = user.schedule_utc_offset_minutes
+    if minutes is None:
+        minutes = timezone_offset_minutes((user.schedule_settings or {}).get("timezone"))
+    return timedelta(minutes=minutes)
+
+def schedule_projection(schedule: Optional[Dict]) -> Dict:
+    """Column values derived from a schedule_settings dict"""
+    if not isinstance(schedule, dict):
+        return {"schedule_mode": None, "schedule_utc_offset_minutes": None, "schedule_daily_minute_utc": None}
+
+    offset = timezone_offset_minutes(schedule.get("timezone"))
+    daily_minute = None
+    if schedule.get("mode") == "daily":
+        try:
+            hour, minute = (schedule.get("settings") or {}).get("dailyTime", "09:00").split(":")
+            daily_minute = (int(hour) * 60 + int(minute) - offset) % (24 * 60)
+        except (AttributeError, ValueError):
+            daily_minute = None
+
+    return {
+        "schedule_mode": schedule.get("mode"),
+        "schedule_utc_offset_minutes": offset,
+        "schedule_daily_minute_utc": daily_minute
+    }
+
+@event.listens_for(User, "before_insert")
+@event.listens_for(User, "before_update")
+def _sync_schedule_projection(mapper, connection, target: User):
+    for column, value in schedule_projection(target.schedule_settings).items():
+        setattr(target, column, value)
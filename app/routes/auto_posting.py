@@ -1,10 +1,13 @@
-import json
+import copy
 import logging
+import time
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.models.database import get_db
-from app.models.user import User
+from app.models.user import User, utc_offset
 from app.routes.profile import get_current_user
+from app.core.write_queue import run_write
+from app.services.auth_cache import auth_cache
 
 router = APIRouter()
 
@@ -13,13 +16,14 @@ def start_auto_posting(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    user = db.query(User).filter(User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(404, "User not found")
+    def set_flag(session: Session) -> bool:
+        return session.query(User).filter(User.id == current_user.id).update({"auto_posting": True}) > 0
     
-    user.auto_posting = True
-    db.commit()
-    logging.info(f"Auto-posting enabled for user {user.id}")
+    if not run_write(db, set_flag):
+        raise HTTPException(404, "User not found")
+    # Bulk update: no mapper events, so drop the cached auth snapshot here
+    auth_cache.invalidate_user(current_user.id)
+    logging.info(f"Auto-posting enabled for user {current_user.id}")
     return {"message": "Auto-posting campaign started"}
 
 @router.post("/auto-posting/stop")
@@ -27,13 +31,14 @@ def stop_auto_posting(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    user = db.query(User).filter(User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(404, "User not found")
+    def set_flag(session: Session) -> bool:
+        return session.query(User).filter(User.id == current_user.id).update({"auto_posting": False}) > 0
     
-    user.auto_posting = False
-    db.commit()
-    logging.info(f"Auto-posting disabled for user {user.id}")
+    if not run_write(db, set_flag):
+        raise HTTPException(404, "User not found")
+    # Bulk update: no mapper events, so drop the cached auth snapshot here
+    auth_cache.invalidate_user(current_user.id)
+    logging.info(f"Auto-posting disabled for user {current_user.id}")
     return {"message": "Auto-posting campaign stopped"}
 
 @router.post("/auto-posting/test")
@@ -57,9 +62,7 @@ def get_auto_posting_status(
     current_user: User = Depends(get_current_user),
 ):
     """Get the current auto-posting status and settings"""
-    user = db.query(User).filter(User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(404, "User not found")
+    user = current_user
     
     return {
         "auto_posting_enabled": user.auto_posting,
@@ -103,7 +106,7 @@ def debug_auto_posting(
     # Check 3: Schedule settings
     try:
         if current_user.schedule_settings:
-            schedule = json.loads(current_user.schedule_settings)
+            schedule = current_user.schedule_settings
             debug_info["checks"]["schedule"] = f"✅ Schedule mode: {schedule.get('mode', 'unknown')}"
             
             # Check if should post now
@@ -121,7 +124,7 @@ def debug_auto_posting(
     # Check 4: Content templates
     try:
         if current_user.content_templates:
-            templates = json.loads(current_user.content_templates)
+            templates = current_user.content_templates
             debug_info["checks"]["templates"] = f"✅ {len(templates)} content templates"
         else:
             debug_info["checks"]["templates"] = "❌ No content templates"
@@ -138,7 +141,9 @@ def force_test_posting(
     """Force test a LinkedIn post regardless of schedule"""
     try:
         from app.services.auto_posting_service import generate_linkedin_post
-        from app.services.linkedin_service import post_linkedin_content
+        from app.services.linkedin_service import publish_linkedin_content
+        from app.services.post_history import post_history
+        from app.services.prompt_templates import PROMPT_VERSION
         from app.schemas.post_generator import PostGenerateRequest
         
         # Check prerequisites
@@ -169,7 +174,8 @@ def force_test_posting(
         )
         
         logging.info(f"Generating test post for user {current_user.id}")
-        content = generate_linkedin_post(test_request)
+        started = time.monotonic()
+        content = generate_linkedin_post(test_request, user_id=current_user.id)
         
         if not content:
             return {"error": "Failed to generate content"}
@@ -177,10 +183,20 @@ def force_test_posting(
         logging.info(f"Generated content: {content}")
         
         # Try to post to LinkedIn
-        success = post_linkedin_content(current_user.access_token, content)
+        generated = time.monotonic()
+        result = publish_linkedin_content(current_user.access_token, content)
+        post_history.record(
+            current_user.id, content, result,
+            source="test",
+            prompt_version=PROMPT_VERSION,
+            generation_ms=int((generated - started) * 1000),
+            publish_ms=int((time.monotonic() - generated) * 1000)
+        )
+        success = result["success"]
         
         return {
             "success": success,
+            "post_id": result.get("post_id"),
             "content": content,
             "message": "Post created successfully!" if success else "Failed to post to LinkedIn"
         }
@@ -208,7 +224,8 @@ def add_test_schedule(
         
         # Get current schedule or create new one
         if current_user.schedule_settings:
-            schedule = json.loads(current_user.schedule_settings)
+            # Copy so the change is detected on commit (JSON columns don't track in-place edits)
+            schedule = copy.deepcopy(current_user.schedule_settings)
         else:
             schedule = {"mode": "manual", "timezone": "UTC+2", "settings": {"selectedDates": {}}}
         
@@ -219,7 +236,7 @@ def add_test_schedule(
         schedule["settings"]["selectedDates"][today_str] = [test_time_str]
         
         # Update user
-        current_user.schedule_settings = json.dumps(schedule)
+        current_user.schedule_settings = schedule
         db.commit()
         
         return {
@@ -244,25 +261,13 @@ def debug_timezone_calculation(
         if not current_user.schedule_settings:
             return {"error": "No schedule settings found"}
         
-        schedule = json.loads(current_user.schedule_settings)
+        schedule = current_user.schedule_settings
         current_utc = datetime.now(dt_timezone.utc)
         
         # Parse user timezone
         user_timezone = schedule.get('timezone', 'UTC+0')
         
-        def parse_timezone_offset(timezone_str):
-            if timezone_str == 'UTC+0' or timezone_str == 'UTC':
-                return timedelta(0)
-            if timezone_str.startswith('UTC+'):
-                hours = int(timezone_str[4:])
-                return timedelta(hours=hours)
-            elif timezone_str.startswith('UTC-'):
-                hours = int(timezone_str[4:])
-                return timedelta(hours=-hours)
-            else:
-                return timedelta(0)
-        
-        timezone_offset = parse_timezone_offset(user_timezone)
+        timezone_offset = utc_offset(current_user)
         user_local_time = current_utc + timezone_offset
         
         debug_info = {
@@ -353,7 +358,7 @@ def debug_schedule_timing(
         if not current_user.schedule_settings:
             return {"error": "No schedule settings found"}
         
-        schedule = json.loads(current_user.schedule_settings)
+        schedule = current_user.schedule_settings
         current_time = datetime.now(dt_timezone.utc)
         
         debug_info = {
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from app.models.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.database import get_async_db
 from app.models.subscription import Subscription
 from app.models.user import User
 from datetime import datetime
@@ -63,16 +64,17 @@ def create_payment(data: PayRequest):
     }
 
 @router.post("/callback")
-async def handle_callback(request: Request, db: Session = Depends(get_db)):
+async def handle_callback(request: Request, db: AsyncSession = Depends(get_async_db)):
     data = await request.json()
     email = data.get("email")
     status = data.get("transactionStatus")
 
     if status == "Approved":
-        user = db.query(User).filter(User.email == email).first()
+        result = await db.execute(select(User).where(User.email == email))
+        user = result.scalars().first()
         if user:
             subscription = Subscription(user_id=user.id, plan="pro", status="active")
             db.add(subscription)
-            db.commit()
+            await db.commit()
             return {"status": "success"}
     return {"status": "ignored"}
\ No newline at end of file
@@ -1,54 +1,75 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-import openai
-import os
+from app.services.llm_gateway import gateway, LLMBusyError
+from app.services.usage_ledger import usage_ledger, QuotaExceededError
+from app.routes.profile import get_current_user
+from app.services.topic_filter import topic_filter
 
 router = APIRouter()
 
-openai.api_key = os.getenv("OPENAI_API_KEY", "your-openai-key")
+CONTENT_MODEL = "gpt-4"
 
 class PostRequest(BaseModel):
-    user_id: int
     industry: str
     topic: str
     tone: str = "professional"
 
 class CommentRequest(BaseModel):
-    user_id: int
     post_text: str
     tone: str = "thoughtful"
 
 @router.post("/post")
-def generate_post(data: PostRequest):
+def generate_post(data: PostRequest, user = Depends(get_current_user)):
     try:
+        usage_ledger.check_quota(user)
         prompt = f"Write a {data.tone} LinkedIn post for someone in the {data.industry} industry about {data.topic}."
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
+        result = gateway.complete(
+            feature="content_post",
+            user_id=user.id,
+            model=CONTENT_MODEL,
             messages=[
                 {"role": "system", "content": "You are a LinkedIn post generator."},
                 {"role": "user", "content": prompt}
             ],
             max_tokens=300
         )
-        return {"post": response.choices[0].message.content.strip()}
+        avoided = topic_filter.violations(user, result.text)
+        if avoided:
+            raise HTTPException(status_code=422, detail=f"Generated post mentions avoided topics: {', '.join(avoided)}")
+        return {"post": result.text}
+    except HTTPException:
+        raise
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except LLMBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/comment")
-def generate_comment(data: CommentRequest):
+def generate_comment(data: CommentRequest, user = Depends(get_current_user)):
     try:
+        usage_ledger.check_quota(user)
         prompt = f"""Write a {data.tone} comment in response to this LinkedIn post:
 
 \"\"\"{data.post_text}\"\"\"
 """
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
+        result = gateway.complete(
+            feature="content_comment",
+            user_id=user.id,
+            model=CONTENT_MODEL,
             messages=[
                 {"role": "system", "content": "You are a professional LinkedIn commenter."},
                 {"role": "user", "content": prompt}
             ],
             max_tokens=150
         )
-        return {"comment": response.choices[0].message.content.strip()}
+        return {"comment": result.text}
+    except HTTPException:
+        raise
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except LLMBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
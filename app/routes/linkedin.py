@@ -5,27 +5,24 @@ from sqlalchemy.orm import Session
 import requests
 from app.models.database import get_db
 from app.models.user import User
+from app.routes.profile import get_current_user
+from app.services.near_duplicate_service import fingerprint_index
+from app.services.post_history import post_history
 
 router = APIRouter()
 
 class PostData(BaseModel):
-    user_id: int
     text: str
 
 class CommentData(BaseModel):
-    user_id: int
     text: str
     parent_post_urn: str
 
-def get_user_token(user_id: int, db: Session):
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user.access_token
-
 @router.post("/post")
-def post_to_linkedin(data: PostData, db: Session = Depends(get_db), ok: bool = Depends(lambda: require_subscription(data.user_id))):
-    token = get_user_token(data.user_id, db)
+def post_to_linkedin(data: PostData, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    # Posts as (and records history for) the authenticated user, never a user_id from the body
+    require_subscription(current_user.id, db)
+    token = current_user.access_token
 
     # Get LinkedIn URN (author ID)
     me = requests.get("https://api.linkedin.com/v2/me", headers={
@@ -51,13 +48,24 @@ def post_to_linkedin(data: PostData, db: Session = Depends(get_db), ok: bool = D
         "X-Restli-Protocol-Version": "2.0.0"
     }, json=payload)
 
+    success = res.status_code == 201
+    post_id = res.headers.get("x-restli-id")
+    post_history.record(
+        current_user.id, data.text,
+        {"success": success, "post_id": post_id, "api_path": "v2/ugcPosts", "error": None if success else res.text},
+        source="manual"
+    )
     if res.status_code != 201:
         raise HTTPException(status_code=500, detail=f"Failed to post: {res.text}")
-    return {"status": "Posted", "url": res.headers.get("x-restli-id")}
+    
+    # Manual posts count towards the user's near-duplicate history too
+    fingerprint_index.add(db, current_user.id, data.text, source="manual")
+    return {"status": "Posted", "url": post_id}
 
 @router.post("/comment")
-def comment_on_linkedin(data: CommentData, db: Session = Depends(get_db), ok: bool = Depends(lambda: require_subscription(data.user_id))):
-    token = get_user_token(data.user_id, db)
+def comment_on_linkedin(data: CommentData, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    require_subscription(current_user.id, db)
+    token = current_user.access_token
 
     payload = {
         "actor": f"urn:li:person:{requests.get('https://api.linkedin.com/v2/me', headers={ 'Authorization': f'Bearer {token}' }).json()['id']}",
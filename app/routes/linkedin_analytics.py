@@ -1,9 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
 from app.models.database import get_db
 from app.models.user import User
 from app.routes.profile import get_current_user
 from app.services.linkedin_analytics_service import get_user_analytics, LinkedInAnalyticsService
+from app.services.engagement_rollup_service import (
+    get_rollup_series,
+    compare_periods,
+    extract_post_text,
+    extract_post_created_ms
+)
+from app.services.analytics_export_service import stream_csv, stream_ndjson
+from app.services.network_growth_service import get_growth_series
+from app.services.post_history import post_history, template_performance
+import base64
+import json
 import logging
 
 router = APIRouter()
@@ -89,26 +103,45 @@ def get_analytics_dashboard(
         logging.error(f"Error in analytics dashboard: {str(e)}")
         raise HTTPException(500, f"Dashboard failed: {str(e)}")
 
+def encode_posts_cursor(start: int) -> str:
+    """Opaque cursor for the next page of post history"""
+    return base64.urlsafe_b64encode(json.dumps({"start": start}).encode()).decode()
+
+def decode_posts_cursor(cursor: str) -> int:
+    try:
+        start = int(json.loads(base64.urlsafe_b64decode(cursor.encode())).get("start", 0))
+    except Exception:
+        raise HTTPException(400, "Invalid cursor")
+    if start < 0:
+        raise HTTPException(400, "Invalid cursor")
+    return start
+
 @router.get("/linkedin-analytics/posts")
 def get_recent_posts_analytics(
     limit: int = 10,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Get analytics for recent posts"""
+    """Get analytics for one page of posts; pass next_cursor back to page through full history"""
     try:
         if not current_user.access_token:
             raise HTTPException(400, "No LinkedIn access token found")
         
         analytics_service = LinkedInAnalyticsService()
+        ctx = analytics_service.context(current_user.access_token)
         
-        # Get recent posts
-        posts = analytics_service.get_user_posts(current_user.access_token, count=limit)
+        # Only the requested page is fetched and held in memory
+        start = decode_posts_cursor(cursor) if cursor else 0
+        page = analytics_service.get_user_posts_page(ctx, start=start, count=limit)
+        posts = page["elements"]
+        next_cursor = encode_posts_cursor(page["next_start"]) if page["next_start"] is not None else None
         
         if not posts:
             return {
                 "posts": [],
                 "total": 0,
+                "next_cursor": None,
                 "message": "No posts found"
             }
         
@@ -116,11 +149,11 @@ def get_recent_posts_analytics(
         formatted_posts = []
         for post in posts:
             post_urn = post.get("id", "")
-            stats = analytics_service.get_post_statistics(current_user.access_token, post_urn)
+            stats = analytics_service.get_post_statistics(ctx, post_urn)
             
             # Extract post content
-            post_text = post.get("text", {}).get("text", "") if isinstance(post.get("text"), dict) else str(post.get("text", ""))
-            created_time = post.get("created", {}).get("time", 0) if isinstance(post.get("created"), dict) else 0
+            post_text = extract_post_text(post)
+            created_time = extract_post_created_ms(post)
             
             formatted_post = {
                 "id": post_urn,
@@ -147,9 +180,12 @@ def get_recent_posts_analytics(
         
         return {
             "posts": formatted_posts,
-            "total": len(formatted_posts)
+            "total": len(formatted_posts),
+            "next_cursor": next_cursor
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error getting recent posts analytics: {str(e)}")
         raise HTTPException(500, f"Failed to get posts analytics: {str(e)}")
@@ -262,4 +298,122 @@ def get_analytics_summary(
         
     except Exception as e:
         logging.error(f"Error getting analytics summary: {str(e)}")
-        raise HTTPException(500, f"Failed to get summary: {str(e)}")
\ No newline at end of file
+        raise HTTPException(500, f"Failed to get summary: {str(e)}")
+
+@router.get("/linkedin-analytics/rollups")
+def get_engagement_rollups(
+    granularity: str = "daily",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Get daily or weekly engagement rollups for a date range (served from stored rollups only)"""
+    if granularity not in ("daily", "weekly"):
+        raise HTTPException(400, "granularity must be 'daily' or 'weekly'")
+    
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(400, "start must not be after end")
+    
+    try:
+        return get_rollup_series(db, current_user.id, start, end, granularity)
+    except Exception as e:
+        logging.error(f"Error getting engagement rollups: {str(e)}")
+        raise HTTPException(500, f"Failed to get rollups: {str(e)}")
+
+@router.get("/linkedin-analytics/compare")
+def compare_engagement_periods(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Compare a date range with the preceding range of equal length (defaults to week-over-week)"""
+    if (start is None) != (end is None):
+        raise HTTPException(400, "Provide both start and end, or neither for week-over-week")
+    if start and end and start > end:
+        raise HTTPException(400, "start must not be after end")
+    
+    try:
+        return compare_periods(db, current_user.id, start, end)
+    except Exception as e:
+        logging.error(f"Error comparing engagement periods: {str(e)}")
+        raise HTTPException(500, f"Failed to compare periods: {str(e)}")
+
+@router.get("/linkedin-analytics/export")
+def export_post_analytics(
+    format: str = "csv",
+    current_user: User = Depends(get_current_user),
+):
+    """Stream stored post-level analytics as CSV or NDJSON (no live LinkedIn calls)"""
+    if format == "csv":
+        generator, media_type, extension = stream_csv(current_user.id), "text/csv", "csv"
+    elif format == "ndjson":
+        generator, media_type, extension = stream_ndjson(current_user.id), "application/x-ndjson", "ndjson"
+    else:
+        raise HTTPException(400, "format must be 'csv' or 'ndjson'")
+    
+    filename = f"linkedin-analytics-{datetime.now(timezone.utc).strftime('%Y%m%d')}.{extension}"
+    return StreamingResponse(
+        generator,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Samples are stored as naive UTC; treat naive query params as UTC too"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+@router.get("/linkedin-analytics/growth")
+def get_network_growth(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = 90,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Get the follower/connection growth series from stored samples, downsampled to `points`"""
+    end = to_naive_utc(end) if end else datetime.now(timezone.utc).replace(tzinfo=None)
+    start = to_naive_utc(start) if start else end - timedelta(days=90)
+    if start > end:
+        raise HTTPException(400, "start must not be after end")
+    if not 1 <= points <= 1000:
+        raise HTTPException(400, "points must be between 1 and 1000")
+    
+    try:
+        return get_growth_series(db, current_user.id, start, end, points)
+    except Exception as e:
+        logging.error(f"Error getting network growth: {str(e)}")
+        raise HTTPException(500, f"Failed to get growth series: {str(e)}")
+
+@router.get("/linkedin-analytics/history")
+def get_post_history(
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Posts this app published for the user, from the local history (no LinkedIn calls)"""
+    if not 1 <= limit <= 200:
+        raise HTTPException(400, "limit must be between 1 and 200")
+    
+    try:
+        return {"posts": post_history.recent(db, current_user.id, limit)}
+    except Exception as e:
+        logging.error(f"Error getting post history: {str(e)}")
+        raise HTTPException(500, f"Failed to get post history: {str(e)}")
+
+@router.get("/linkedin-analytics/templates")
+def get_template_performance(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Engagement per content template and prompt version (local history joined to stored snapshots)"""
+    try:
+        return {"templates": template_performance(db, current_user.id)}
+    except Exception as e:
+        logging.error(f"Error getting template performance: {str(e)}")
+        raise HTTPException(500, f"Failed to get template performance: {str(e)}")
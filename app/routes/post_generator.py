@@ -1,135 +1,237 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from app.schemas.post_generator import PostGenerateRequest
-import os
-from openai import OpenAI
+from app.services.llm_gateway import gateway, LLMBusyError, LLMResult, PRIORITY_LOW
+from app.services.generation_cache import generation_cache, cache_key, is_cacheable
+from app.services.prompt_templates import build_messages, PROMPT_VERSION
+from app.services.token_budget import completion_budget, estimate_request
+from app.services.draft_scoring import rank_drafts
+from app.services.topic_filter import compile_topics, find_topics, parse_topics
+from app.services.usage_ledger import usage_ledger, QuotaExceededError
+from app.routes.profile import get_current_user
+import asyncio
+import json
+import logging
 
 router = APIRouter()
 
-# Initialize OpenAI client with the new v1.0+ syntax
-client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY")
-)
+DISCONNECT_POLL_SECONDS = 0.5
+FEATURE = "post_generator"
 
-def build_prompt(data: PostGenerateRequest) -> str:
-    """Build a detailed prompt for generating LinkedIn posts"""
-    
-    # Enhanced prompt with better instructions
-    prompt = f"""Create a professional LinkedIn post with these specifications:
-
-CONTENT REQUIREMENTS:
-- Topic: {data.topic}
-- Industry: {data.industry}
-- Tone: {data.tone}
-- Post Type: {data.post_type}
-- Target Length: Approximately {data.post_length} words
-- Include Hashtags: {'Yes' if data.include_hashtags else 'No'}
-- Include Emojis: {'Yes' if data.include_emojis else 'No'}"""
+def build_completion_params(data: PostGenerateRequest) -> dict:
+    """Chat completion parameters shared by the blocking and streaming endpoints"""
+    params = {
+        "messages": build_messages(data),
+        "max_tokens": completion_budget(data),  # Scaled to post_length, hashtags and emojis
+        "temperature": 0.7,  # Balanced creativity
+        "top_p": 1,
+        "frequency_penalty": 0.1,  # Reduce repetition
+        "presence_penalty": 0.1    # Encourage variety
+    }
+    if data.variants > 1:
+        # Alternatives share one prompt instead of one request each
+        params["n"] = data.variants
+    return params
 
-    # Add short description context if provided
-    if data.short_description:
-        prompt += f"""
-- Additional Context: {data.short_description}"""
+def with_user_avoid_topics(data: PostGenerateRequest, user) -> PostGenerateRequest:
+    """Add the signed-in user's saved avoid_topics to the request's own"""
+    saved = parse_topics(user.avoid_topics)
+    if not saved:
+        return data
+    return data.model_copy(update={"avoid_topics": list(dict.fromkeys((data.avoid_topics or []) + saved))})
 
-    prompt += f"""
-
-POST TYPE GUIDELINES:
-- story: Share a personal experience with lessons learned
-- tips: Provide actionable advice and insights
-- announcement: Make a professional announcement or update
-- question: Ask an engaging question to start a conversation
-- achievement: Celebrate a milestone or accomplishment
-- industry: Comment on industry trends or news
+async def fill_generation_cache(key: str, data: PostGenerateRequest, user_id):
+    """Generate one more variant for a cached key after a hit was served (charged to the requesting user)"""
+    try:
+        result = await gateway.acomplete(
+            feature=FEATURE, user_id=user_id, priority=PRIORITY_LOW, **build_completion_params(data)
+        )
+        if find_topics(compile_topics(data.avoid_topics or []), result.text):
+            return
+        await run_in_threadpool(generation_cache.store, key, PROMPT_VERSION, result.text)
+    except Exception as e:
+        logging.warning(f"Background generation cache fill failed: {str(e)}")
+    finally:
+        generation_cache.release_fill(key)
 
-TONE GUIDELINES:
-- Professional: Formal, authoritative, business-focused
-- Casual & Friendly: Conversational, approachable, warm
-- Thought Leader: Insightful, forward-thinking, analytical
-- Storytelling: Narrative-driven, engaging, personal
-- Motivational: Inspiring, uplifting, encouraging
+def avoided_topics_error(topics: list) -> HTTPException:
+    return HTTPException(
+        status_code=422,
+        detail=f"Generated post mentions avoided topics: {', '.join(topics)}. Please try again."
+    )
 
-FORMATTING REQUIREMENTS:
-- Use line breaks for readability
-- Make it engaging and authentic
-- Include a call-to-action when appropriate
-- Keep within the specified word count
-{"- Include relevant hashtags at the end" if data.include_hashtags else "- Do not include hashtags"}
-{"- Use emojis appropriately throughout the post" if data.include_emojis else "- Do not use emojis"}"""
+def openai_error_to_http(e: Exception) -> HTTPException:
+    """Map OpenAI errors to the HTTP errors this API has always returned"""
+    error_message = str(e)
+    
+    if isinstance(e, QuotaExceededError):
+        return HTTPException(status_code=e.status_code, detail=e.detail)
+    elif isinstance(e, LLMBusyError):
+        return HTTPException(
+            status_code=429, 
+            detail="Too many generations in progress. Please try again shortly."
+        )
+    elif "insufficient_quota" in error_message:
+        return HTTPException(
+            status_code=402, 
+            detail="OpenAI API quota exceeded. Please check your billing."
+        )
+    elif "invalid_api_key" in error_message:
+        return HTTPException(
+            status_code=401, 
+            detail="Invalid OpenAI API key."
+        )
+    elif "rate_limit" in error_message:
+        return HTTPException(
+            status_code=429, 
+            detail="Rate limit exceeded. Please try again later."
+        )
+    else:
+        return HTTPException(
+            status_code=500, 
+            detail=f"OpenAI API error: {error_message}"
+        )
 
-    # Add context-specific instructions if short_description is provided
-    if data.short_description:
-        prompt += f"""
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-CONTEXT INTEGRATION:
-- Incorporate the additional context naturally into the post
-- Make the content relevant to the specific situation described
-- Use the context to add authenticity and personalization
-- Don't just mention the context - weave it into the narrative meaningfully"""
+async def run_until_disconnected(request: Request, coro):
+    """Await coro, cancelling it if the client goes away before it finishes"""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client closed request")
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
 
-    prompt += """
+async def stream_post_events(request: Request, data: PostGenerateRequest, user_id: int = None):
+    """Forward completion deltas as Server-Sent Events, then a final event with usage"""
+    events = gateway.astream(feature=FEATURE, user_id=user_id, **build_completion_params(data))
+    try:
+        async for event in events:
+            if isinstance(event, LLMResult):
+                avoided = find_topics(compile_topics(data.avoid_topics or []), event.text)
+                if avoided:
+                    # The text is already on the client; tell it to discard the draft
+                    http_error = avoided_topics_error(avoided)
+                    yield sse_event("rejected", {
+                        "status_code": http_error.status_code,
+                        "detail": http_error.detail,
+                        "avoided_topics_hit": avoided,
+                        "usage": event.usage
+                    })
+                    break
+                yield sse_event("done", {
+                    "generated_post": event.text,
+                    "usage": event.usage
+                })
+                break
+            if await request.is_disconnected():
+                return
+            yield sse_event("delta", {"text": event})
+        
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # Headers are already sent, so errors travel as an event
+        http_error = openai_error_to_http(e)
+        yield sse_event("error", {"status_code": http_error.status_code, "detail": http_error.detail})
+    finally:
+        # Closing the gateway stream drops the upstream connection on disconnect/cancel
+        await events.aclose()
 
-Generate a compelling LinkedIn post that follows these guidelines."""
-    
-    return prompt
+@router.post("/estimate")
+def estimate_post(data: PostGenerateRequest):
+    """Expected tokens and cost for a generation request, without calling OpenAI"""
+    return estimate_request(data, build_messages(data), n=data.variants)
 
 @router.post("/generate-post")
-async def generate_post(data: PostGenerateRequest):
-    """Generate a LinkedIn post using OpenAI"""
+async def generate_post(request: Request, data: PostGenerateRequest, background_tasks: BackgroundTasks,
+                        stream: bool = False, current_user = Depends(get_current_user)):
+    """Generate a LinkedIn post using OpenAI (pass ?stream=true for Server-Sent Events)"""
+    # Signed-in callers only: every generation is metered against a user's monthly budget
+    user_id = current_user.id
+    data = with_user_avoid_topics(data, current_user)
+    
+    if stream:
+        if data.variants > 1:
+            raise HTTPException(status_code=400, detail="variants is not supported with stream=true")
+        try:
+            await run_in_threadpool(usage_ledger.check_quota, current_user)
+        except QuotaExceededError as e:
+            raise openai_error_to_http(e)
+        return StreamingResponse(
+            stream_post_events(request, data, user_id),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
     
     try:
-        prompt = build_prompt(data)
-        
-        # Use the new OpenAI v1.0+ client syntax
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # or "gpt-3.5-turbo" for faster/cheaper option
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "You are a professional LinkedIn content creator who writes engaging, authentic posts that drive engagement and build professional networks. Always follow the specific requirements provided. When additional context is provided, seamlessly integrate it to make the post more personal and relevant."
-                },
-                {
-                    "role": "user", 
-                    "content": prompt
+        use_cache = data.use_cache and data.variants == 1 and is_cacheable(data)
+        key = cache_key(data, PROMPT_VERSION) if use_cache else None
+        if key:
+            cached_post = await run_in_threadpool(generation_cache.lookup, key)
+            if cached_post:
+                # Top the variant pool up after responding, within the user's budget
+                if generation_cache.claim_fill(key):
+                    try:
+                        await run_in_threadpool(usage_ledger.check_quota, current_user)
+                        background_tasks.add_task(fill_generation_cache, key, data, user_id)
+                    except QuotaExceededError:
+                        generation_cache.release_fill(key)
+                return {
+                    "generated_post": cached_post,
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                    "cached": True
                 }
-            ],
-            max_tokens=600,  # Increased for longer posts
-            temperature=0.7,  # Balanced creativity
-            top_p=1,
-            frequency_penalty=0.1,  # Reduce repetition
-            presence_penalty=0.1    # Encourage variety
+        
+        # Cache hits cost no tokens, so the quota is only checked before a real call
+        await run_in_threadpool(usage_ledger.check_quota, current_user)
+        
+        result = await run_until_disconnected(
+            request,
+            gateway.acomplete(feature=FEATURE, user_id=user_id, **build_completion_params(data))
         )
         
-        generated_text = response.choices[0].message.content.strip()
+        if data.variants > 1:
+            ranked = rank_drafts(result.texts, data)
+            if not ranked:
+                raise HTTPException(
+                    status_code=502,
+                    detail="The model returned only empty drafts. Please try again."
+                )
+            # Ranking puts clean drafts first, so a hit here means every draft was rejected
+            if ranked and ranked[0]["avoided_topics_hit"]:
+                raise avoided_topics_error(ranked[0]["avoided_topics_hit"])
+            return {
+                "generated_post": ranked[0]["text"],
+                "variants": ranked,
+                "usage": result.usage,
+                "cached": False
+            }
+        
+        avoided = find_topics(compile_topics(data.avoid_topics or []), result.text)
+        if avoided:
+            raise avoided_topics_error(avoided)
+        
+        if key:
+            await run_in_threadpool(generation_cache.store, key, PROMPT_VERSION, result.text)
         
         return {
-            "generated_post": generated_text,
-            "usage": {
-                "prompt_tokens": response.usage.prompt_tokens,
-                "completion_tokens": response.usage.completion_tokens,
-                "total_tokens": response.usage.total_tokens
-            }
+            "generated_post": result.text,
+            "usage": result.usage,
+            "cached": False
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         # More detailed error handling
-        error_message = str(e)
-        
-        if "insufficient_quota" in error_message:
-            raise HTTPException(
-                status_code=402, 
-                detail="OpenAI API quota exceeded. Please check your billing."
-            )
-        elif "invalid_api_key" in error_message:
-            raise HTTPException(
-                status_code=401, 
-                detail="Invalid OpenAI API key."
-            )
-        elif "rate_limit" in error_message:
-            raise HTTPException(
-                status_code=429, 
-                detail="Rate limit exceeded. Please try again later."
-            )
-        else:
-            raise HTTPException(
-                status_code=500, 
-                detail=f"OpenAI API error: {error_message}"
-            )
\ No newline at end of file
+        raise openai_error_to_http(e)
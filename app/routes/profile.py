@@ -6,6 +6,8 @@ from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel, EmailStr
 from app.models.database import get_db
 from app.services.user_service import get_user_by_id, update_user_profile
+from app.services.auth_cache import auth_cache
+import json
 import jwt
 import os
 import traceback
@@ -14,20 +16,35 @@ router = APIRouter()
 security = HTTPBearer()
 
 JWT_SECRET = os.getenv("JWT_SECRET_KEY", "supersecretjwtkey")
+# Comma-separated emails allowed to read the operational /debug endpoints
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
 
 def get_current_user(token: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
     try:
-        payload = jwt.decode(token.credentials, JWT_SECRET, algorithms=["HS256"])
-        user_id = payload.get("user_id")
+        user_id = auth_cache.get_token(token.credentials)
         if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid authentication token")
-        user = get_user_by_id(db, user_id)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+            payload = jwt.decode(token.credentials, JWT_SECRET, algorithms=["HS256"])
+            user_id = payload.get("user_id")
+            if user_id is None:
+                raise HTTPException(status_code=401, detail="Invalid authentication token")
+            auth_cache.put_token(token.credentials, user_id, payload.get("exp"))
+        
+        # Served from a recent snapshot when possible; the returned User is attached to db either way
+        user = auth_cache.get_user(db, user_id)
+        if user is None:
+            user = get_user_by_id(db, user_id)
+            if not user:
+                raise HTTPException(status_code=404, detail="User not found")
+            auth_cache.put_user(user)
         return user
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
 
+def require_admin(current_user = Depends(get_current_user)):
+    if (current_user.email or "").lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
 class UserUpdateRequest(BaseModel):
     name: str | None = None
     email: EmailStr | None = None  # Use EmailStr for validation
@@ -64,13 +81,20 @@ def get_profile(current_user = Depends(get_current_user)):
         "industries": current_user.industries,
         "avoid_topics": current_user.avoid_topics,
 
-        "content_templates": current_user.content_templates,
-        "schedule_settings": current_user.schedule_settings,
+        # Still serialized as JSON strings here, as the profile response always returned them
+        "content_templates": json.dumps(current_user.content_templates) if current_user.content_templates is not None else None,
+        "schedule_settings": json.dumps(current_user.schedule_settings) if current_user.schedule_settings is not None else None,
 
         "created_at": current_user.created_at,
         "updated_at": current_user.updated_at,
     }
 
+@router.get("/usage")
+def get_usage(current_user = Depends(get_current_user)):
+    """Token usage against the current plan's monthly budget"""
+    from app.services.usage_ledger import usage_ledger
+    return usage_ledger.summary(current_user)
+
 @router.put("/profile")
 def update_profile(
     update: UserUpdateRequest,
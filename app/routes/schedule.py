@@ -62,6 +62,12 @@ def update_user_schedule_settings(
         if result is None:
             raise HTTPException(status_code=404, detail="User not found")
         
+        if schedule_data["mode"] == "smart":
+            # Seed slots now so the user doesn't wait for the nightly job
+            from app.services.smart_schedule_service import refresh_user_smart_slots
+            refresh_user_smart_slots(db, result["user"], schedule_data)
+            db.commit()
+        
         logging.info(f"Successfully updated schedule for user {current_user.id}")
         
         return ScheduleUpdateResponse(
@@ -1,8 +1,8 @@
 # app/routes/wayforpay_callback.py
 import os, hmac, hashlib
 from fastapi import APIRouter, Request, HTTPException, Depends
-from sqlalchemy.orm import Session
-from app.models.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.database import get_async_db
 from app.models.user import User
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
@@ -10,7 +10,7 @@ from dateutil.relativedelta import relativedelta
 router = APIRouter()
 
 @router.post("/callback")
-async def wayforpay_callback(request: Request, db: Session = Depends(get_db)):
+async def wayforpay_callback(request: Request, db: AsyncSession = Depends(get_async_db)):
     data = await request.json()
 
     # verify signature
@@ -39,7 +39,7 @@ async def wayforpay_callback(request: Request, db: Session = Depends(get_db)):
         # parse userId from orderReference: "sub_{userId}_{ts}"
         try:
             _, uid, _ = data["orderReference"].split("_", 2)
-            user = db.query(User).get(int(uid))
+            user = await db.get(User, int(uid))
         except:
             user = None
 
@@ -48,6 +48,6 @@ async def wayforpay_callback(request: Request, db: Session = Depends(get_db)):
             user.subscription_plan   = data["productName"][0]
             # extend expiration one month from now
             user.subscription_expires = datetime.utcnow() + relativedelta(months=+1)
-            db.commit()
+            await db.commit()
 
     return {"orderReference": data["orderReference"], "status": "accept"}
@@ -1,7 +1,7 @@
 # app/schemas/post_generator.py
 
-from pydantic import BaseModel
-from typing import Optional, Literal
+from pydantic import BaseModel, Field
+from typing import List, Optional, Literal
 
 class PostGenerateRequest(BaseModel):
     topic: str
@@ -12,3 +12,6 @@ class PostGenerateRequest(BaseModel):
     post_length: int
     include_hashtags: bool
     include_emojis: bool
+    use_cache: bool = False  # opt-in: share pooled completions for identical non-personalized requests
+    variants: int = Field(1, ge=1, le=5)  # drafts generated in one call and ranked locally
+    avoid_topics: Optional[List[str]] = None
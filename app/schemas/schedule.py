@@ -1,5 +1,5 @@
 # app/schemas/schedule.py
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 from typing import Dict, List, Literal, Union
 
 class DailyScheduleSettings(BaseModel):
@@ -8,10 +8,27 @@ class DailyScheduleSettings(BaseModel):
 class ManualScheduleSettings(BaseModel):
     selectedDates: Dict[str, List[str]]  # e.g., {"2024-03-15": ["09:00", "14:00"]}
 
+class SmartScheduleSettings(BaseModel):
+    postsPerDay: int = 1  # slots are derived nightly from the user's engagement-by-hour
+
+SETTINGS_BY_MODE = {
+    "daily": DailyScheduleSettings,
+    "manual": ManualScheduleSettings,
+    "smart": SmartScheduleSettings,
+}
+
 class ScheduleSettingsRequest(BaseModel):
-    mode: Literal["daily", "manual"]
+    mode: Literal["daily", "manual", "smart"]
     timezone: str  # e.g., "UTC+2"
-    settings: Union[DailyScheduleSettings, ManualScheduleSettings]
+    settings: Union[DailyScheduleSettings, ManualScheduleSettings, SmartScheduleSettings]
+
+    @model_validator(mode="after")
+    def settings_match_mode(self):
+        # SmartScheduleSettings has only defaulted fields, so the union alone accepts any object
+        expected = SETTINGS_BY_MODE[self.mode]
+        if not isinstance(self.settings, expected):
+            raise ValueError(f"settings for mode '{self.mode}' must match {expected.__name__}")
+        return self
 
 class ScheduleSettingsResponse(BaseModel):
     mode: str
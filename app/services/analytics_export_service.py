@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+import logging
+from typing import Dict, Iterator
+from app.models.database import SessionLocal
+from app.models.analytics import PostSnapshot
+from app.services.engagement_rollup_service import engagement_rate
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = [
+    "post_urn", "post_created_at", "likes", "comments", "shares",
+    "impressions", "clicks", "engagement_rate", "captured_at", "text"
+]
+EXPORT_BATCH_SIZE = 500
+
+def _snapshot_row(snapshot: PostSnapshot) -> Dict:
+    row = {
+        "post_urn": snapshot.post_urn,
+        "post_created_at": snapshot.post_created_at.isoformat() if snapshot.post_created_at else None,
+        "likes": snapshot.likes or 0,
+        "comments": snapshot.comments or 0,
+        "shares": snapshot.shares or 0,
+        "impressions": snapshot.impressions or 0,
+        "clicks": snapshot.clicks or 0,
+        "captured_at": snapshot.captured_at.isoformat() if snapshot.captured_at else None,
+        "text": snapshot.text or "",
+    }
+    row["engagement_rate"] = engagement_rate(row)
+    return row
+
+def iter_snapshot_rows(user_id: int) -> Iterator[Dict]:
+    """
+    Yield stored post analytics rows for a user in creation order.
+    Uses its own session so the stream outlives the request dependency.
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(PostSnapshot).filter(
+            PostSnapshot.user_id == user_id
+        ).order_by(PostSnapshot.post_created_at, PostSnapshot.id).yield_per(EXPORT_BATCH_SIZE)
+
+        for snapshot in query:
+            yield _snapshot_row(snapshot)
+    except Exception as e:
+        logger.error(f"Error streaming analytics export for user {user_id}: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+def stream_csv(user_id: int) -> Iterator[str]:
+    """CSV export: header line, then one encoded line per post"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    for row in iter_snapshot_rows(user_id):
+        buffer.seek(0)
+        buffer.truncate(0)
+        writer.writerow(row)
+        yield buffer.getvalue()
+
+def stream_ndjson(user_id: int) -> Iterator[str]:
+    """NDJSON export: one JSON object per line"""
+    for row in iter_snapshot_rows(user_id):
+        yield json.dumps(row, ensure_ascii=False) + "\n"
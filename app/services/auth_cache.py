@@ -0,0 +1,154 @@
+import copy
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached, object_session
+from sqlalchemy.orm.util import identity_key
+from app.models.user import User
+
+# How long a decoded token is trusted without re-verifying the JWT (never past its exp)
+AUTH_TOKEN_CACHE_TTL_SECONDS = float(os.getenv("AUTH_TOKEN_CACHE_TTL_SECONDS", "60"))
+# How long a user row snapshot is served without a SELECT; also bounds staleness across workers
+AUTH_USER_CACHE_TTL_SECONDS = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "30"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# Never snapshotted: billing and LinkedIn token fields change on other workers (payment
+# callbacks, token refresh) and feed quota and publishing, so they are loaded from the
+# DB the first time a request reads them
+AUTH_CACHE_UNCACHED_COLUMNS = frozenset({"access_token", "subscription_active", "subscription_plan", "subscription_expires"})
+
+_PENDING_KEY = "auth_cache_invalidate"
+
+class AuthCache:
+    """
+    Short-TTL in-process cache of decoded tokens (token -> user_id) and user
+    row snapshots (user_id -> column values). A snapshot is dropped when its row
+    is flushed through the ORM; bulk query.update() writers must call
+    invalidate_user() themselves. Invalidation is per process, so other workers
+    may serve a snapshot for up to user_ttl; AUTH_CACHE_UNCACHED_COLUMNS are
+    left out of snapshots for that reason.
+    """
+
+    def __init__(self, token_ttl: float = AUTH_TOKEN_CACHE_TTL_SECONDS, user_ttl: float = AUTH_USER_CACHE_TTL_SECONDS, max_entries: int = AUTH_CACHE_MAX_ENTRIES):
+        self.token_ttl = token_ttl
+        self.user_ttl = user_ttl
+        self.max_entries = max_entries
+        self._tokens: Dict[str, Tuple[int, float]] = {}
+        self._users: Dict[int, Tuple[Dict, float]] = {}
+        self._lock = threading.Lock()
+        self.token_hits = 0
+        self.token_misses = 0
+        self.user_hits = 0
+        self.user_misses = 0
+
+    def _make_room(self, entries: Dict, now: float):
+        if len(entries) < self.max_entries:
+            return
+        for key in [key for key, (_, expires) in entries.items() if expires <= now]:
+            del entries[key]
+        while len(entries) >= self.max_entries:
+            # Oldest insert first
+            del entries[next(iter(entries))]
+
+    def get_token(self, token: str) -> Optional[int]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._tokens.get(token)
+            if cached and cached[1] > now:
+                self.token_hits += 1
+                return cached[0]
+            self._tokens.pop(token, None)
+            self.token_misses += 1
+            return None
+
+    def put_token(self, token: str, user_id: int, exp: Optional[float] = None):
+        if self.token_ttl <= 0:
+            return
+        ttl = self.token_ttl
+        if exp is not None:
+            ttl = min(ttl, float(exp) - time.time())
+            if ttl <= 0:
+                return
+        now = time.monotonic()
+        with self._lock:
+            self._make_room(self._tokens, now)
+            self._tokens[token] = (user_id, now + ttl)
+
+    def get_user(self, db: Session, user_id: int) -> Optional[User]:
+        """A User attached to db built from the cached snapshot (no SELECT), or None on a miss"""
+        key = identity_key(User, user_id)
+        attached = db.identity_map.get(key)
+        if attached is not None:
+            return attached
+
+        now = time.monotonic()
+        with self._lock:
+            cached = self._users.get(user_id)
+            if not cached or cached[1] <= now:
+                self._users.pop(user_id, None)
+                self.user_misses += 1
+                return None
+            self.user_hits += 1
+            values = cached[0]
+
+        # A private copy per request: JSON settings are mutable dicts
+        user = User(**copy.deepcopy(values))
+        # Columns missing from the snapshot are marked expired, so reading one loads them from the DB
+        make_transient_to_detached(user)
+        # Persistent in this session as if loaded, so handlers can modify and commit it
+        db.add(user)
+        return user
+
+    def put_user(self, user: User):
+        if self.user_ttl <= 0:
+            return
+        values = {
+            attr.key: getattr(user, attr.key)
+            for attr in inspect(User).column_attrs
+            if attr.key not in AUTH_CACHE_UNCACHED_COLUMNS
+        }
+        now = time.monotonic()
+        with self._lock:
+            self._make_room(self._users, now)
+            self._users[user.id] = (copy.deepcopy(values), now + self.user_ttl)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self._users.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "tokens": len(self._tokens),
+                "users": len(self._users),
+                "token_hits": self.token_hits,
+                "token_misses": self.token_misses,
+                "user_hits": self.user_hits,
+                "user_misses": self.user_misses
+            }
+
+auth_cache = AuthCache()
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_flush(mapper, connection, target: User):
+    auth_cache.invalidate_user(target.id)
+    # Again after commit, in case another request re-cached the old row in between
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session):
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        auth_cache.invalidate_user(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session):
+    session.info.pop(_PENDING_KEY, None)
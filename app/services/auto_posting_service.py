@@ -1,48 +1,49 @@
-import json
 import logging
-import os
+import time
 from datetime import datetime, timezone
-from typing import List
+from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
 from app.models.user import User
-from app.services.linkedin_service import post_linkedin_content
+from app.services.linkedin_service import publish_linkedin_content
 from app.schemas.post_generator import PostGenerateRequest
-import openai
+from app.services.llm_gateway import gateway, LLMResult, PRIORITY_NORMAL
+from app.services.prompt_templates import build_messages, persona_fragment, PROMPT_VERSION
+from app.services.post_history import post_history
+from app.services.token_budget import completion_budget
+from app.services.usage_ledger import usage_ledger, QuotaExceededError
+from app.services.near_duplicate_service import fingerprint_index
+from app.services.topic_filter import topic_filter, parse_topics
 
-# Set up OpenAI client properly
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# Drafts requested in one call when a draft has to be replaced
+NEAR_DUPLICATE_RETRY_VARIANTS = 3
+FRESH_ANGLE_HINT = "Take a fresh angle: avoid the openings, examples and structure of the author's recent posts."
 
-def generate_linkedin_post(data: PostGenerateRequest) -> str:
-    """Generate LinkedIn post content using OpenAI"""
-    prompt = (
-        f"Generate a LinkedIn post with the following details:\n"
-        f"- Topic: {data.topic}\n"
-        f"- Industry: {data.industry}\n"
-        f"- Tone: {data.tone}\n"
-        f"- Post type: {data.post_type}\n"
-        f"- Length (approx words): {data.post_length}\n"
-        f"- Include hashtags: {'Yes' if data.include_hashtags else 'No'}\n"
-        f"- Include emojis: {'Yes' if data.include_emojis else 'No'}\n\n"
-        f"Write a professional, engaging LinkedIn post based on these details. "
-        f"Make it authentic and valuable for the audience."
+def complete_post_variants(data: PostGenerateRequest, n: int = 1, user_id: int = None,
+                           feature: str = "auto_posting", priority: str = PRIORITY_NORMAL,
+                           persona: str = None) -> LLMResult:
+    """One completion call returning n independent drafts for the same request, with its usage"""
+    return gateway.complete(
+        feature=feature,
+        user_id=user_id,
+        priority=priority,
+        messages=build_messages(data, persona),
+        max_tokens=completion_budget(data),
+        temperature=0.8,
+        n=n,
     )
-    
+
+def generate_linkedin_post_variants(data: PostGenerateRequest, n: int = 1, user_id: int = None,
+                                    feature: str = "auto_posting", priority: str = PRIORITY_NORMAL,
+                                    persona: str = None) -> List[str]:
+    """Generate n independent drafts for the same request in a single completion call"""
+    result = complete_post_variants(data, n=n, user_id=user_id, feature=feature, priority=priority, persona=persona)
+    return [text for text in result.texts if text]
+
+def generate_linkedin_post(data: PostGenerateRequest, user_id: int = None, persona: str = None) -> str:
+    """Generate LinkedIn post content using OpenAI"""
     try:
-        # Updated to use the newer OpenAI client format
-        from openai import OpenAI
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that writes professional LinkedIn posts. Create engaging, authentic content that provides value to the audience."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=512,
-            temperature=0.8,
-        )
-        
-        content = response.choices[0].message.content.strip()
+        variants = generate_linkedin_post_variants(data, n=1, user_id=user_id, persona=persona)
+        content = variants[0] if variants else ""
         logging.info(f"Generated LinkedIn post: {content[:100]}...")
         return content
         
@@ -50,6 +51,44 @@ def generate_linkedin_post(data: PostGenerateRequest) -> str:
         logging.error(f"OpenAI API error: {str(e)}")
         return ""
 
+def draft_rejection_reason(db: Session, user: User, content: str) -> Optional[str]:
+    """Why a draft must not be published for this user, or None if it is fine"""
+    avoided = topic_filter.violations(user, content)
+    if avoided:
+        return f"mentions avoided topics {avoided}"
+    if post_history.was_published(db, user.id, content):
+        return "repeats a published post word for word"
+    duplicate, distance = fingerprint_index.is_near_duplicate(db, user.id, content)
+    if duplicate:
+        return f"is a near-duplicate (distance {distance})"
+    return None
+
+def ensure_publishable_draft(db: Session, user: User, data: PostGenerateRequest, content: str, persona: str = None) -> str:
+    """Return content, or a regenerated draft if it hits an avoided topic or repeats a published post"""
+    reason = draft_rejection_reason(db, user, content)
+    if not reason:
+        return content
+    
+    logging.info(f"Draft for user {user.id} {reason}, regenerating")
+    context = f"{data.short_description}\n{FRESH_ANGLE_HINT}" if data.short_description else FRESH_ANGLE_HINT
+    try:
+        usage_ledger.check_quota(user)
+        candidates = generate_linkedin_post_variants(
+            data.model_copy(update={"short_description": context}),
+            n=NEAR_DUPLICATE_RETRY_VARIANTS,
+            user_id=user.id,
+            persona=persona
+        )
+    except Exception as e:
+        logging.error(f"Error regenerating draft for user {user.id}: {str(e)}")
+        return ""
+    
+    for candidate in candidates:
+        if not draft_rejection_reason(db, user, candidate):
+            return candidate
+    logging.warning(f"All regenerated drafts for user {user.id} were rejected")
+    return ""
+
 def should_post_now(user: User) -> bool:
     """Check if it's time to post for this user based on their schedule"""
     try:
@@ -57,7 +96,7 @@ def should_post_now(user: User) -> bool:
             logging.info(f"User {user.id} has no schedule settings")
             return False
             
-        schedule = json.loads(user.schedule_settings)
+        schedule = user.schedule_settings
         current_time = datetime.now(timezone.utc)
         
         if schedule.get('mode') == 'daily':
@@ -119,7 +158,7 @@ def get_content_template_settings(user: User) -> dict:
     """Get content template settings for the user"""
     try:
         if user.content_templates:
-            return json.loads(user.content_templates)
+            return user.content_templates
         else:
             # Default template if none exists
             return {
@@ -152,6 +191,31 @@ def get_valid_tone(user_tone: str) -> str:
     }
     return tone_mapping.get(user_tone.lower(), "Professional")
 
+def build_post_request_for_user(user: User) -> Tuple[Optional[str], Optional[PostGenerateRequest]]:
+    """Pick the user's template and turn it into a generation request"""
+    content_templates = get_content_template_settings(user)
+    if not content_templates:
+        return None, None
+    
+    # Pick the first available template (you can make this smarter)
+    template_name = next(iter(content_templates.keys()), "story")
+    template = content_templates[template_name]
+    
+    # Create post request from template with valid tone
+    raw_tone = template.get("tone", user.personality_type or "professional")
+    valid_tone = get_valid_tone(raw_tone)
+    
+    return template_name, PostGenerateRequest(
+        topic=template.get("topic", "Professional Growth"),
+        industry=template.get("industry", user.industry or "General"),
+        tone=valid_tone,
+        post_type=template.get("post_type", "story"),
+        post_length=template.get("post_length", 150),
+        include_hashtags=template.get("include_hashtags", True),
+        include_emojis=template.get("include_emojis", True),
+        avoid_topics=parse_topics(user.avoid_topics) or None
+    )
+
 def run_auto_posting(db: Session):
     """Main function to run auto-posting for all enabled users"""
     try:
@@ -167,34 +231,26 @@ def run_auto_posting(db: Session):
                     logging.warning(f"User {user.id} has no access token")
                     continue
                 
-                # Get content template settings
-                content_templates = get_content_template_settings(user)
-                if not content_templates:
+                # Build the generation request from the user's content template
+                template_name, post_request = build_post_request_for_user(user)
+                if not post_request:
                     logging.warning(f"User {user.id} has no content templates")
                     continue
                 
-                # Pick the first available template (you can make this smarter)
-                template_name = next(iter(content_templates.keys()), "story")
-                template = content_templates[template_name]
-                
-                # Create post request from template with valid tone
-                raw_tone = template.get("tone", user.personality_type or "professional")
-                valid_tone = get_valid_tone(raw_tone)
-                
-                post_request = PostGenerateRequest(
-                    topic=template.get("topic", "Professional Growth"),
-                    industry=template.get("industry", user.industry or "General"),
-                    tone=valid_tone,
-                    post_type=template.get("post_type", "story"),
-                    post_length=template.get("post_length", 150),
-                    include_hashtags=template.get("include_hashtags", True),
-                    include_emojis=template.get("include_emojis", True)
-                )
-                
                 logging.info(f"Generating post for user {user.id} with template: {template_name}")
                 
+                try:
+                    usage_ledger.check_quota(user)
+                except QuotaExceededError as e:
+                    logging.warning(f"Skipping auto-posting for user {user.id}: {e.detail}")
+                    continue
+                
                 # Generate the content
-                content = generate_linkedin_post(post_request)
+                started = time.monotonic()
+                persona = persona_fragment(user)
+                content = generate_linkedin_post(post_request, user_id=user.id, persona=persona)
+                if content:
+                    content = ensure_publishable_draft(db, user, post_request, content, persona)
                 if not content:
                     logging.warning(f"Failed to generate post content for user {user.id}")
                     continue
@@ -202,9 +258,18 @@ def run_auto_posting(db: Session):
                 logging.info(f"Generated content for user {user.id}: {content[:100]}...")
                 
                 # Post to LinkedIn
-                success = post_linkedin_content(user.access_token, content)
-                if success:
+                generated = time.monotonic()
+                result = publish_linkedin_content(user.access_token, content)
+                post_history.record(
+                    user.id, content, result,
+                    template=template_name,
+                    prompt_version=PROMPT_VERSION,
+                    generation_ms=int((generated - started) * 1000),
+                    publish_ms=int((time.monotonic() - generated) * 1000)
+                )
+                if result["success"]:
                     logging.info(f"✅ Successfully posted to LinkedIn for user {user.id}")
+                    fingerprint_index.add(db, user.id, content)
                 else:
                     logging.error(f"❌ Failed to post to LinkedIn for user {user.id}")
             
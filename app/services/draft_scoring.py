@@ -0,0 +1,53 @@
+import re
+from typing import Dict, List, Optional
+from app.schemas.post_generator import PostGenerateRequest
+from app.services.topic_filter import compile_topics, find_topics
+
+HASHTAG_RE = re.compile(r"#\w+")
+EMOJI_RE = re.compile(
+    "[\U0001F300-\U0001FAFF\U00002600-\U000027BF\U0001F000-\U0001F2FF\U00002B00-\U00002BFF]"
+)
+
+# Relative weight of each check in the final score
+LENGTH_WEIGHT = 0.5
+HASHTAG_WEIGHT = 0.25
+EMOJI_WEIGHT = 0.25
+# A draft mentioning an avoided topic always ranks below every clean draft
+AVOID_TOPIC_PENALTY = 1.0
+
+def length_fit(word_count: int, target: int) -> float:
+    """1.0 at the requested length, falling linearly to 0 at 0 or 2x the target"""
+    if target <= 0:
+        return 1.0
+    return max(0.0, 1.0 - abs(word_count - target) / target)
+
+def score_draft(text: str, data: PostGenerateRequest, avoid_pattern: Optional[re.Pattern] = None) -> Dict:
+    """Cheap local quality checks for one draft"""
+    word_count = len([word for word in text.split() if not word.startswith("#")])
+    has_hashtags = bool(HASHTAG_RE.search(text))
+    has_emojis = bool(EMOJI_RE.search(text))
+    avoided_hits = find_topics(avoid_pattern, text)
+
+    fit = length_fit(word_count, data.post_length)
+    hashtags_ok = has_hashtags == bool(data.include_hashtags)
+    emojis_ok = has_emojis == bool(data.include_emojis)
+
+    score = LENGTH_WEIGHT * fit + HASHTAG_WEIGHT * hashtags_ok + EMOJI_WEIGHT * emojis_ok
+    if avoided_hits:
+        score -= AVOID_TOPIC_PENALTY
+
+    return {
+        "text": text,
+        "score": round(score, 3),
+        "word_count": word_count,
+        "length_fit": round(fit, 3),
+        "hashtags_ok": hashtags_ok,
+        "emojis_ok": emojis_ok,
+        "avoided_topics_hit": avoided_hits
+    }
+
+def rank_drafts(texts: List[str], data: PostGenerateRequest) -> List[Dict]:
+    """Score every draft and return them best first"""
+    pattern = compile_topics(data.avoid_topics or [])
+    scored = [score_draft(text, data, pattern) for text in texts if text]
+    return sorted(scored, key=lambda draft: draft["score"], reverse=True)
@@ -0,0 +1,224 @@
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.analytics import PostSnapshot, DailyEngagementRollup, WeeklyEngagementRollup
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_METRICS = ("likes", "comments", "shares", "impressions")
+
+def extract_post_text(post: Dict) -> str:
+    """Extract the post body from any of the LinkedIn post payload shapes"""
+    if isinstance(post.get("commentary"), str):
+        return post["commentary"]
+    if isinstance(post.get("content"), dict):
+        return post["content"].get("text", "")
+    if "text" in post:
+        return post["text"].get("text", "") if isinstance(post["text"], dict) else str(post["text"])
+    return ""
+
+def extract_post_created_ms(post: Dict) -> int:
+    """Extract the creation timestamp (epoch ms) from a LinkedIn post payload"""
+    if post.get("createdAt"):
+        return int(post["createdAt"])
+    if post.get("createdTime"):
+        return int(post["createdTime"])
+    created = post.get("created")
+    if isinstance(created, dict) and created.get("time"):
+        return int(created["time"])
+    return 0
+
+def week_start_for(day: date) -> date:
+    """Monday of the ISO week containing the given day"""
+    return day - timedelta(days=day.weekday())
+
+def engagement_rate(row: Dict) -> float:
+    """Engagement rate in percent for an aggregate of posts"""
+    impressions = row.get("impressions", 0)
+    if not impressions:
+        return 0
+    total_engagement = row.get("likes", 0) + row.get("comments", 0) + row.get("shares", 0)
+    return round((total_engagement / impressions) * 100, 2)
+
+def _add_delta(deltas: Dict[date, Dict[str, int]], bucket: date, delta: Dict[str, int], new_post: bool):
+    total = deltas.setdefault(bucket, {"posts": 0, **{metric: 0 for metric in ROLLUP_METRICS}})
+    if new_post:
+        total["posts"] += 1
+    for metric in ROLLUP_METRICS:
+        total[metric] += delta[metric]
+
+def _upsert_rollups(db: Session, model, user_id: int, bucket_column: str, deltas: Dict[date, Dict[str, int]]):
+    """Add the accumulated deltas to the rollup rows, inserting missing rows (one statement per bucket)"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    for bucket, delta in deltas.items():
+        if insert is None:
+            rollup = db.query(model).filter_by(user_id=user_id, **{bucket_column: bucket}).first()
+            if rollup is None:
+                rollup = model(user_id=user_id, **{bucket_column: bucket}, **{field: 0 for field in delta})
+                db.add(rollup)
+            for field, value in delta.items():
+                setattr(rollup, field, (getattr(rollup, field) or 0) + value)
+            db.flush()
+            continue
+
+        # Upsert: concurrent refreshes for the same user can't collide on the unique bucket index
+        statement = insert(model).values(user_id=user_id, **{bucket_column: bucket}, **delta)
+        columns = model.__table__.c
+        db.execute(statement.on_conflict_do_update(
+            index_elements=["user_id", bucket_column],
+            set_={field: func.coalesce(columns[field], 0) + statement.excluded[field] for field in delta}
+        ))
+
+def record_post_snapshots(db: Session, user_id: int, posts: List[Dict], post_stats: List[Dict]) -> int:
+    """
+    Store the latest stats for each post and fold the change since the previous
+    snapshot into the daily and weekly rollups. Returns the number of posts updated.
+    """
+    updated = 0
+    # Snapshots and rollup deltas touched in this call: the session doesn't autoflush,
+    # so a query can't see rows added earlier in the loop
+    snapshots: Dict[str, PostSnapshot] = {}
+    daily: Dict[date, Dict[str, int]] = {}
+    weekly: Dict[date, Dict[str, int]] = {}
+    try:
+        for i, post in enumerate(posts):
+            post_urn = post.get("id", "")
+            if not post_urn:
+                continue
+
+            stats = post_stats[i] if i < len(post_stats) else {}
+            current = {
+                "likes": stats.get("likeCount", 0),
+                "comments": stats.get("commentCount", 0),
+                "shares": stats.get("shareCount", 0),
+                "impressions": stats.get("impressionCount", 0),
+            }
+
+            snapshot = snapshots.get(post_urn) or db.query(PostSnapshot).filter(
+                PostSnapshot.user_id == user_id,
+                PostSnapshot.post_urn == post_urn
+            ).first()
+
+            new_post = snapshot is None
+            if new_post:
+                created_ms = extract_post_created_ms(post)
+                snapshot = PostSnapshot(
+                    user_id=user_id,
+                    post_urn=post_urn,
+                    post_created_at=datetime.fromtimestamp(created_ms / 1000, tz=timezone.utc).replace(tzinfo=None) if created_ms else None,
+                    text=extract_post_text(post),
+                    likes=0, comments=0, shares=0, impressions=0, clicks=0
+                )
+                db.add(snapshot)
+            snapshots[post_urn] = snapshot
+
+            delta = {metric: current[metric] - (getattr(snapshot, metric) or 0) for metric in ROLLUP_METRICS}
+
+            for metric in ROLLUP_METRICS:
+                setattr(snapshot, metric, current[metric])
+            snapshot.clicks = stats.get("clickCount", 0)
+            snapshot.captured_at = datetime.now(timezone.utc)
+
+            if snapshot.post_created_at and (new_post or any(delta.values())):
+                day = snapshot.post_created_at.date()
+                _add_delta(daily, day, delta, new_post)
+                _add_delta(weekly, week_start_for(day), delta, new_post)
+
+            updated += 1
+
+        db.flush()
+        _upsert_rollups(db, DailyEngagementRollup, user_id, "day", daily)
+        _upsert_rollups(db, WeeklyEngagementRollup, user_id, "week_start", weekly)
+        db.commit()
+        logger.info(f"Recorded {updated} post snapshots for user {user_id}")
+        return updated
+
+    except Exception as e:
+        logger.error(f"Error recording post snapshots for user {user_id}: {str(e)}")
+        db.rollback()
+        return 0
+
+def _totals(db: Session, model, user_id: int, column, start: date, end: date) -> Dict:
+    row = db.query(
+        func.coalesce(func.sum(model.posts), 0),
+        func.coalesce(func.sum(model.likes), 0),
+        func.coalesce(func.sum(model.comments), 0),
+        func.coalesce(func.sum(model.shares), 0),
+        func.coalesce(func.sum(model.impressions), 0),
+    ).filter(model.user_id == user_id, column >= start, column <= end).one()
+
+    totals = dict(zip(("posts",) + ROLLUP_METRICS, (int(value) for value in row)))
+    totals["engagement_rate"] = engagement_rate(totals)
+    return totals
+
+def _serialize_rollup(rollup, bucket: date) -> Dict:
+    row = {"date": bucket.isoformat(), "posts": rollup.posts}
+    row.update({metric: getattr(rollup, metric) for metric in ROLLUP_METRICS})
+    row["engagement_rate"] = engagement_rate(row)
+    return row
+
+def get_rollup_series(db: Session, user_id: int, start: date, end: date, granularity: str = "daily") -> Dict:
+    """Return per-bucket rollups and range totals between start and end (inclusive)"""
+    if granularity == "weekly":
+        model, column = WeeklyEngagementRollup, WeeklyEngagementRollup.week_start
+        start = week_start_for(start)
+    else:
+        model, column = DailyEngagementRollup, DailyEngagementRollup.day
+
+    rows = db.query(model).filter(
+        model.user_id == user_id, column >= start, column <= end
+    ).order_by(column).all()
+
+    return {
+        "granularity": granularity,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "series": [_serialize_rollup(row, getattr(row, column.key)) for row in rows],
+        "totals": _totals(db, model, user_id, column, start, end),
+    }
+
+def _percent_change(current: float, previous: float) -> Optional[float]:
+    if not previous:
+        return None
+    return round(((current - previous) / previous) * 100, 2)
+
+def compare_periods(db: Session, user_id: int, start: Optional[date] = None, end: Optional[date] = None) -> Dict:
+    """
+    Compare a period against the preceding period of equal length.
+    Without explicit dates, compares the current week to the previous week.
+    """
+    if start is None or end is None:
+        current_week = week_start_for(datetime.now(timezone.utc).date())
+        previous_week = current_week - timedelta(days=7)
+        model, column = WeeklyEngagementRollup, WeeklyEngagementRollup.week_start
+        current = _totals(db, model, user_id, column, current_week, current_week)
+        previous = _totals(db, model, user_id, column, previous_week, previous_week)
+        current_range = (current_week, current_week + timedelta(days=6))
+        previous_range = (previous_week, previous_week + timedelta(days=6))
+    else:
+        length = (end - start).days + 1
+        previous_end = start - timedelta(days=1)
+        previous_start = previous_end - timedelta(days=length - 1)
+        model, column = DailyEngagementRollup, DailyEngagementRollup.day
+        current = _totals(db, model, user_id, column, start, end)
+        previous = _totals(db, model, user_id, column, previous_start, previous_end)
+        current_range = (start, end)
+        previous_range = (previous_start, previous_end)
+
+    return {
+        "current": {"start": current_range[0].isoformat(), "end": current_range[1].isoformat(), **current},
+        "previous": {"start": previous_range[0].isoformat(), "end": previous_range[1].isoformat(), **previous},
+        "change_percent": {
+            key: _percent_change(current[key], previous[key])
+            for key in ("posts",) + ROLLUP_METRICS + ("engagement_rate",)
+        }
+    }
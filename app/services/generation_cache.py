@@ -0,0 +1,171 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+from app.models.database import SessionLocal
+from app.models.generation import GenerationCacheEntry
+from app.schemas.post_generator import PostGenerateRequest
+
+logger = logging.getLogger(__name__)
+
+GENERATION_CACHE_MAX_KEYS = int(os.getenv("GENERATION_CACHE_MAX_KEYS", "512"))
+GENERATION_CACHE_POOL_SIZE = int(os.getenv("GENERATION_CACHE_POOL_SIZE", "5"))
+GENERATION_CACHE_TTL_DAYS = int(os.getenv("GENERATION_CACHE_TTL_DAYS", "7"))
+
+def _normalize_text(value: str) -> str:
+    return " ".join((value or "").split()).casefold()
+
+def normalize_request(data: PostGenerateRequest) -> Dict:
+    """The request fields that determine the generated post, in canonical form"""
+    normalized = {
+        "topic": _normalize_text(data.topic),
+        "industry": _normalize_text(data.industry),
+        "tone": data.tone,
+        "post_type": data.post_type,
+        "post_length": data.post_length,
+        "include_hashtags": bool(data.include_hashtags),
+        "include_emojis": bool(data.include_emojis),
+    }
+    if data.avoid_topics:
+        normalized["avoid_topics"] = sorted({_normalize_text(topic) for topic in data.avoid_topics if topic})
+    return normalized
+
+def cache_key(data: PostGenerateRequest, prompt_version: str) -> str:
+    payload = json.dumps({"v": prompt_version, **normalize_request(data)}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def is_cacheable(data: PostGenerateRequest) -> bool:
+    """Personalized requests are never shared between users"""
+    return not (data.short_description and data.short_description.strip())
+
+def _naive_utc(value: datetime) -> datetime:
+    # SQLite hands back naive UTC, PostgreSQL aware datetimes
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+PoolEntry = Tuple[str, datetime]
+
+class GenerationCache:
+    """
+    Two-tier cache of generated posts: an in-memory LRU of variant pools in front
+    of the generation_cache_entries table. A key is served as soon as its pool
+    has one entry; callers top the pool up to POOL_SIZE in the background
+    (claim_fill) and lookups rotate through what is there. Identical texts count
+    towards the pool, so deterministic providers fill it too. Entries expire
+    after GENERATION_CACHE_TTL_DAYS in both tiers.
+    """
+
+    def __init__(self, max_keys: int = GENERATION_CACHE_MAX_KEYS, pool_size: int = GENERATION_CACHE_POOL_SIZE,
+                 ttl: timedelta = timedelta(days=GENERATION_CACHE_TTL_DAYS)):
+        self.max_keys = max_keys
+        self.pool_size = pool_size
+        self.ttl = ttl
+        self._pools: "OrderedDict[str, List[PoolEntry]]" = OrderedDict()
+        self._cursors: Dict[str, int] = {}
+        self._filling: Set[str] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _now(self) -> datetime:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def _fresh(self, pool: List[PoolEntry]) -> List[PoolEntry]:
+        cutoff = self._now() - self.ttl
+        return [entry for entry in pool if entry[1] >= cutoff]
+
+    def _remember(self, key: str, pool: List[PoolEntry]):
+        self._pools[key] = pool
+        self._pools.move_to_end(key)
+        while len(self._pools) > self.max_keys:
+            evicted, _ = self._pools.popitem(last=False)
+            self._cursors.pop(evicted, None)
+
+    def _load_pool(self, key: str) -> List[PoolEntry]:
+        with self._lock:
+            if key in self._pools:
+                self._pools.move_to_end(key)
+                return self._pools[key]
+
+        db = SessionLocal()
+        try:
+            cutoff = self._now() - self.ttl
+            rows = db.query(GenerationCacheEntry.content, GenerationCacheEntry.created_at).filter(
+                GenerationCacheEntry.cache_key == key,
+                GenerationCacheEntry.created_at >= cutoff
+            ).order_by(GenerationCacheEntry.created_at.desc()).limit(self.pool_size).all()
+            pool = [(row.content, _naive_utc(row.created_at)) for row in rows]
+        except Exception as e:
+            logger.error(f"Error loading generation cache pool: {str(e)}")
+            pool = []
+        finally:
+            db.close()
+
+        with self._lock:
+            self._remember(key, pool)
+            return pool
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Return the next pooled variant, or None when the key has no fresh entries"""
+        self._load_pool(key)
+        with self._lock:
+            pool = self._fresh(self._pools.get(key, []))
+            self._remember(key, pool)
+            if not pool:
+                self.misses += 1
+                return None
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            self.hits += 1
+            return pool[cursor % len(pool)][0]
+
+    def claim_fill(self, key: str) -> bool:
+        """True if the caller should generate one more variant for the key (one fill per key at a time)"""
+        with self._lock:
+            pool = self._fresh(self._pools.get(key, []))
+            if len(pool) >= self.pool_size or key in self._filling:
+                return False
+            self._filling.add(key)
+            return True
+
+    def release_fill(self, key: str):
+        with self._lock:
+            self._filling.discard(key)
+
+    def store(self, key: str, prompt_version: str, content: str):
+        """Add a fresh completion to the key's variant pool (memory and persistent tier)"""
+        with self._lock:
+            self._filling.discard(key)
+            if not content:
+                return
+            pool = self._fresh(self._pools.get(key, []))
+            if len(pool) >= self.pool_size:
+                return
+            self._remember(key, pool + [(content, self._now())])
+
+        db = SessionLocal()
+        try:
+            db.add(GenerationCacheEntry(cache_key=key, prompt_version=prompt_version, content=content))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error persisting generation cache entry: {str(e)}")
+        finally:
+            db.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "keys": len(self._pools),
+                "hits": self.hits,
+                "misses": self.misses,
+                "filling": len(self._filling),
+                "pool_size": self.pool_size
+            }
+
+generation_cache = GenerationCache()
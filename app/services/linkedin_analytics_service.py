@@ -2,12 +2,34 @@ import requests
 import logging
 import json
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Union
 from sqlalchemy.orm import Session
 from app.models.user import User
+from app.services.engagement_rollup_service import record_post_snapshots
+from app.services.network_growth_service import record_network_sample
 
 logger = logging.getLogger(__name__)
 
+# LinkedIn caps a single posts page at 100 elements
+MAX_PAGE_SIZE = 100
+
+class AnalyticsContext:
+    """
+    Request-scoped state for one analytics operation. The caller's LinkedIn
+    identity is resolved at most once and shared by every service call that
+    receives this context.
+    """
+    
+    def __init__(self, access_token: str):
+        self.access_token = access_token
+        self._identity: Optional[Dict] = None
+    
+    @property
+    def identity_resolved(self) -> bool:
+        return self._identity is not None
+
+TokenOrContext = Union[str, AnalyticsContext]
+
 class LinkedInAnalyticsService:
     """
     LinkedIn Analytics & Performance Tracking Service
@@ -16,56 +38,118 @@ class LinkedInAnalyticsService:
     def __init__(self):
         self.base_url = "https://api.linkedin.com"
     
-    def get_user_posts(self, access_token: str, count: int = 50) -> List[Dict]:
-        """Get user's recent posts using correct API endpoint"""
-        # First get the user's profile URN
-        profile_urn = self.get_user_profile_urn(access_token)
+    def context(self, access_token: str) -> AnalyticsContext:
+        """Create a context to share identity lookups across one operation"""
+        return AnalyticsContext(access_token)
+    
+    def _as_context(self, ctx: TokenOrContext) -> AnalyticsContext:
+        return ctx if isinstance(ctx, AnalyticsContext) else AnalyticsContext(ctx)
+    
+    def _auth_headers(self, ctx: AnalyticsContext) -> Dict:
+        return {
+            "Authorization": f"Bearer {ctx.access_token}",
+            "Content-Type": "application/json"
+        }
+    
+    def _resolve_identity(self, ctx: AnalyticsContext) -> Dict:
+        """Fetch /v2/people/~ once per context; failures are cached as an empty identity"""
+        if ctx.identity_resolved:
+            return ctx._identity
+        
+        url = f"{self.base_url}/v2/people/~"
+        
+        try:
+            response = requests.get(url, headers=self._auth_headers(ctx))
+            if response.status_code == 200:
+                ctx._identity = response.json()
+            else:
+                logger.warning(f"Could not resolve LinkedIn identity: {response.status_code}")
+                ctx._identity = {}
+        except Exception as e:
+            logger.error(f"Error getting user profile: {e}")
+            ctx._identity = {}
+        
+        return ctx._identity
+    
+    def get_user_posts_page(self, ctx: TokenOrContext, start: int = 0, count: int = 50) -> Dict:
+        """Get a single page of the user's posts following LinkedIn's start/count paging"""
+        ctx = self._as_context(ctx)
+        profile_urn = self.get_user_profile_urn(ctx)
         if not profile_urn:
-            return []
+            return {"elements": [], "start": start, "next_start": None}
         
         # Use the correct endpoint for user posts
         url = f"{self.base_url}/v2/posts"
         
         headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json",
+            **self._auth_headers(ctx),
             "X-Restli-Protocol-Version": "2.0.0"
         }
         
+        count = max(1, min(count, MAX_PAGE_SIZE))
         params = {
             "q": "author",
             "author": profile_urn,
             "sortBy": "CREATED_TIME",
-            "count": min(count, 100)  # LinkedIn limits to 100
+            "start": start,
+            "count": count
         }
         
         try:
             response = requests.get(url, headers=headers, params=params)
-            logger.info(f"User posts API response: {response.status_code}")
+            logger.info(f"User posts API response: {response.status_code} (start={start}, count={count})")
             
             if response.status_code == 200:
                 data = response.json()
-                return data.get("elements", [])
+                elements = data.get("elements", [])
+                total = data.get("paging", {}).get("total")
+                
+                # A short page, or reaching the reported total, ends the history
+                has_more = len(elements) == count and (total is None or start + count < total)
+                return {
+                    "elements": elements,
+                    "start": start,
+                    "total": total,
+                    "next_start": start + len(elements) if has_more else None
+                }
             else:
                 logger.error(f"Failed to get user posts: {response.status_code} {response.text}")
-                return []
+                return {"elements": [], "start": start, "next_start": None}
                 
         except Exception as e:
             logger.error(f"Exception getting user posts: {e}")
-            return []
+            return {"elements": [], "start": start, "next_start": None}
+    
+    def iter_user_posts(self, ctx: TokenOrContext, page_size: int = MAX_PAGE_SIZE, start: int = 0) -> Iterator[List[Dict]]:
+        """Yield the user's full post history page by page without materializing it"""
+        ctx = self._as_context(ctx)
+        if not self.get_user_profile_urn(ctx):
+            return
+        
+        next_start = start
+        while next_start is not None:
+            page = self.get_user_posts_page(ctx, start=next_start, count=page_size)
+            if page["elements"]:
+                yield page["elements"]
+            next_start = page["next_start"]
     
-    def get_post_statistics(self, access_token: str, post_urn: str) -> Dict:
+    def get_user_posts(self, ctx: TokenOrContext, count: int = 50) -> List[Dict]:
+        """Get user's most recent posts, paging past LinkedIn's per-request limit when needed"""
+        posts = []
+        for page in self.iter_user_posts(ctx, page_size=min(count, MAX_PAGE_SIZE)):
+            posts.extend(page[:count - len(posts)])
+            if len(posts) >= count:
+                break
+        return posts
+    
+    def get_post_statistics(self, ctx: TokenOrContext, post_urn: str) -> Dict:
         """Get statistics for a specific post"""
+        ctx = self._as_context(ctx)
         # Use the correct endpoint for post statistics
         url = f"{self.base_url}/v2/socialActions/{post_urn}"
         
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
-        
         try:
-            response = requests.get(url, headers=headers)
+            response = requests.get(url, headers=self._auth_headers(ctx))
             
             if response.status_code == 200:
                 data = response.json()
@@ -84,59 +168,26 @@ class LinkedInAnalyticsService:
             logger.warning(f"Exception getting post stats: {e}")
             return {}
     
-    def get_user_profile_urn(self, access_token: str) -> str:
-        """Get user's profile URN"""
-        url = f"{self.base_url}/v2/people/~"
-        
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
-        
-        try:
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                profile = response.json()
-                return f"urn:li:person:{profile.get('id', '')}"
-            return ""
-        except Exception as e:
-            logger.error(f"Error getting user profile: {e}")
-            return ""
-    
-    def get_user_id(self, access_token: str) -> str:
+    def get_user_id(self, ctx: TokenOrContext) -> str:
         """Get user's LinkedIn ID"""
-        url = f"{self.base_url}/v2/people/~"
-        
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
-        
-        try:
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                profile = response.json()
-                return profile.get("id", "")
-            return ""
-        except Exception as e:
-            logger.error(f"Error getting user ID: {e}")
-            return ""
+        return self._resolve_identity(self._as_context(ctx)).get("id", "")
     
-    def get_profile_analytics(self, access_token: str) -> Dict:
+    def get_user_profile_urn(self, ctx: TokenOrContext) -> str:
+        """Get user's profile URN"""
+        user_id = self.get_user_id(ctx)
+        return f"urn:li:person:{user_id}" if user_id else ""
+    
+    def get_profile_analytics(self, ctx: TokenOrContext) -> Dict:
         """Get profile analytics data"""
-        profile_urn = self.get_user_profile_urn(access_token)
+        ctx = self._as_context(ctx)
+        profile_urn = self.get_user_profile_urn(ctx)
         if not profile_urn:
             return {}
         
         url = f"{self.base_url}/v2/networkSizes/{profile_urn}"
         
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
-        
         try:
-            response = requests.get(url, headers=headers)
+            response = requests.get(url, headers=self._auth_headers(ctx))
             if response.status_code == 200:
                 data = response.json()
                 return {
@@ -199,7 +250,7 @@ class LinkedInAnalyticsService:
         best_post = max(enriched_posts, key=lambda x: x["engagement_rate"]) if enriched_posts else None
         
         # Analyze posting patterns
-        posting_hours = [datetime.fromtimestamp(p["created_time"] / 1000).hour for p in enriched_posts if p["created_time"]]
+        posting_hours = [datetime.fromtimestamp(p["created_time"] / 1000, tz=timezone.utc).hour for p in enriched_posts if p["created_time"]]
         best_hours = self._find_best_posting_hours(enriched_posts)
         
         return {
@@ -227,13 +278,13 @@ class LinkedInAnalyticsService:
             "recommendations": self._generate_recommendations(enriched_posts, avg_engagement_rate)
         }
     
-    def _find_best_posting_hours(self, posts: List[Dict]) -> List[int]:
-        """Find the hours that generate the best engagement"""
+    def _find_best_posting_hours(self, posts: List[Dict], utc_offset: timedelta = timedelta(0)) -> List[int]:
+        """Find the hours (UTC unless an offset is given) that generate the best engagement"""
         hour_performance = {}
         
         for post in posts:
             if post["created_time"]:
-                hour = datetime.fromtimestamp(post["created_time"] / 1000).hour
+                hour = (datetime.fromtimestamp(post["created_time"] / 1000, tz=timezone.utc) + utc_offset).hour
                 if hour not in hour_performance:
                     hour_performance[hour] = {"total_engagement": 0, "post_count": 0}
                 
@@ -298,9 +349,10 @@ def get_user_analytics(db: Session, user: User) -> Dict:
             return {"success": False, "error": "No LinkedIn access token"}
         
         analytics_service = LinkedInAnalyticsService()
+        ctx = analytics_service.context(user.access_token)
         
         # Get user's posts
-        posts = analytics_service.get_user_posts(user.access_token, count=20)
+        posts = analytics_service.get_user_posts(ctx, count=20)
         
         if not posts:
             return {
@@ -313,11 +365,15 @@ def get_user_analytics(db: Session, user: User) -> Dict:
         post_stats = []
         for post in posts:
             post_urn = post.get("id", "")
-            stats = analytics_service.get_post_statistics(user.access_token, post_urn)
+            stats = analytics_service.get_post_statistics(ctx, post_urn)
             post_stats.append(stats)
         
+        # Fold the fresh stats into the stored snapshots and rollups
+        record_post_snapshots(db, user.id, posts, post_stats)
+        
         # Get profile analytics
-        profile_analytics = analytics_service.get_profile_analytics(user.access_token)
+        profile_analytics = analytics_service.get_profile_analytics(ctx)
+        record_network_sample(db, user.id, profile_analytics)
         
         # Analyze performance
         analysis = analytics_service.analyze_post_performance(posts, post_stats)
@@ -141,7 +141,8 @@ def create_linkedin_post_new_api(access_token: str, content: str) -> dict:
         
         if response.status_code in [200, 201]:
             logging.info("✅ LinkedIn post SUCCESS with new REST API!")
-            result["post_id"] = response.json().get("id") if response.text else None
+            # /rest/posts answers 201 with an empty body and the URN in a header
+            result["post_id"] = response.headers.get("x-restli-id") or (response.json().get("id") if response.text else None)
         elif response.status_code == 401:
             result["error"] = "Access token invalid or expired"
         elif response.status_code == 403:
@@ -205,15 +206,19 @@ def create_linkedin_post_legacy_api(access_token: str, content: str) -> dict:
             "success": response.status_code == 201,
             "status_code": response.status_code,
             "response_text": response.text,
-            "url_used": url
+            "url_used": url,
+            "post_id": response.headers.get("x-restli-id") if response.status_code == 201 else None
         }
         
     except Exception as e:
         logging.error(f"❌ Exception in legacy API: {e}")
         return {"success": False, "error": str(e)}
 
-def post_linkedin_content(access_token: str, content: str) -> bool:
-    """Main posting function - tries new API first, then legacy"""
+def publish_linkedin_content(access_token: str, content: str) -> dict:
+    """
+    Main posting function - tries new API first, then legacy.
+    Returns success, the LinkedIn post id and which API path published it.
+    """
     
     logging.info("🚀 Starting LinkedIn post with updated API endpoints...")
     
@@ -222,7 +227,7 @@ def post_linkedin_content(access_token: str, content: str) -> bool:
     
     if result.get("success"):
         logging.info("✅ SUCCESS with new REST API!")
-        return True
+        return {"success": True, "post_id": result.get("post_id"), "api_path": "rest/posts"}
     
     logging.info("❌ New REST API failed, trying legacy API...")
     
@@ -231,14 +236,19 @@ def post_linkedin_content(access_token: str, content: str) -> bool:
     
     if legacy_result.get("success"):
         logging.info("✅ SUCCESS with legacy API!")
-        return True
+        return {"success": True, "post_id": legacy_result.get("post_id"), "api_path": "v2/ugcPosts"}
     
     # Both failed
     logging.error("❌ Both new and legacy APIs failed")
     logging.error(f"New API result: {result}")
     logging.error(f"Legacy API result: {legacy_result}")
     
-    return False
+    return {
+        "success": False,
+        "post_id": None,
+        "api_path": None,
+        "error": legacy_result.get("error") or result.get("error") or f"LinkedIn returned {legacy_result.get('status_code')}"
+    }
 
 def try_simple_text_post(access_token: str, content: str) -> dict:
     """Try simple text post for debugging"""
@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
+from app.services.llm_providers import LLMProvider, LLMResult, create_provider
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gpt-4o-mini"
+LLM_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "30"))
+LLM_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "20"))
+LLM_MAX_CONCURRENCY_PER_USER = int(os.getenv("LLM_MAX_CONCURRENCY_PER_USER", "2"))
+# How long a call may wait for a free slot before it is rejected
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+# Slots that low-priority (batch) work may never take, kept free for interactive calls
+LLM_INTERACTIVE_RESERVE = int(os.getenv("LLM_INTERACTIVE_RESERVE", "5"))
+# Batch work may queue much longer than interactive requests
+LLM_LOW_PRIORITY_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_LOW_PRIORITY_QUEUE_TIMEOUT_SECONDS", "600"))
+# "openai" or "local" (deterministic templates, no network)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
+# Optional degraded mode: serve from this provider when the primary one fails
+LLM_FALLBACK_PROVIDER = os.getenv("LLM_FALLBACK_PROVIDER", "")
+
+PRIORITY_NORMAL = "normal"
+PRIORITY_LOW = "low"
+
+class LLMBusyError(Exception):
+    """Raised when no generation slot frees up within the queue timeout"""
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+class ConcurrencyLimiter:
+    """
+    Global and per-user in-flight limits shared by sync callers (threads) and
+    async callers (event loop), so one budget covers every generation path.
+    Threads wait on a condition; async callers wait on a future that the
+    releasing thread resolves on the caller's loop, so nothing polls.
+    """
+
+    def __init__(self, max_total: int, max_per_user: int, interactive_reserve: int = 0):
+        self.max_total = max_total
+        self.max_per_user = max_per_user
+        self.low_priority_limit = max(1, max_total - interactive_reserve)
+        self._in_flight = 0
+        self._per_user: Dict[int, int] = {}
+        self._condition = threading.Condition()
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def _try_acquire(self, user_id: Optional[int], priority: str = PRIORITY_NORMAL) -> bool:
+        with self._condition:
+            limit = self.low_priority_limit if priority == PRIORITY_LOW else self.max_total
+            if self._in_flight >= limit:
+                return False
+            if user_id is not None and self._per_user.get(user_id, 0) >= self.max_per_user:
+                return False
+            self._in_flight += 1
+            if user_id is not None:
+                self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+            return True
+
+    def _release(self, user_id: Optional[int]):
+        with self._condition:
+            self._in_flight -= 1
+            if user_id is not None:
+                remaining = self._per_user.get(user_id, 1) - 1
+                if remaining > 0:
+                    self._per_user[user_id] = remaining
+                else:
+                    self._per_user.pop(user_id, None)
+            self._condition.notify_all()
+            # Every async waiter re-checks the limits, like the notified threads
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # The waiter's loop is closed; nobody is left to wake
+                pass
+
+    @contextmanager
+    def slot(self, user_id: Optional[int] = None, timeout: float = LLM_QUEUE_TIMEOUT_SECONDS,
+             priority: str = PRIORITY_NORMAL):
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while not self._try_acquire(user_id, priority):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LLMBusyError("rate_limit: too many concurrent generations")
+                self._condition.wait(remaining)
+        try:
+            yield
+        finally:
+            self._release(user_id)
+
+    def _acquire_or_wait(self, user_id: Optional[int], priority: str, loop: asyncio.AbstractEventLoop) -> Optional[asyncio.Future]:
+        """Take a slot (None), or register a waiter in the same critical section so no release is missed"""
+        with self._condition:
+            if self._try_acquire(user_id, priority):
+                return None
+            waiter = loop.create_future()
+            self._async_waiters.append((loop, waiter))
+            return waiter
+
+    def _discard_waiter(self, waiter: asyncio.Future):
+        with self._condition:
+            self._async_waiters = [entry for entry in self._async_waiters if entry[1] is not waiter]
+
+    @asynccontextmanager
+    async def async_slot(self, user_id: Optional[int] = None, timeout: float = LLM_QUEUE_TIMEOUT_SECONDS,
+                         priority: str = PRIORITY_NORMAL):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            waiter = self._acquire_or_wait(user_id, priority, loop)
+            if waiter is None:
+                break
+            try:
+                await asyncio.wait_for(waiter, max(0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                raise LLMBusyError("rate_limit: too many concurrent generations")
+            finally:
+                self._discard_waiter(waiter)
+        try:
+            yield
+        finally:
+            self._release(user_id)
+
+    def stats(self) -> Dict:
+        with self._condition:
+            return {
+                "in_flight": self._in_flight,
+                "max_total": self.max_total,
+                "max_per_user": self.max_per_user,
+                "low_priority_limit": self.low_priority_limit,
+                "users_in_flight": len(self._per_user),
+                "async_waiting": len(self._async_waiters)
+            }
+
+class LLMGateway:
+    """
+    Single entry point for every LLM call: a pluggable provider (plus optional
+    fallback), global/per-user concurrency limits and usage accounting.
+    """
+
+    def __init__(self, provider: str = LLM_PROVIDER, fallback: str = LLM_FALLBACK_PROVIDER):
+        self.provider = create_provider(provider, LLM_TIMEOUT_SECONDS, LLM_MAX_RETRIES)
+        self.fallback: Optional[LLMProvider] = (
+            create_provider(fallback, LLM_TIMEOUT_SECONDS, LLM_MAX_RETRIES)
+            if fallback and fallback != provider else None
+        )
+        self.fallback_count = 0
+        self.limiter = ConcurrencyLimiter(LLM_MAX_CONCURRENCY, LLM_MAX_CONCURRENCY_PER_USER, LLM_INTERACTIVE_RESERVE)
+        # Process-wide totals per (feature, model); per-user usage lives in the usage ledger
+        self._usage: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._usage_lock = threading.Lock()
+
+    def _use_fallback(self, feature: str, error: Exception) -> bool:
+        if self.fallback is None:
+            return False
+        self.fallback_count += 1
+        logger.warning(f"LLM provider {self.provider.name} failed for {feature}, using {self.fallback.name}: {str(error)}")
+        return True
+
+    def _record_usage(self, user_id: Optional[int], feature: str, model: str, usage: Dict[str, int]):
+        key = (feature, model)
+        with self._usage_lock:
+            totals = self._usage.setdefault(key, {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0})
+            totals["requests"] += 1
+            totals["prompt_tokens"] += usage.get("prompt_tokens", 0)
+            totals["completion_tokens"] += usage.get("completion_tokens", 0)
+            totals["cached_tokens"] += usage.get("cached_tokens", 0)
+        
+        from app.services.usage_ledger import usage_ledger
+        usage_ledger.record(user_id, feature, usage)
+        logger.info(
+            f"LLM usage user={user_id} feature={feature} model={model} "
+            f"prompt={usage.get('prompt_tokens', 0)} cached={usage.get('cached_tokens', 0)} "
+            f"completion={usage.get('completion_tokens', 0)}"
+        )
+
+    def complete(self, messages: List[Dict], *, feature: str, user_id: Optional[int] = None,
+                 model: str = DEFAULT_MODEL, priority: str = PRIORITY_NORMAL, **params) -> LLMResult:
+        """
+        Blocking completion for sync callers (scheduler threads, sync routes).
+        Low-priority calls leave LLM_INTERACTIVE_RESERVE slots free and may queue longer.
+        """
+        timeout = LLM_LOW_PRIORITY_QUEUE_TIMEOUT_SECONDS if priority == PRIORITY_LOW else LLM_QUEUE_TIMEOUT_SECONDS
+        with self.limiter.slot(user_id, timeout=timeout, priority=priority):
+            try:
+                result = self.provider.complete(messages, model, **params)
+            except Exception as e:
+                if not self._use_fallback(feature, e):
+                    raise
+                result = self.fallback.complete(messages, model, **params)
+        self._record_usage(user_id, feature, model, result.usage)
+        return result
+
+    async def acomplete(self, messages: List[Dict], *, feature: str, user_id: Optional[int] = None,
+                        model: str = DEFAULT_MODEL, priority: str = PRIORITY_NORMAL, **params) -> LLMResult:
+        """Non-blocking completion for async routes (same priority rules as complete)"""
+        timeout = LLM_LOW_PRIORITY_QUEUE_TIMEOUT_SECONDS if priority == PRIORITY_LOW else LLM_QUEUE_TIMEOUT_SECONDS
+        async with self.limiter.async_slot(user_id, timeout=timeout, priority=priority):
+            try:
+                result = await self.provider.acomplete(messages, model, **params)
+            except Exception as e:
+                if not self._use_fallback(feature, e):
+                    raise
+                result = await self.fallback.acomplete(messages, model, **params)
+        self._record_usage(user_id, feature, model, result.usage)
+        return result
+
+    async def astream(self, messages: List[Dict], *, feature: str, user_id: Optional[int] = None,
+                      model: str = DEFAULT_MODEL, priority: str = PRIORITY_NORMAL, **params) -> AsyncIterator[Union[str, LLMResult]]:
+        """Yield text deltas as they arrive, then a final LLMResult carrying the usage"""
+        timeout = LLM_LOW_PRIORITY_QUEUE_TIMEOUT_SECONDS if priority == PRIORITY_LOW else LLM_QUEUE_TIMEOUT_SECONDS
+        async with self.limiter.async_slot(user_id, timeout=timeout, priority=priority):
+            events = self.provider.astream(messages, model, **params)
+            result = None
+            started = False
+            chunks: List[str] = []
+            try:
+                try:
+                    async for event in events:
+                        if isinstance(event, LLMResult):
+                            result = event
+                            break
+                        started = True
+                        chunks.append(event)
+                        yield event
+                except Exception as e:
+                    # Only switch providers before any text reached the client
+                    if started or not self._use_fallback(feature, e):
+                        raise
+                    result = await self.fallback.acomplete(messages, model, **params)
+                    yield result.text
+            finally:
+                await events.aclose()
+
+        if result is None:
+            # The provider stream ended without its usage event; meter an estimate instead
+            from app.services.token_budget import count_message_tokens, count_tokens
+            text = "".join(chunks)
+            usage = {"prompt_tokens": count_message_tokens(messages, model), "completion_tokens": count_tokens(text, model)}
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            logger.warning(f"LLM stream for {feature} ended without usage, recording an estimate")
+            result = LLMResult(texts=[text], usage=usage, model=model, provider=self.provider.name)
+
+        self._record_usage(user_id, feature, model, result.usage)
+        yield result
+
+    def usage_summary(self) -> List[Dict]:
+        """Accumulated usage per (feature, model) since process start"""
+        with self._usage_lock:
+            return [
+                {"feature": feature, "model": model, **totals}
+                for (feature, model), totals in self._usage.items()
+            ]
+
+    def stats(self) -> Dict:
+        return {
+            "provider": self.provider.name,
+            "fallback_provider": self.fallback.name if self.fallback else None,
+            "fallbacks": self.fallback_count,
+            "concurrency": self.limiter.stats(),
+            "usage": self.usage_summary()
+        }
+
+gateway = LLMGateway()
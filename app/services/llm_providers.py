@@ -0,0 +1,210 @@
+import hashlib
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Union
+
+@dataclass
+class LLMResult:
+    texts: List[str]
+    usage: Dict[str, int] = field(default_factory=dict)
+    model: str = ""
+    provider: str = "openai"
+
+    @property
+    def text(self) -> str:
+        return self.texts[0] if self.texts else ""
+
+def _usage_dict(usage) -> Dict[str, int]:
+    if usage is None:
+        return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cached_tokens": 0}
+    # Prompt tokens served from the provider's prefix cache
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens or 0,
+        "completion_tokens": usage.completion_tokens or 0,
+        "total_tokens": usage.total_tokens or 0,
+        "cached_tokens": (getattr(details, "cached_tokens", 0) or 0) if details else 0
+    }
+
+class LLMProvider:
+    """Backend that turns chat messages into completions; the gateway adds limits and accounting"""
+
+    name = "base"
+
+    def complete(self, messages: List[Dict], model: str, **params) -> LLMResult:
+        raise NotImplementedError
+
+    async def acomplete(self, messages: List[Dict], model: str, **params) -> LLMResult:
+        raise NotImplementedError
+
+    async def astream(self, messages: List[Dict], model: str, **params) -> AsyncIterator[Union[str, LLMResult]]:
+        """Yield text deltas, then a final LLMResult"""
+        raise NotImplementedError
+        yield
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    def __init__(self, timeout: float, max_retries: int):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._client = None
+        self._async_client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from openai import OpenAI
+                    self._client = OpenAI(
+                        api_key=os.getenv("OPENAI_API_KEY"),
+                        timeout=self.timeout,
+                        max_retries=self.max_retries
+                    )
+        return self._client
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            with self._client_lock:
+                if self._async_client is None:
+                    from openai import AsyncOpenAI
+                    self._async_client = AsyncOpenAI(
+                        api_key=os.getenv("OPENAI_API_KEY"),
+                        timeout=self.timeout,
+                        max_retries=self.max_retries
+                    )
+        return self._async_client
+
+    def _to_result(self, response, model: str) -> LLMResult:
+        texts = [(choice.message.content or "").strip() for choice in response.choices]
+        return LLMResult(texts=texts, usage=_usage_dict(response.usage), model=model, provider=self.name)
+
+    def complete(self, messages: List[Dict], model: str, **params) -> LLMResult:
+        response = self.client.chat.completions.create(model=model, messages=messages, **params)
+        return self._to_result(response, model)
+
+    async def acomplete(self, messages: List[Dict], model: str, **params) -> LLMResult:
+        response = await self.async_client.chat.completions.create(model=model, messages=messages, **params)
+        return self._to_result(response, model)
+
+    async def astream(self, messages: List[Dict], model: str, **params) -> AsyncIterator[Union[str, LLMResult]]:
+        stream = await self.async_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+            **params
+        )
+        parts = []
+        usage = None
+        try:
+            async for chunk in stream:
+                if chunk.choices:
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+                if chunk.usage:
+                    usage = chunk.usage
+        finally:
+            # Drops the upstream connection if the consumer stops early
+            await stream.close()
+
+        yield LLMResult(texts=["".join(parts).strip()], usage=_usage_dict(usage), model=model, provider=self.name)
+
+FIELD_RE = re.compile(r"^- ([A-Za-z ]+): (.+)$", re.MULTILINE)
+LENGTH_RE = re.compile(r"(\d+)")
+
+OPENERS = [
+    "Here's something I keep coming back to about {topic}.",
+    "A quick lesson on {topic} from the {industry} trenches.",
+    "Let's talk about {topic}.",
+    "{topic} is changing faster than most of us in {industry} expected.",
+]
+FILLER = [
+    "The teams that get this right start small and stay consistent.",
+    "It rarely comes down to tools; it comes down to habits.",
+    "Measure what matters, then share what you learn.",
+    "Most progress looks boring from the inside.",
+    "Asking better questions beats having quick answers.",
+    "Clarity compounds over time.",
+]
+CLOSERS = [
+    "What has your experience been?",
+    "How are you approaching this?",
+    "I'd love to hear your take in the comments.",
+]
+
+class LocalTemplateProvider(LLMProvider):
+    """
+    Deterministic, offline completions assembled from templates. The same
+    messages always produce the same text, so benchmarks and CI runs are
+    reproducible without network access or an API key.
+    """
+
+    name = "local"
+
+    def _fields(self, messages: List[Dict]) -> Dict[str, str]:
+        user_text = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        return {key.strip().lower(): value.strip() for key, value in FIELD_RE.findall(user_text)}
+
+    def _render(self, fields: Dict[str, str], seed: int) -> str:
+        topic = fields.get("topic", "our work")
+        industry = fields.get("industry", "our industry")
+        length_match = LENGTH_RE.search(fields.get("target length", ""))
+        target_words = int(length_match.group(1)) if length_match else 120
+
+        lines = [OPENERS[seed % len(OPENERS)].format(topic=topic, industry=industry)]
+        words = len(lines[0].split())
+        index = seed
+        while words < target_words - 8:
+            sentence = FILLER[index % len(FILLER)]
+            lines.append(sentence)
+            words += len(sentence.split())
+            index += 1
+        lines.append(CLOSERS[seed % len(CLOSERS)])
+
+        if fields.get("include emojis") == "Yes":
+            lines[0] = "💡 " + lines[0]
+        text = "\n\n".join(lines)
+        if fields.get("include hashtags") == "Yes":
+            tags = [re.sub(r"\W", "", value.title()) for value in (topic, industry)]
+            text += "\n\n" + " ".join(f"#{tag}" for tag in tags if tag)
+        return text
+
+    def complete(self, messages: List[Dict], model: str, **params) -> LLMResult:
+        digest = hashlib.sha256(repr(messages).encode()).digest()
+        base_seed = int.from_bytes(digest[:4], "big")
+        fields = self._fields(messages)
+        texts = [self._render(fields, base_seed + i) for i in range(params.get("n") or 1)]
+
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+        completion_tokens = sum(len(text) for text in texts) // 4
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "cached_tokens": 0
+        }
+        return LLMResult(texts=texts, usage=usage, model=model, provider=self.name)
+
+    async def acomplete(self, messages: List[Dict], model: str, **params) -> LLMResult:
+        return self.complete(messages, model, **params)
+
+    async def astream(self, messages: List[Dict], model: str, **params) -> AsyncIterator[Union[str, LLMResult]]:
+        result = self.complete(messages, model, **params)
+        for line in result.text.split("\n"):
+            yield line + "\n"
+        yield result
+
+def create_provider(name: str, timeout: float, max_retries: int) -> LLMProvider:
+    if name == "local":
+        return LocalTemplateProvider()
+    if name == "openai":
+        return OpenAIProvider(timeout, max_retries)
+    raise ValueError(f"Unknown LLM provider: {name}")
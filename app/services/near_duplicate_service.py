@@ -0,0 +1,114 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models.generation import PostFingerprint
+
+logger = logging.getLogger(__name__)
+
+# Drafts within this many differing bits (of 64) of an earlier post count as near-duplicates
+NEAR_DUPLICATE_MAX_DISTANCE = int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", "10"))
+# Most recent fingerprints kept per user; older posts may be repeated
+FINGERPRINTS_PER_USER = int(os.getenv("FINGERPRINTS_PER_USER", "365"))
+# Users whose fingerprints are kept in memory; least recently used are evicted (and reloaded on demand)
+FINGERPRINT_INDEX_MAX_USERS = int(os.getenv("FINGERPRINT_INDEX_MAX_USERS", "5000"))
+
+TOKEN_RE = re.compile(r"[#\w']+")
+_MASK = (1 << 64) - 1
+
+def simhash(text: str) -> int:
+    """
+    64-bit SimHash over case-folded words. Light rewrites of a post land a few
+    bits apart (~3-8); unrelated posts, even on the same topic, 20+ bits.
+    """
+    weights = [0] * 64
+    for token in TOKEN_RE.findall(text.casefold()):
+        value = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin((a ^ b) & _MASK).count("1")
+
+def _to_signed(value: int) -> int:
+    # BigInteger columns are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def _to_unsigned(value: int) -> int:
+    return value & _MASK
+
+class FingerprintIndex:
+    """
+    Per-user ring of recent post fingerprints, loaded from post_fingerprints on
+    first use. A check is a linear scan over a few hundred ints.
+    """
+
+    def __init__(self, per_user: int = FINGERPRINTS_PER_USER, max_distance: int = NEAR_DUPLICATE_MAX_DISTANCE,
+                 max_users: int = FINGERPRINT_INDEX_MAX_USERS):
+        self.per_user = per_user
+        self.max_distance = max_distance
+        self.max_users = max_users
+        self._index: "OrderedDict[int, Deque[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _fingerprints(self, db: Session, user_id: int) -> Deque[int]:
+        with self._lock:
+            if user_id in self._index:
+                self._index.move_to_end(user_id)
+                return self._index[user_id]
+
+        rows = db.query(PostFingerprint.simhash).filter(
+            PostFingerprint.user_id == user_id
+        ).order_by(PostFingerprint.created_at.desc()).limit(self.per_user).all()
+        loaded = deque((_to_unsigned(row.simhash) for row in reversed(rows)), maxlen=self.per_user)
+
+        with self._lock:
+            fingerprints = self._index.setdefault(user_id, loaded)
+            while len(self._index) > self.max_users:
+                self._index.popitem(last=False)
+            return fingerprints
+
+    def closest(self, db: Session, user_id: int, text: str) -> Optional[int]:
+        """Smallest Hamming distance between the text and any earlier post, or None if there are none"""
+        fingerprint = simhash(text)
+        fingerprints = self._fingerprints(db, user_id)
+        with self._lock:
+            if not fingerprints:
+                return None
+            return min(hamming_distance(fingerprint, other) for other in fingerprints)
+
+    def is_near_duplicate(self, db: Session, user_id: int, text: str) -> Tuple[bool, Optional[int]]:
+        distance = self.closest(db, user_id, text)
+        return distance is not None and distance <= self.max_distance, distance
+
+    def add(self, db: Session, user_id: int, text: str, source: str = "scheduled"):
+        """Remember a published post (memory and DB)"""
+        fingerprint = simhash(text)
+        fingerprints = self._fingerprints(db, user_id)
+        with self._lock:
+            fingerprints.append(fingerprint)
+        try:
+            db.add(PostFingerprint(user_id=user_id, simhash=_to_signed(fingerprint), source=source))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error storing post fingerprint for user {user_id}: {str(e)}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "users": len(self._index),
+                "fingerprints": sum(len(values) for values in self._index.values()),
+                "max_distance": self.max_distance
+            }
+
+fingerprint_index = FingerprintIndex()
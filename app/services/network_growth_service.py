@@ -0,0 +1,94 @@
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from app.models.user import User
+from app.models.analytics import ProfileNetworkSample
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERIES_POINTS = 90
+
+def record_network_sample(db: Session, user_id: int, profile_analytics: Dict, sampled_at: Optional[datetime] = None) -> bool:
+    """Append a follower/connection sample unless the counts are unchanged since the last one"""
+    if not profile_analytics:
+        return False
+
+    followers = profile_analytics.get("followers", 0)
+    connections = profile_analytics.get("connections", 0)
+
+    last = db.query(ProfileNetworkSample).filter(
+        ProfileNetworkSample.user_id == user_id
+    ).order_by(ProfileNetworkSample.sampled_at.desc()).first()
+
+    if last and last.followers == followers and last.connections == connections:
+        return False
+
+    db.add(ProfileNetworkSample(
+        user_id=user_id,
+        sampled_at=sampled_at or datetime.now(timezone.utc).replace(tzinfo=None),
+        followers=followers,
+        connections=connections
+    ))
+    db.commit()
+    return True
+
+def sample_network_sizes(db: Session) -> int:
+    """Background job: sample networkSizes for every connected user"""
+    from app.services.linkedin_analytics_service import LinkedInAnalyticsService
+
+    analytics_service = LinkedInAnalyticsService()
+    appended = 0
+    users = db.query(User.id, User.access_token).filter(User.access_token.isnot(None)).all()
+
+    for user_id, access_token in users:
+        try:
+            profile_analytics = analytics_service.get_profile_analytics(analytics_service.context(access_token))
+            if record_network_sample(db, user_id, profile_analytics):
+                appended += 1
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error sampling network size for user {user_id}: {str(e)}")
+
+    logger.info(f"📈 Network sampler: {appended} new samples from {len(users)} users")
+    return appended
+
+def get_growth_series(db: Session, user_id: int, start: datetime, end: datetime, points: int = DEFAULT_SERIES_POINTS) -> Dict:
+    """
+    Return the follower/connection series between start and end, downsampled to at
+    most `points` buckets by keeping the last sample in each equal-width time bucket.
+    """
+    points = max(1, points)
+    bucket_seconds = max((end - start).total_seconds() / points, 1)
+
+    query = db.query(ProfileNetworkSample).filter(
+        ProfileNetworkSample.user_id == user_id,
+        ProfileNetworkSample.sampled_at >= start,
+        ProfileNetworkSample.sampled_at <= end
+    ).order_by(ProfileNetworkSample.sampled_at).yield_per(1000)
+
+    series: List[Dict] = []
+    current_bucket = None
+    for sample in query:
+        bucket = int((sample.sampled_at - start).total_seconds() // bucket_seconds)
+        row = {
+            "ts": sample.sampled_at.isoformat(),
+            "followers": sample.followers,
+            "connections": sample.connections
+        }
+        if bucket == current_bucket:
+            series[-1] = row
+        else:
+            series.append(row)
+            current_bucket = bucket
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "points": len(series),
+        "series": series,
+        "change": {
+            "followers": series[-1]["followers"] - series[0]["followers"] if series else 0,
+            "connections": series[-1]["connections"] - series[0]["connections"] if series else 0
+        }
+    }
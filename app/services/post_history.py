@@ -0,0 +1,138 @@
+import hashlib
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
+from app.core.batched_writer import BatchedWriter
+from app.models.analytics import PostSnapshot
+from app.models.post import Post
+from app.services.engagement_rollup_service import engagement_rate
+
+logger = logging.getLogger(__name__)
+
+# Buffered rows are inserted once this many accumulate (and by the periodic flush job)
+POST_HISTORY_FLUSH_THRESHOLD = int(os.getenv("POST_HISTORY_FLUSH_THRESHOLD", "20"))
+# Rows kept for retry while the DB is unavailable
+POST_HISTORY_MAX_PENDING = int(os.getenv("POST_HISTORY_MAX_PENDING", "5000"))
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class PostHistory(BatchedWriter):
+    """
+    Local record of every publish attempt, buffered and inserted in batches;
+    reads include rows that are not flushed yet.
+    """
+
+    name = "post history"
+
+    def __init__(self, flush_threshold: int = POST_HISTORY_FLUSH_THRESHOLD, max_pending: int = POST_HISTORY_MAX_PENDING):
+        super().__init__(flush_threshold, max_pending)
+        self.recorded = 0
+
+    def record(
+        self,
+        user_id: int,
+        content: str,
+        result: Dict,
+        source: str = "scheduled",
+        template: Optional[str] = None,
+        prompt_version: Optional[str] = None,
+        generation_ms: Optional[int] = None,
+        publish_ms: Optional[int] = None
+    ):
+        """Queue one attempt; result is what publish_linkedin_content returned"""
+        success = bool(result.get("success"))
+        row = {
+            "user_id": user_id,
+            "source": source,
+            "template": template,
+            "prompt_version": prompt_version,
+            "content_hash": content_hash(content),
+            "content": content,
+            "status": "published" if success else "failed",
+            "linkedin_post_id": result.get("post_id"),
+            "api_path": result.get("api_path"),
+            "error": None if success else str(result.get("error") or "")[:500] or None,
+            "generation_ms": generation_ms,
+            "publish_ms": publish_ms,
+            "published_at": datetime.now(timezone.utc) if success else None,
+        }
+        with self._lock:
+            self.recorded += 1
+            # Every attempt is its own row, keyed by its sequence number
+            self._put(self.recorded, row)
+        self._request_flush_if_full()
+
+    def _write(self, db: Session, rows):
+        db.bulk_insert_mappings(Post, [row for _, row in rows])
+
+    def _pending_for(self, user_id: int) -> List[Dict]:
+        with self._lock:
+            return [dict(row) for row in self._pending.values() if row["user_id"] == user_id]
+
+    def was_published(self, db: Session, user_id: int, text: str) -> bool:
+        """Exact repeat of anything this user has published, across the whole history"""
+        digest = content_hash(text)
+        if any(row["content_hash"] == digest and row["status"] == "published" for row in self._pending_for(user_id)):
+            return True
+        return db.query(Post.id).filter(
+            Post.user_id == user_id,
+            Post.content_hash == digest,
+            Post.status == "published"
+        ).first() is not None
+
+    def recent(self, db: Session, user_id: int, limit: int = 20) -> List[Dict]:
+        """Latest attempts for a user, newest first"""
+        rows = [
+            {column.key: getattr(post, column.key) for column in Post.__table__.columns}
+            for post in db.query(Post).filter(Post.user_id == user_id).order_by(Post.created_at.desc(), Post.id.desc()).limit(limit)
+        ]
+        pending = list(reversed(self._pending_for(user_id)))
+        return (pending + rows)[:limit]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"pending": len(self._pending), "recorded": self.recorded, "dropped": self.dropped}
+
+post_history = PostHistory()
+
+def template_performance(db: Session, user_id: int) -> List[Dict]:
+    """
+    Engagement per template and prompt version: published posts joined to their
+    stored LinkedIn snapshots by post URN, with no LinkedIn calls.
+    """
+    rows = db.query(
+        Post.template,
+        Post.prompt_version,
+        func.count(Post.id).label("posts"),
+        func.count(PostSnapshot.id).label("posts_with_stats"),
+        func.coalesce(func.sum(PostSnapshot.likes), 0).label("likes"),
+        func.coalesce(func.sum(PostSnapshot.comments), 0).label("comments"),
+        func.coalesce(func.sum(PostSnapshot.shares), 0).label("shares"),
+        func.coalesce(func.sum(PostSnapshot.impressions), 0).label("impressions"),
+    ).outerjoin(
+        PostSnapshot,
+        and_(PostSnapshot.user_id == Post.user_id, PostSnapshot.post_urn == Post.linkedin_post_id)
+    ).filter(
+        Post.user_id == user_id,
+        Post.status == "published"
+    ).group_by(Post.template, Post.prompt_version).all()
+
+    results = []
+    for row in rows:
+        item = {
+            "template": row.template,
+            "prompt_version": row.prompt_version,
+            "posts": row.posts,
+            "posts_with_stats": row.posts_with_stats,
+            "likes": row.likes,
+            "comments": row.comments,
+            "shares": row.shares,
+            "impressions": row.impressions,
+        }
+        item["engagement_rate"] = engagement_rate(item)
+        results.append(item)
+    return sorted(results, key=lambda item: item["engagement_rate"], reverse=True)
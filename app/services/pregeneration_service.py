@@ -0,0 +1,207 @@
+import logging
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models.user import User, timezone_offset_minutes
+from app.models.generation import PregeneratedPost
+from app.schemas.post_generator import PostGenerateRequest
+from app.services.generation_cache import cache_key
+from app.services.llm_gateway import PRIORITY_LOW
+from app.services.prompt_templates import persona_fragment, persona_version
+from app.services.usage_ledger import usage_ledger, QuotaExceededError
+
+logger = logging.getLogger(__name__)
+
+PREGEN_WINDOW_HOURS = int(os.getenv("PREGEN_WINDOW_HOURS", "24"))
+PREGEN_PARALLELISM = int(os.getenv("PREGEN_PARALLELISM", "2"))
+# Upper bound on drafts requested from one completion call (the API's n parameter)
+PREGEN_MAX_VARIANTS_PER_CALL = int(os.getenv("PREGEN_MAX_VARIANTS_PER_CALL", "8"))
+# How far from the slot time a draft may still be picked up
+PREGEN_PICKUP_WINDOW = timedelta(minutes=2)
+
+def _parse_hhmm(value: str) -> Tuple[int, int]:
+    hour, minute = value.split(":")
+    return int(hour), int(minute)
+
+def upcoming_slots(schedule: Dict, now_utc: datetime, hours: int, smart_slots: Optional[List[str]] = None) -> List[datetime]:
+    """UTC datetimes of the user's posting slots in [now, now + hours)"""
+    offset = timedelta(minutes=timezone_offset_minutes(schedule.get("timezone", "UTC+0")))
+    window_end = now_utc + timedelta(hours=hours)
+    local_now = now_utc + offset
+    settings = schedule.get("settings", {})
+    mode = schedule.get("mode")
+
+    local_slots: List[datetime] = []
+    days = [local_now.date() + timedelta(days=i) for i in range(hours // 24 + 2)]
+
+    for day in days:
+        if mode == "daily":
+            times = [settings.get("dailyTime", "09:00")]
+        elif mode == "smart":
+            times = smart_slots or []
+        elif mode == "manual":
+            times = settings.get("selectedDates", {}).get(day.strftime("%Y-%m-%d"), [])
+        else:
+            times = []
+        local_slots.extend(datetime.combine(day, time(*_parse_hhmm(value))) for value in times)
+
+    slots = []
+    for local_slot in local_slots:
+        utc_slot = (local_slot - offset).replace(tzinfo=timezone.utc)
+        if now_utc <= utc_slot < window_end:
+            slots.append(utc_slot)
+    return sorted(slots)
+
+def _naive(value: datetime) -> datetime:
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def collect_pending_slots(db: Session, now_utc: datetime, hours: int) -> Dict[str, Dict]:
+    """Group every slot without a ready draft by the normalized request it would generate"""
+    from app.services.auto_posting_service import build_post_request_for_user
+    from app.services.smart_schedule_service import load_smart_slots
+
+    users = db.query(User).filter(User.auto_posting == True, User.schedule_mode.isnot(None)).all()
+    smart_slots = load_smart_slots(db, [user.id for user in users])
+
+    existing = {
+        (row.user_id, row.scheduled_for)
+        for row in db.query(PregeneratedPost.user_id, PregeneratedPost.scheduled_for).filter(
+            PregeneratedPost.status == "ready",
+            PregeneratedPost.scheduled_for >= _naive(now_utc)
+        )
+    }
+
+    groups: Dict[str, Dict] = {}
+    for user in users:
+        try:
+            schedule = user.schedule_settings
+            template_name, post_request = build_post_request_for_user(user)
+            if not post_request or not user.access_token:
+                continue
+            try:
+                usage_ledger.check_quota(user)
+            except QuotaExceededError:
+                continue
+
+            # Users with the same template and persona share one group
+            persona = persona_fragment(user)
+            key = cache_key(post_request, persona_version(persona))
+            
+            for slot in upcoming_slots(schedule, now_utc, hours, smart_slots.get(user.id)):
+                if (user.id, _naive(slot)) in existing:
+                    continue
+                group = groups.setdefault(key, {"request": post_request, "persona": persona, "slots": []})
+                group["slots"].append((user.id, template_name, slot))
+        except Exception as e:
+            logger.error(f"Error collecting upcoming slots for user {user.id}: {str(e)}")
+
+    return groups
+
+def _generate_group(request: PostGenerateRequest, persona: str, count: int) -> Tuple[List[str], Dict[str, int]]:
+    """Generate `count` distinct drafts for one parameter group in as few calls as possible, plus their usage"""
+    from app.services.auto_posting_service import complete_post_variants
+
+    drafts: List[str] = []
+    usage = {"prompt_tokens": 0, "completion_tokens": 0}
+    while len(drafts) < count:
+        n = min(count - len(drafts), PREGEN_MAX_VARIANTS_PER_CALL)
+        # Shared by every owner in the group: run_pregeneration meters it per owner
+        result = complete_post_variants(request, n=n, feature="pregeneration", priority=PRIORITY_LOW, persona=persona)
+        for field in usage:
+            usage[field] += result.usage.get(field, 0)
+        batch = [text for text in result.texts if text]
+        if not batch:
+            break
+        drafts.extend(batch)
+    return drafts[:count], usage
+
+def split_usage(usage: Dict[str, int], owners: List[int]) -> Dict[int, Dict[str, int]]:
+    """A group's usage shared between the owners of its filled slots, by slot count (rounded up)"""
+    counts = Counter(owners)
+    return {
+        user_id: {field: -(-value * slots // len(owners)) for field, value in usage.items()}
+        for user_id, slots in counts.items()
+    }
+
+def run_pregeneration(db: Session, hours: int = PREGEN_WINDOW_HOURS) -> int:
+    """Batch job: generate and store drafts for every slot in the next `hours` hours"""
+    now_utc = datetime.now(timezone.utc)
+
+    # Drafts whose slot has passed are no longer eligible for pickup
+    db.query(PregeneratedPost).filter(
+        PregeneratedPost.status == "ready",
+        PregeneratedPost.scheduled_for < _naive(now_utc - PREGEN_PICKUP_WINDOW)
+    ).update({"status": "expired"}, synchronize_session=False)
+    db.commit()
+
+    groups = collect_pending_slots(db, now_utc, hours)
+    if not groups:
+        logger.info("📦 Pre-generation: no pending slots")
+        return 0
+
+    total_slots = sum(len(group["slots"]) for group in groups.values())
+    logger.info(f"📦 Pre-generating {total_slots} drafts across {len(groups)} parameter groups")
+
+    stored = 0
+    with ThreadPoolExecutor(max_workers=max(1, PREGEN_PARALLELISM)) as executor:
+        futures = {
+            executor.submit(_generate_group, group["request"], group["persona"], len(group["slots"])): key
+            for key, group in groups.items()
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            slots = groups[key]["slots"]
+            try:
+                drafts, usage = future.result()
+            except Exception as e:
+                logger.error(f"❌ Pre-generation failed for group {key[:8]} ({len(slots)} slots unfilled): {str(e)}")
+                continue
+
+            if len(drafts) < len(slots):
+                logger.warning(
+                    f"⚠️ Pre-generation group {key[:8]} returned {len(drafts)} drafts for {len(slots)} slots; "
+                    f"{len(slots) - len(drafts)} will be generated live"
+                )
+            filled = list(zip(slots, drafts))
+            for (user_id, template_name, slot), content in filled:
+                db.add(PregeneratedPost(
+                    user_id=user_id,
+                    scheduled_for=_naive(slot),
+                    template_name=template_name,
+                    request_key=key,
+                    content=content,
+                    status="ready"
+                ))
+                stored += 1
+            db.commit()
+
+            # Users with identical parameters share the calls, and each pays for the drafts they got
+            for user_id, share in split_usage(usage, [slot[0] for slot, _ in filled]).items():
+                usage_ledger.record(user_id, "pregeneration", share)
+
+    logger.info(f"📦 Stored {stored}/{total_slots} pre-generated drafts")
+    return stored
+
+def take_pregenerated_post(db: Session, user_id: int, now_utc: datetime) -> Optional[str]:
+    """Claim the ready draft for the slot due now, if the batch job prepared one"""
+    try:
+        draft = db.query(PregeneratedPost).filter(
+            PregeneratedPost.user_id == user_id,
+            PregeneratedPost.status == "ready",
+            PregeneratedPost.scheduled_for >= _naive(now_utc - PREGEN_PICKUP_WINDOW),
+            PregeneratedPost.scheduled_for <= _naive(now_utc + PREGEN_PICKUP_WINDOW)
+        ).order_by(PregeneratedPost.scheduled_for).first()
+
+        if not draft:
+            return None
+
+        draft.status = "used"
+        db.commit()
+        return draft.content
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error claiming pre-generated draft for user {user_id}: {str(e)}")
+        return None
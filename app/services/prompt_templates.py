@@ -0,0 +1,118 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.schemas.post_generator import PostGenerateRequest
+
+# Bump whenever any text below changes so cached and grouped drafts are not reused
+PROMPT_VERSION = "v3"
+# Users whose persona text is kept in memory; least recently used are evicted first
+PERSONA_CACHE_MAX_ENTRIES = int(os.getenv("PERSONA_CACHE_MAX_ENTRIES", "10000"))
+
+# Everything static comes first and is byte-identical across requests, so the
+# provider-side prompt cache can reuse it as a shared prefix.
+SYSTEM_PROMPT = """You are a professional LinkedIn content creator who writes engaging, authentic posts that drive engagement and build professional networks. Always follow the specific requirements provided. When additional context is provided, seamlessly integrate it to make the post more personal and relevant.
+
+POST TYPE GUIDELINES:
+- story: Share a personal experience with lessons learned
+- tips: Provide actionable advice and insights
+- announcement: Make a professional announcement or update
+- question: Ask an engaging question to start a conversation
+- achievement: Celebrate a milestone or accomplishment
+- industry: Comment on industry trends or news
+
+TONE GUIDELINES:
+- Professional: Formal, authoritative, business-focused
+- Casual & Friendly: Conversational, approachable, warm
+- Thought Leader: Insightful, forward-thinking, analytical
+- Storytelling: Narrative-driven, engaging, personal
+- Motivational: Inspiring, uplifting, encouraging
+
+FORMATTING REQUIREMENTS:
+- Use line breaks for readability
+- Make it engaging and authentic
+- Include a call-to-action when appropriate
+- Keep within the specified word count
+- Never mention any of the Avoid Topics
+- If Include Hashtags is Yes, add relevant hashtags at the end; otherwise use no hashtags
+- If Include Emojis is Yes, use emojis appropriately throughout the post; otherwise use no emojis
+
+CONTEXT INTEGRATION (only when Additional Context is given):
+- Incorporate the additional context naturally into the post
+- Make the content relevant to the specific situation described
+- Use the context to add authenticity and personalization
+- Don't just mention the context - weave it into the narrative meaningfully
+
+AUTHOR PERSONA (only when given):
+- Match the author's voice and engagement style described in the persona
+
+Reply with the post text only."""
+
+_persona_cache: "OrderedDict[int, Tuple[str, str]]" = OrderedDict()
+_persona_lock = threading.Lock()
+
+def _build_persona(user) -> str:
+    lines = []
+    if user.personality_type:
+        lines.append(f"- Voice: {user.personality_type.replace('_', ' ')}")
+    if user.engagement_style:
+        lines.append(f"- Engagement style: {user.engagement_style.replace('_', ' ')}")
+    if user.industry:
+        lines.append(f"- Works in: {user.industry}")
+    return "AUTHOR PERSONA:\n" + "\n".join(lines) if lines else ""
+
+def persona_fragment(user) -> str:
+    """
+    Per-user persona text, computed once and reused until the user row changes.
+    Kept free of names so users with the same settings share identical prompts.
+    """
+    if user is None:
+        return ""
+    version = str(getattr(user, "updated_at", None))
+    with _persona_lock:
+        cached = _persona_cache.get(user.id)
+        if cached and cached[0] == version:
+            _persona_cache.move_to_end(user.id)
+            return cached[1]
+    fragment = _build_persona(user)
+    with _persona_lock:
+        _persona_cache[user.id] = (version, fragment)
+        _persona_cache.move_to_end(user.id)
+        while len(_persona_cache) > PERSONA_CACHE_MAX_ENTRIES:
+            _persona_cache.popitem(last=False)
+    return fragment
+
+def persona_version(persona: str) -> str:
+    """Short, stable tag for a persona so it can be folded into cache/group keys"""
+    if not persona:
+        return PROMPT_VERSION
+    return f"{PROMPT_VERSION}:{hashlib.sha256(persona.encode()).hexdigest()[:12]}"
+
+def build_request_block(data: PostGenerateRequest) -> str:
+    """The per-request fields, placed last in the prompt"""
+    lines = [
+        "CONTENT REQUIREMENTS:",
+        f"- Topic: {data.topic}",
+        f"- Industry: {data.industry}",
+        f"- Tone: {data.tone}",
+        f"- Post Type: {data.post_type}",
+        f"- Target Length: Approximately {data.post_length} words",
+        f"- Include Hashtags: {'Yes' if data.include_hashtags else 'No'}",
+        f"- Include Emojis: {'Yes' if data.include_emojis else 'No'}",
+    ]
+    if data.short_description:
+        lines.append(f"- Additional Context: {data.short_description}")
+    if data.avoid_topics:
+        lines.append(f"- Avoid Topics: {', '.join(data.avoid_topics)}")
+    return "\n".join(lines)
+
+def build_messages(data: PostGenerateRequest, persona: Optional[str] = None) -> List[Dict]:
+    """Static instructions first, then the (per-user) persona, then per-request fields"""
+    parts = [persona] if persona else []
+    parts.append(build_request_block(data))
+    parts.append("Generate a compelling LinkedIn post that follows these guidelines.")
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": "\n\n".join(parts)}
+    ]
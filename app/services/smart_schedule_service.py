@@ -0,0 +1,109 @@
+import json
+import logging
+from datetime import timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.models.user import User, timezone_offset_minutes
+from app.models.analytics import PostSnapshot, SmartScheduleSlots
+
+logger = logging.getLogger(__name__)
+
+# Hours used until a user has enough post history to rank their own
+DEFAULT_SMART_HOURS = [9, 13, 17, 11, 15]
+MIN_POSTS_FOR_HISTOGRAM = 5
+MAX_POSTS_PER_DAY = 5
+
+def build_hour_histogram(snapshots: List[PostSnapshot], utc_offset) -> List[float]:
+    """Average engagement (likes + comments + shares) per post for each local hour"""
+    totals = [0] * 24
+    counts = [0] * 24
+
+    for snapshot in snapshots:
+        if not snapshot.post_created_at:
+            continue
+        hour = (snapshot.post_created_at + utc_offset).hour
+        totals[hour] += (snapshot.likes or 0) + (snapshot.comments or 0) + (snapshot.shares or 0)
+        counts[hour] += 1
+
+    return [round(totals[h] / counts[h], 2) if counts[h] else 0 for h in range(24)]
+
+def derive_slots(histogram: List[float], posts_per_day: int, sample_size: int) -> List[str]:
+    """Pick the best local hours from the histogram, falling back to defaults for thin history"""
+    posts_per_day = max(1, min(posts_per_day, MAX_POSTS_PER_DAY))
+
+    ranked = [hour for hour in sorted(range(24), key=lambda h: histogram[h], reverse=True) if histogram[hour] > 0]
+    if sample_size < MIN_POSTS_FOR_HISTOGRAM:
+        ranked = []
+
+    hours = ranked[:posts_per_day]
+    for hour in DEFAULT_SMART_HOURS:
+        if len(hours) >= posts_per_day:
+            break
+        if hour not in hours:
+            hours.append(hour)
+
+    return [f"{hour:02d}:00" for hour in sorted(hours)]
+
+def refresh_user_smart_slots(db: Session, user: User, schedule: Dict) -> Optional[List[str]]:
+    """Recompute and store the smart-mode histogram and slots for a single user"""
+    user_timezone = schedule.get("timezone", "UTC+0")
+    posts_per_day = schedule.get("settings", {}).get("postsPerDay", 1)
+
+    snapshots = db.query(PostSnapshot).filter(PostSnapshot.user_id == user.id).all()
+    histogram = build_hour_histogram(snapshots, timedelta(minutes=timezone_offset_minutes(user_timezone)))
+    slots = derive_slots(histogram, posts_per_day, len(snapshots))
+
+    record = db.query(SmartScheduleSlots).filter(SmartScheduleSlots.user_id == user.id).first()
+    if record is None:
+        record = SmartScheduleSlots(user_id=user.id)
+        db.add(record)
+
+    record.timezone = user_timezone
+    record.histogram = json.dumps(histogram)
+    record.slots = json.dumps(slots)
+    return slots
+
+def refresh_smart_schedules(db: Session) -> int:
+    """Nightly job: precompute smart-mode slots for every user on the smart schedule"""
+    refreshed = 0
+    users = db.query(User).filter(User.schedule_mode == "smart").all()
+
+    for user in users:
+        try:
+            slots = refresh_user_smart_slots(db, user, user.schedule_settings)
+            db.commit()
+            refreshed += 1
+            logger.info(f"🧠 Smart slots for user {user.id}: {slots}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error refreshing smart slots for user {user.id}: {str(e)}")
+
+    logger.info(f"🧠 Refreshed smart schedules for {refreshed} users")
+    return refreshed
+
+def load_smart_slots(db: Session, user_ids: List[int]) -> Dict[int, List[str]]:
+    """Load precomputed smart slots for the given users in a single query"""
+    if not user_ids:
+        return {}
+
+    records = db.query(SmartScheduleSlots).filter(SmartScheduleSlots.user_id.in_(user_ids)).all()
+    return _slots_by_user(records)
+
+async def aload_smart_slots(db: AsyncSession, user_ids: List[int]) -> Dict[int, List[str]]:
+    """load_smart_slots for async sessions"""
+    if not user_ids:
+        return {}
+
+    result = await db.execute(select(SmartScheduleSlots).where(SmartScheduleSlots.user_id.in_(user_ids)))
+    return _slots_by_user(result.scalars().all())
+
+def _slots_by_user(records: List[SmartScheduleSlots]) -> Dict[int, List[str]]:
+    result = {}
+    for record in records:
+        try:
+            result[record.user_id] = json.loads(record.slots) if record.slots else []
+        except (json.JSONDecodeError, TypeError):
+            result[record.user_id] = []
+    return result
@@ -0,0 +1,91 @@
+import logging
+import os
+from typing import Dict, List, Optional
+from app.schemas.post_generator import PostGenerateRequest
+from app.services.llm_gateway import DEFAULT_MODEL
+
+logger = logging.getLogger(__name__)
+
+# Calibrated on generated English LinkedIn posts (o200k/cl100k tokenizers)
+TOKENS_PER_WORD = float(os.getenv("TOKENS_PER_WORD", "1.35"))
+# Extra completion tokens for a trailing hashtag line and for inline emojis
+HASHTAG_TOKENS = 30
+EMOJI_TOKENS_PER_100_WORDS = 12
+# Models overshoot the requested length; the budget is a ceiling, not a target
+COMPLETION_HEADROOM = float(os.getenv("COMPLETION_HEADROOM", "1.4"))
+MIN_COMPLETION_TOKENS = 128
+MAX_COMPLETION_TOKENS = int(os.getenv("MAX_COMPLETION_TOKENS", "2048"))
+# Per-message framing overhead added by the chat format
+TOKENS_PER_MESSAGE = 4
+CHARS_PER_TOKEN = 4.0
+
+# USD per 1M tokens: (input, output)
+MODEL_PRICING = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4": (30.00, 60.00),
+}
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to the character ratio
+    tiktoken = None
+
+_encodings: Dict[str, object] = {}
+
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except Exception:
+            _encodings[model] = tiktoken.get_encoding("o200k_base")
+    return _encodings[model]
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """Exact count with tiktoken when installed, otherwise a character-based estimate"""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+def count_message_tokens(messages: List[Dict], model: str = DEFAULT_MODEL) -> int:
+    return sum(count_tokens(message["content"], model) + TOKENS_PER_MESSAGE for message in messages) + 2
+
+def expected_completion_tokens(data: PostGenerateRequest) -> int:
+    """Typical completion size for the requested length and extras"""
+    tokens = data.post_length * TOKENS_PER_WORD
+    if data.include_hashtags:
+        tokens += HASHTAG_TOKENS
+    if data.include_emojis:
+        tokens += data.post_length / 100 * EMOJI_TOKENS_PER_100_WORDS
+    return int(tokens)
+
+def completion_budget(data: PostGenerateRequest) -> int:
+    """max_tokens for a request: expected size plus headroom, clamped to sane bounds"""
+    budget = int(expected_completion_tokens(data) * COMPLETION_HEADROOM)
+    return max(MIN_COMPLETION_TOKENS, min(budget, MAX_COMPLETION_TOKENS))
+
+def estimate_cost(prompt_tokens: int, completion_tokens: int, model: str = DEFAULT_MODEL) -> Optional[float]:
+    pricing = MODEL_PRICING.get(model)
+    if not pricing:
+        return None
+    input_price, output_price = pricing
+    return round((prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000, 6)
+
+def estimate_request(data: PostGenerateRequest, messages: List[Dict], model: str = DEFAULT_MODEL, n: int = 1) -> Dict:
+    """Expected and worst-case token usage and cost of generating this request"""
+    prompt_tokens = count_message_tokens(messages, model)
+    expected = expected_completion_tokens(data) * n
+    max_tokens = completion_budget(data)
+    return {
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "expected_completion_tokens": expected,
+        "max_tokens": max_tokens,
+        "expected_cost_usd": estimate_cost(prompt_tokens, expected, model),
+        "max_cost_usd": estimate_cost(prompt_tokens, max_tokens * n, model),
+        "tokenizer": "tiktoken" if tiktoken is not None else "estimate"
+    }
@@ -0,0 +1,60 @@
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
+
+def parse_topics(raw: Optional[str]) -> List[str]:
+    """User.avoid_topics is stored comma-joined"""
+    return [topic.strip() for topic in (raw or "").split(",") if topic.strip()]
+
+@lru_cache(maxsize=1024)
+def _compile(topics: Tuple[str, ...]) -> Optional[Pattern]:
+    if not topics:
+        return None
+    # Longest first so "machine learning" wins over "machine". No word character on either side keeps
+    # "AI" out of "said"; unlike \b this also matches topics that end in punctuation ("C++", "C#")
+    alternatives = sorted(topics, key=len, reverse=True)
+    return re.compile(r"(?<!\w)(?:" + "|".join(re.escape(topic) for topic in alternatives) + r")(?!\w)", re.IGNORECASE)
+
+def compile_topics(topics: Iterable[str]) -> Optional[Pattern]:
+    """One case-insensitive whole-word regex for a set of topics (memoized by the normalized set)"""
+    normalized = tuple(sorted({topic.strip().casefold() for topic in topics if topic and topic.strip()}))
+    return _compile(normalized)
+
+def find_topics(pattern: Optional[Pattern], text: str) -> List[str]:
+    if pattern is None or not text:
+        return []
+    return sorted({match.casefold() for match in pattern.findall(text)})
+
+class TopicFilter:
+    """
+    Per-user compiled avoid_topics pattern, reused until the stored setting
+    changes (or invalidate() is called after an update).
+    """
+
+    def __init__(self):
+        self._cache: Dict[int, Tuple[Optional[str], Optional[Pattern]]] = {}
+        self._lock = threading.Lock()
+
+    def pattern_for(self, user) -> Optional[Pattern]:
+        if user is None:
+            return None
+        raw = user.avoid_topics
+        with self._lock:
+            cached = self._cache.get(user.id)
+            if cached and cached[0] == raw:
+                return cached[1]
+        pattern = compile_topics(parse_topics(raw))
+        with self._lock:
+            self._cache[user.id] = (raw, pattern)
+        return pattern
+
+    def violations(self, user, text: str) -> List[str]:
+        """Avoided topics the text mentions (empty when it is clean)"""
+        return find_topics(self.pattern_for(user), text)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+topic_filter = TopicFilter()
@@ -0,0 +1,169 @@
+import logging
+import os
+import time
+from datetime import date, datetime, timezone
+from typing import Dict, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.batched_writer import BatchedWriter
+from app.models.database import SessionLocal
+from app.models.subscription import Subscription
+from app.models.usage import TokenUsageLedger
+
+logger = logging.getLogger(__name__)
+
+# Monthly token budgets (prompt + completion) per plan tier
+PLAN_MONTHLY_TOKENS = {
+    "free": int(os.getenv("FREE_MONTHLY_TOKENS", "20000")),
+    "basic": int(os.getenv("BASIC_MONTHLY_TOKENS", "300000")),
+    "pro": int(os.getenv("PRO_MONTHLY_TOKENS", "2000000")),
+}
+# Pending rows written to the DB once this many keys accumulate (and by the periodic flush job)
+LEDGER_FLUSH_THRESHOLD = int(os.getenv("LEDGER_FLUSH_THRESHOLD", "50"))
+# Pending keys kept for retry while the DB is unavailable
+LEDGER_MAX_PENDING = int(os.getenv("LEDGER_MAX_PENDING", "10000"))
+# How long a user's monthly total is served from memory before it is re-read from the DB.
+# Each worker only sees its own unflushed usage, so N workers can overshoot a budget by
+# at most what they spend in this window (plus one flush interval)
+LEDGER_MONTHLY_TTL_SECONDS = float(os.getenv("LEDGER_MONTHLY_TTL_SECONDS", "30"))
+
+class QuotaExceededError(Exception):
+    """Raised before a generation when the user's monthly token budget is used up"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+def _active_subscription_plan(user_id: int) -> Optional[str]:
+    """Plan of the user's active subscriptions row, the record /billing/callback writes"""
+    db = SessionLocal()
+    try:
+        return db.query(Subscription.plan).filter(
+            Subscription.user_id == user_id,
+            Subscription.status == "active"
+        ).order_by(Subscription.created_at.desc()).limit(1).scalar()
+    finally:
+        db.close()
+
+def plan_tier(user) -> str:
+    """
+    Map subscription fields to a budget tier; expired subscriptions fall back to free.
+    Payments through /billing/callback only create a subscriptions row, so that is
+    checked when the user fields don't show a current plan.
+    """
+    expires = user.subscription_expires
+    if user.subscription_active and (expires is None or expires >= datetime.utcnow()):
+        plan = user.subscription_plan or ""
+    else:
+        plan = _active_subscription_plan(user.id)
+        if plan is None:
+            return "free"
+    return "pro" if "pro" in plan.lower() else "basic"
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+class UsageLedger(BatchedWriter):
+    """
+    Token usage per (user, feature, day), buffered and flushed in batches. Quota
+    checks read an in-memory monthly total: the DB sum plus this process's pending
+    usage, re-read every LEDGER_MONTHLY_TTL_SECONDS. The budget is therefore
+    enforced per worker between reloads.
+    """
+
+    name = "token usage ledger"
+
+    def __init__(self, flush_threshold: int = LEDGER_FLUSH_THRESHOLD, max_pending: int = LEDGER_MAX_PENDING,
+                 monthly_ttl: float = LEDGER_MONTHLY_TTL_SECONDS):
+        super().__init__(flush_threshold, max_pending)
+        self.monthly_ttl = monthly_ttl
+        self._monthly: Dict[int, Tuple[date, int, float]] = {}
+
+    def record(self, user_id: Optional[int], feature: str, usage: Dict[str, int]):
+        if user_id is None:
+            return
+        today = datetime.now(timezone.utc).date()
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        with self._lock:
+            self._put((user_id, feature, today), {
+                "requests": 1, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens
+            })
+            month, total, loaded_at = self._monthly.get(user_id, (None, 0, 0.0))
+            if month == _month_start(today):
+                self._monthly[user_id] = (month, total + prompt_tokens + completion_tokens, loaded_at)
+        self._request_flush_if_full()
+
+    def _merge(self, current: Dict[str, int], value: Dict[str, int]) -> Dict[str, int]:
+        return {field: current[field] + value[field] for field in current}
+
+    def _write(self, db: Session, rows):
+        for (user_id, feature, day), delta in rows:
+            row = db.query(TokenUsageLedger).filter(
+                TokenUsageLedger.user_id == user_id,
+                TokenUsageLedger.feature == feature,
+                TokenUsageLedger.day == day
+            ).first()
+            if row is None:
+                row = TokenUsageLedger(user_id=user_id, feature=feature, day=day,
+                                       requests=0, prompt_tokens=0, completion_tokens=0)
+                db.add(row)
+            row.requests += delta["requests"]
+            row.prompt_tokens += delta["prompt_tokens"]
+            row.completion_tokens += delta["completion_tokens"]
+
+    def monthly_tokens(self, user_id: int) -> int:
+        """Tokens used this calendar month (UTC), including not yet flushed usage"""
+        month = _month_start(datetime.now(timezone.utc).date())
+        with self._lock:
+            cached_month, total, loaded_at = self._monthly.get(user_id, (None, 0, 0.0))
+            if cached_month == month and time.monotonic() - loaded_at < self.monthly_ttl:
+                return total
+
+        # No flush in progress while reading, so each pending delta is counted exactly once
+        # (either still pending or already in the DB sum)
+        with self._flush_lock:
+            db = SessionLocal()
+            try:
+                stored = db.query(
+                    func.coalesce(func.sum(TokenUsageLedger.prompt_tokens + TokenUsageLedger.completion_tokens), 0)
+                ).filter(
+                    TokenUsageLedger.user_id == user_id,
+                    TokenUsageLedger.day >= month
+                ).scalar() or 0
+            finally:
+                db.close()
+
+            with self._lock:
+                pending = sum(
+                    delta["prompt_tokens"] + delta["completion_tokens"]
+                    for (pending_user, _, day), delta in self._pending.items()
+                    if pending_user == user_id and day >= month
+                )
+                total = stored + pending
+                self._monthly[user_id] = (month, total, time.monotonic())
+                return total
+
+    def check_quota(self, user):
+        """Raise QuotaExceededError (402 without a paid plan, 429 for paid plans) when the budget is spent"""
+        tier = plan_tier(user)
+        budget = PLAN_MONTHLY_TOKENS[tier]
+        used = self.monthly_tokens(user.id)
+        if used < budget:
+            return
+        if tier == "free":
+            raise QuotaExceededError(402, "Free token allowance used up. Please subscribe to continue generating.")
+        raise QuotaExceededError(429, "Monthly token budget for your plan is exhausted.")
+
+    def summary(self, user) -> Dict:
+        tier = plan_tier(user)
+        budget = PLAN_MONTHLY_TOKENS[tier]
+        used = self.monthly_tokens(user.id)
+        return {"plan": tier, "monthly_budget": budget, "used": used, "remaining": max(0, budget - used)}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"pending_keys": len(self._pending), "cached_users": len(self._monthly), "dropped": self.dropped}
+
+usage_ledger = UsageLedger()
@@ -1,7 +1,9 @@
 # app/services/user_service.py
 import logging
 from sqlalchemy.orm import Session
-from app.models.user import User
+from app.models.user import User, schedule_projection
+from app.core.write_queue import run_write
+from app.services.auth_cache import auth_cache
 import json
 
 def create_or_update_user(
@@ -66,7 +68,8 @@ def create_or_update_user(
         raise e
         
 def get_user_by_id(db: Session, user_id: int):
-    return db.query(User).filter(User.id == user_id).first()
+    # Session.get returns the instance already in this session (e.g. the authenticated user) without a SELECT
+    return db.get(User, user_id)
 
 def update_user_profile(
     db: Session,
@@ -112,7 +115,7 @@ def update_user_profile(
         raise e
 
 def update_automation_settings(db: Session, user_id: int, settings):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     if not user:
         return None
     
@@ -128,6 +131,9 @@ def update_automation_settings(db: Session, user_id: int, settings):
     try:
         db.commit()
         db.refresh(user)
+        if data.get("avoid_topics") is not None:
+            from app.services.topic_filter import topic_filter
+            topic_filter.invalidate(user.id)
         return user
     except Exception as e:
         db.rollback()
@@ -146,24 +152,15 @@ def safe_load_json(s):
 def get_content_settings(db: Session, user_id: int):
     """Get content settings for a user"""
     try:
-        user = db.query(User).filter(User.id == user_id).first()
+        user = db.get(User, user_id)
         if not user:
             logging.error(f"User {user_id} not found")
             return None
         
         logging.info(f"Found user {user_id}, content_templates: {user.content_templates}")
         
-        # Parse JSON strings from database
-        content_templates = {}
-        
-        if user.content_templates:
-            try:
-                content_templates = json.loads(user.content_templates)
-            except (json.JSONDecodeError, TypeError) as e:
-                logging.error(f"Failed to parse content_templates for user {user_id}: {e}")
-        
         result = {
-            "content_templates": content_templates,
+            "content_templates": user.content_templates or {},
         }
         
         logging.info(f"Returning settings for user {user_id}: {result}")
@@ -178,14 +175,13 @@ def update_content_settings(db: Session, user_id: int, settings_data: dict):
     try:
         logging.info(f"Updating content settings for user {user_id} with data: {settings_data}")
         
-        user = db.query(User).filter(User.id == user_id).first()
+        user = db.get(User, user_id)
         if not user:
             logging.error(f"User {user_id} not found")
             return None
         
-        # Convert dict to JSON strings for database storage
         if 'content_templates' in settings_data:
-            user.content_templates = json.dumps(settings_data['content_templates'])
+            user.content_templates = settings_data['content_templates']
             logging.info(f"Set content_templates to: {user.content_templates}")
         
         # Save to database
@@ -207,22 +203,16 @@ def update_content_settings(db: Session, user_id: int, settings_data: dict):
 def get_schedule_settings(db: Session, user_id: int):
     """Get schedule settings for a user"""
     try:
-        user = db.query(User).filter(User.id == user_id).first()
+        user = db.get(User, user_id)
         if not user:
             logging.error(f"User {user_id} not found")
             return None
         
         logging.info(f"Found user {user_id}, schedule_settings: {user.schedule_settings}")
         
-        # Parse JSON string from database
         if user.schedule_settings:
-            try:
-                schedule_data = json.loads(user.schedule_settings)
-                logging.info(f"Returning schedule settings for user {user_id}: {schedule_data}")
-                return schedule_data
-            except (json.JSONDecodeError, TypeError) as e:
-                logging.error(f"Failed to parse schedule_settings for user {user_id}: {e}")
-                return None
+            logging.info(f"Returning schedule settings for user {user_id}: {user.schedule_settings}")
+            return user.schedule_settings
         else:
             # Return default settings if none exist
             default_settings = {
@@ -244,17 +234,21 @@ def update_schedule_settings(db: Session, user_id: int, schedule_data: dict):
     try:
         logging.info(f"Updating schedule settings for user {user_id} with data: {schedule_data}")
         
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
+        # Bulk updates skip the mapper events, so the SQL projections are set here
+        # and the cached auth snapshot is dropped explicitly below
+        values = {"schedule_settings": schedule_data, **schedule_projection(schedule_data)}
+        
+        def apply(session: Session) -> bool:
+            return session.query(User).filter(User.id == user_id).update(values) > 0
+        
+        # Save to database (through the single-writer queue when enabled)
+        if not run_write(db, apply):
             logging.error(f"User {user_id} not found")
             return None
+        auth_cache.invalidate_user(user_id)
+        logging.info(f"Set schedule_settings to: {schedule_data}")
         
-        # Convert dict to JSON string for database storage
-        user.schedule_settings = json.dumps(schedule_data)
-        logging.info(f"Set schedule_settings to: {user.schedule_settings}")
-        
-        # Save to database
-        db.commit()
+        user = db.get(User, user_id)
         db.refresh(user)
         
         logging.info(f"Successfully updated schedule settings for user {user_id}")
@@ -293,6 +287,10 @@ def generate_schedule_summary(schedule_data: dict) -> str:
             
             return f"{total_posts} posts scheduled across {total_days} days ({timezone})"
         
+        elif mode == "smart":
+            posts_per_day = settings.get("postsPerDay", 1)
+            return f"Smart posting enabled: {posts_per_day} post(s) per day at your best engagement hours ({timezone})"
+        
         else:
             return "Schedule configuration saved"
             
@@ -0,0 +1,47 @@
+import os
+import tempfile
+
+# The engine is built from DATABASE_URL at import time, so point it at a scratch file first
+_DB_DIR = tempfile.mkdtemp(prefix="poststudio-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+# Deterministic offline completions; no OpenAI calls from tests
+os.environ["LLM_PROVIDER"] = "local"
+os.environ["LLM_FALLBACK_PROVIDER"] = ""
+
+import pytest
+
+from app.core import init_db as _models  # noqa: F401  (registers every model on Base)
+from app.models.database import Base, SessionLocal, engine
+from app.models.user import User
+
+Base.metadata.create_all(bind=engine)
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+        with engine.begin() as connection:
+            for table in reversed(Base.metadata.sorted_tables):
+                connection.execute(table.delete())
+
+@pytest.fixture
+def user(db):
+    user = User(linkedin_id="li-1", email="user@example.com", name="Test User", access_token="token")
+    db.add(user)
+    db.commit()
+    return user
+
+@pytest.fixture
+def client(user):
+    """TestClient whose requests are authenticated as `user`"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.routes.profile import get_current_user
+
+    app.dependency_overrides[get_current_user] = lambda: user
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_current_user, None)
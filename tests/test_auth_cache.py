@@ -0,0 +1,47 @@
+from sqlalchemy import event, update
+
+from app.models.database import engine
+from app.models.user import User
+from app.services.auth_cache import AuthCache
+
+def _count_selects():
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_execute)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", before_execute)
+
+def test_snapshot_serves_profile_fields_without_a_select(db, user):
+    cache = AuthCache()
+    cache.put_user(user)
+    db.expunge_all()
+
+    statements, stop = _count_selects()
+    try:
+        cached = cache.get_user(db, user.id)
+        assert cached.email == "user@example.com"
+        assert cached.name == "Test User"
+    finally:
+        stop()
+    assert statements == []
+
+def test_billing_and_token_fields_are_read_from_the_db(db, user):
+    cache = AuthCache()
+    cache.put_user(user)
+    db.expunge_all()
+
+    # Another worker records a payment and refreshes the token; this process never sees the flush
+    with engine.begin() as connection:
+        connection.execute(
+            update(User).where(User.id == user.id).values(
+                subscription_active=True, subscription_plan="pro", access_token="refreshed"
+            )
+        )
+
+    cached = cache.get_user(db, user.id)
+    assert cached.subscription_active is True
+    assert cached.subscription_plan == "pro"
+    assert cached.access_token == "refreshed"
@@ -0,0 +1,37 @@
+import pytest
+
+from app.schemas.post_generator import PostGenerateRequest
+from app.services.draft_scoring import rank_drafts
+from app.services.llm_gateway import gateway
+from app.services.llm_providers import LLMResult
+from app.services.topic_filter import compile_topics, find_topics
+
+PAYLOAD = {
+    "topic": "Hiring", "industry": "Software", "tone": "Professional",
+    "post_type": "tips", "post_length": 60, "include_hashtags": False, "include_emojis": False,
+}
+
+@pytest.mark.parametrize("topic, text", [
+    ("C++", "Ten years of C++ taught me patience."),
+    ("C#", "Why we moved to c# last year"),
+    ("AI", "(AI) is everywhere"),
+])
+def test_topics_ending_in_punctuation_match(topic, text):
+    assert find_topics(compile_topics([topic]), text) == [topic.casefold()]
+
+def test_topics_still_match_whole_words_only():
+    assert find_topics(compile_topics(["AI", "C"]), "She said Cobol is fine") == []
+
+def test_clean_drafts_rank_ahead_of_avoided_topics():
+    data = PostGenerateRequest(**PAYLOAD, avoid_topics=["crypto"])
+    ranked = rank_drafts(["All in on crypto this year.", "Hire for curiosity.", ""], data)
+    assert [draft["text"] for draft in ranked] == ["Hire for curiosity.", "All in on crypto this year."]
+
+def test_only_empty_variants_is_an_upstream_error(client, monkeypatch):
+    async def empty_completion(*args, **kwargs):
+        return LLMResult(texts=["", ""], model="test")
+
+    monkeypatch.setattr(gateway, "acomplete", empty_completion)
+    response = client.post("/post-generator/generate-post", json={**PAYLOAD, "variants": 2})
+
+    assert response.status_code == 502
@@ -0,0 +1,45 @@
+from datetime import date, datetime, timezone
+
+from app.models.analytics import DailyEngagementRollup, PostSnapshot, WeeklyEngagementRollup
+from app.services.engagement_rollup_service import record_post_snapshots
+
+def _post(urn: str, created: datetime) -> dict:
+    return {"id": urn, "createdAt": int(created.timestamp() * 1000), "commentary": f"post {urn}"}
+
+def _stats(likes: int, impressions: int) -> dict:
+    return {"likeCount": likes, "commentCount": 1, "shareCount": 0, "impressionCount": impressions}
+
+def test_two_posts_on_the_same_day_share_one_rollup(db, user):
+    posts = [
+        _post("urn:li:share:1", datetime(2026, 10, 5, 9, tzinfo=timezone.utc)),
+        _post("urn:li:share:2", datetime(2026, 10, 5, 17, tzinfo=timezone.utc)),
+    ]
+
+    updated = record_post_snapshots(db, user.id, posts, [_stats(3, 100), _stats(5, 200)])
+
+    assert updated == 2
+    assert db.query(PostSnapshot).count() == 2
+    daily = db.query(DailyEngagementRollup).one()
+    assert (daily.day, daily.posts, daily.likes, daily.comments, daily.impressions) == (date(2026, 10, 5), 2, 8, 2, 300)
+
+def test_same_week_posts_and_refresh_deltas(db, user):
+    posts = [
+        _post("urn:li:share:1", datetime(2026, 10, 5, 9, tzinfo=timezone.utc)),   # Monday
+        _post("urn:li:share:2", datetime(2026, 10, 7, 9, tzinfo=timezone.utc)),   # Wednesday
+    ]
+    record_post_snapshots(db, user.id, posts, [_stats(3, 100), _stats(5, 200)])
+
+    # A later refresh only folds in the change since the previous snapshot
+    assert record_post_snapshots(db, user.id, posts, [_stats(4, 150), _stats(5, 200)]) == 2
+
+    weekly = db.query(WeeklyEngagementRollup).one()
+    assert (weekly.week_start, weekly.posts, weekly.likes, weekly.impressions) == (date(2026, 10, 5), 2, 9, 350)
+    assert db.query(DailyEngagementRollup).count() == 2
+
+def test_duplicate_urn_in_one_batch_is_counted_once(db, user):
+    post = _post("urn:li:share:1", datetime(2026, 10, 5, 9, tzinfo=timezone.utc))
+
+    assert record_post_snapshots(db, user.id, [post, post], [_stats(3, 100), _stats(3, 100)]) == 2
+
+    daily = db.query(DailyEngagementRollup).one()
+    assert (daily.posts, daily.likes) == (1, 3)
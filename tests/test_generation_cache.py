@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+import pytest
+
+from app.services.generation_cache import GenerationCache, generation_cache
+
+KEY = "k" * 64
+
+@pytest.fixture
+def cache(db):
+    return GenerationCache(pool_size=3)
+
+def test_served_after_the_first_entry(cache):
+    assert cache.lookup(KEY) is None
+    cache.store(KEY, "v", "first draft")
+    assert cache.lookup(KEY) == "first draft"
+
+def test_identical_texts_fill_the_pool(cache):
+    cache.store(KEY, "v", "same text")
+    for _ in range(2):
+        assert cache.claim_fill(KEY)
+        cache.store(KEY, "v", "same text")
+    # Full pool: no further fills, every lookup is a hit
+    assert not cache.claim_fill(KEY)
+    assert [cache.lookup(KEY) for _ in range(4)] == ["same text"] * 4
+
+def test_one_fill_in_flight_per_key(cache):
+    cache.store(KEY, "v", "draft")
+    assert cache.claim_fill(KEY)
+    assert not cache.claim_fill(KEY)
+    cache.release_fill(KEY)
+    assert cache.claim_fill(KEY)
+
+def test_memory_entries_expire_with_the_ttl(cache):
+    cache.store(KEY, "v", "draft")
+    assert cache.lookup(KEY) == "draft"
+
+    cache.ttl = timedelta(seconds=-1)
+    assert cache.lookup(KEY) is None
+
+def test_identical_requests_hit_the_cache(client):
+    payload = {
+        "topic": "Remote work", "industry": "Software", "tone": "Professional",
+        "post_type": "tips", "post_length": 120, "include_hashtags": True,
+        "include_emojis": False, "use_cache": True,
+    }
+    responses = [client.post("/post-generator/generate-post", json=payload).json() for _ in range(7)]
+
+    assert [response["cached"] for response in responses] == [False] + [True] * 6
+    assert generation_cache.stats()["hits"] >= 6
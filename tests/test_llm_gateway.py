@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.llm_gateway import PRIORITY_LOW, ConcurrencyLimiter, LLMBusyError, LLMGateway
+from app.services.llm_providers import LLMResult
+from app.services.usage_ledger import usage_ledger
+
+MESSAGES = [{"role": "user", "content": "Write a post about hiring"}]
+
+class StreamWithoutUsage:
+    name = "test"
+
+    async def astream(self, messages, model, **params):
+        for chunk in ("Hiring ", "is ", "hard."):
+            yield chunk
+
+def _collect(stream):
+    async def run():
+        return [event async for event in stream]
+    return asyncio.run(run())
+
+def test_stream_without_usage_event_records_an_estimate(db, user):
+    gateway = LLMGateway(provider="local", fallback="")
+    gateway.provider = StreamWithoutUsage()
+    usage_ledger._pending.clear()
+
+    events = _collect(gateway.astream(MESSAGES, feature="test_stream", user_id=user.id))
+
+    assert events[:3] == ["Hiring ", "is ", "hard."]
+    result = events[-1]
+    assert isinstance(result, LLMResult) and result.text == "Hiring is hard."
+    assert result.usage["prompt_tokens"] > 0 and result.usage["completion_tokens"] > 0
+    [(key, recorded)] = usage_ledger._pending.items()
+    assert key[:2] == (user.id, "test_stream")
+    assert recorded["completion_tokens"] == result.usage["completion_tokens"]
+    usage_ledger._pending.clear()
+
+def test_async_waiter_is_woken_by_a_release_from_another_thread():
+    limiter = ConcurrencyLimiter(max_total=1, max_per_user=1)
+    held = threading.Event()
+    release = threading.Event()
+
+    def hold_slot():
+        with limiter.slot():
+            held.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=hold_slot)
+    thread.start()
+    held.wait(5)
+
+    async def wait_for_slot():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, release.set)
+        started = time.monotonic()
+        async with limiter.async_slot(timeout=5):
+            assert limiter.stats()["in_flight"] == 1
+            return time.monotonic() - started
+
+    waited = asyncio.run(wait_for_slot())
+    thread.join()
+
+    assert 0.04 <= waited < 1
+    assert limiter.stats() == {**limiter.stats(), "in_flight": 0, "async_waiting": 0}
+
+def test_low_priority_async_callers_leave_the_interactive_reserve_free():
+    limiter = ConcurrencyLimiter(max_total=2, max_per_user=2, interactive_reserve=1)
+
+    async def scenario():
+        async with limiter.async_slot():
+            with pytest.raises(LLMBusyError):
+                async with limiter.async_slot(timeout=0.05, priority=PRIORITY_LOW):
+                    pass
+            async with limiter.async_slot(timeout=0.05):
+                assert limiter.stats()["in_flight"] == 2
+
+    asyncio.run(scenario())
+    assert limiter.stats()["async_waiting"] == 0
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+import httpx
+
+from app.routes.profile import get_current_user
+from app.services.llm_gateway import ConcurrencyLimiter, gateway
+from app.services.llm_providers import LLMResult
+
+GENERATIONS = 50
+GENERATION_SECONDS = 1.0
+# /health must answer well within one generation while all of them are in flight
+HEALTH_LATENCY_LIMIT = 0.25
+
+PAYLOAD = {
+    "topic": "Hiring", "industry": "Software", "tone": "Professional", "post_type": "tips",
+    "post_length": 80, "include_hashtags": False, "include_emojis": False,
+}
+
+class SlowProvider:
+    """Stands in for OpenAI: every completion takes GENERATION_SECONDS without blocking the loop"""
+    name = "slow"
+
+    async def acomplete(self, messages, model, **params):
+        await asyncio.sleep(GENERATION_SECONDS)
+        return LLMResult(texts=["A generated post."], usage={"prompt_tokens": 10, "completion_tokens": 5}, model=model)
+
+async def _health_under_load(app):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+        generations = [
+            asyncio.create_task(http.post("/post-generator/generate-post", json=PAYLOAD))
+            for _ in range(GENERATIONS)
+        ]
+
+        deadline = time.monotonic() + GENERATION_SECONDS / 2
+        while gateway.limiter.stats()["in_flight"] < GENERATIONS and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        in_flight = gateway.limiter.stats()["in_flight"]
+
+        latencies = []
+        for _ in range(10):
+            started = time.monotonic()
+            response = await http.get("/health")
+            latencies.append(time.monotonic() - started)
+            assert response.status_code == 200
+
+        responses = await asyncio.gather(*generations)
+    return in_flight, latencies, responses
+
+def test_health_stays_fast_with_50_generations_in_flight(db, user, monkeypatch):
+    from app.main import app
+
+    # Load every column now: handlers read this object from many threads at once
+    db.refresh(user)
+    monkeypatch.setattr(gateway, "provider", SlowProvider())
+    monkeypatch.setattr(gateway, "limiter", ConcurrencyLimiter(max_total=GENERATIONS, max_per_user=GENERATIONS))
+    app.dependency_overrides[get_current_user] = lambda: user
+    try:
+        in_flight, latencies, responses = asyncio.run(_health_under_load(app))
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
+
+    assert in_flight == GENERATIONS
+    assert max(latencies) < HEALTH_LATENCY_LIMIT, latencies
+    assert [response.status_code for response in responses] == [200] * GENERATIONS
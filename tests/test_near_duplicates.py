@@ -0,0 +1,26 @@
+from app.services.near_duplicate_service import FingerprintIndex
+
+POST = "Five lessons from a year of hiring engineers: move fast, write it down, and always close the loop."
+
+def test_rewrites_are_near_duplicates(db, user):
+    index = FingerprintIndex()
+    index.add(db, user.id, POST)
+
+    assert index.is_near_duplicate(db, user.id, POST.replace("Five", "5"))[0]
+    assert not index.is_near_duplicate(db, user.id, "Our quarterly results are in, and the team shipped three products.")[0]
+
+def test_index_evicts_least_recently_used_users_and_reloads_them(db, user):
+    index = FingerprintIndex(max_users=2)
+    index.add(db, user.id, POST)
+    index.closest(db, 1000, POST)
+    index.closest(db, user.id, POST)
+    index.closest(db, 1001, POST)
+
+    assert list(index._index) == [user.id, 1001]
+    index.closest(db, 1002, POST)
+    index.closest(db, 1003, POST)
+    assert user.id not in index._index
+
+    # Evicted users come back from post_fingerprints
+    assert index.closest(db, user.id, POST) == 0
+    assert index.stats()["users"] == 2
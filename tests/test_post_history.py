@@ -0,0 +1,93 @@
+import pytest
+
+from app.models.post import Post
+from app.models.subscription import Subscription
+from app.routes import linkedin
+from app.services.post_history import PostHistory
+
+PUBLISHED = {"success": True, "post_id": "urn:li:share:1", "api_path": "rest/posts", "error": "ignored"}
+FAILED = {"success": False, "error": "401 Unauthorized"}
+
+def test_flush_inserts_buffered_attempts(db, user):
+    history = PostHistory()
+    history.record(user.id, "First post", PUBLISHED)
+    history.record(user.id, "Second post", FAILED)
+
+    assert history.was_published(db, user.id, "First post")
+    assert history.flush() == 2
+    rows = {row.content: row for row in db.query(Post)}
+    assert rows["First post"].status == "published" and rows["First post"].error is None
+    assert rows["Second post"].status == "failed" and rows["Second post"].error == "401 Unauthorized"
+    assert history.was_published(db, user.id, "First post")
+
+def test_invalid_row_is_dropped_without_blocking_the_rest(db, user):
+    history = PostHistory()
+    history.record(user.id, "Valid post", PUBLISHED)
+    # user_id is NOT NULL: this row can never be written
+    history.record(None, "Orphan post", PUBLISHED)
+
+    assert history.flush() == 1
+    assert history.stats()["pending"] == 0
+    assert history.stats()["dropped"] == 1
+    assert [row.content for row in db.query(Post)] == ["Valid post"]
+
+def test_requeued_backlog_is_capped():
+    history = PostHistory(max_pending=2)
+    history._requeue([(user_id, {"user_id": user_id}) for user_id in (1, 2, 3)])
+
+    assert [row["user_id"] for row in history._pending.values()] == [2, 3]
+    assert history.stats()["dropped"] == 1
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None, body=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self._body = body
+
+    def json(self):
+        return self._body
+
+@pytest.fixture
+def linkedin_client(client, db, user, monkeypatch):
+    db.add(Subscription(user_id=user.id, plan="pro", status="active"))
+    db.commit()
+    monkeypatch.setattr(linkedin.requests, "get", lambda *args, **kwargs: FakeResponse(200, body={"id": "abc"}))
+    monkeypatch.setattr(linkedin.requests, "post", lambda *args, **kwargs: FakeResponse(201, text="{}", headers={"x-restli-id": "urn:li:share:9"}))
+    monkeypatch.setattr(linkedin, "post_history", PostHistory())
+    return client
+
+def test_manual_post_is_recorded_for_the_authenticated_user(linkedin_client, user):
+    response = linkedin_client.post("/linkedin/post", json={"user_id": user.id + 1, "text": "Hello network"})
+
+    assert response.status_code == 200
+    [row] = linkedin.post_history._pending.values()
+    assert row["user_id"] == user.id
+    assert row["status"] == "published"
+    assert row["error"] is None
+
+@pytest.mark.parametrize("path, payload", [
+    ("/linkedin/post", {"text": "Hello network"}),
+    ("/linkedin/comment", {"text": "Well said", "parent_post_urn": "urn:li:share:1"}),
+])
+def test_linkedin_endpoints_require_a_signed_in_user(db, path, payload):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    assert TestClient(app).post(path, json=payload).status_code == 401
+
+def test_comment_uses_the_authenticated_users_token(linkedin_client, user, monkeypatch):
+    calls = []
+
+    def fake_post(url, headers=None, json=None):
+        calls.append(headers["Authorization"])
+        return FakeResponse(201)
+
+    monkeypatch.setattr(linkedin.requests, "post", fake_post)
+    response = linkedin_client.post(
+        "/linkedin/comment",
+        json={"user_id": user.id + 1, "text": "Well said", "parent_post_urn": "urn:li:share:1"}
+    )
+
+    assert response.status_code == 200
+    assert calls == [f"Bearer {user.access_token}"]
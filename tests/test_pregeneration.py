@@ -0,0 +1,62 @@
+import logging
+from datetime import datetime, timezone
+
+from app.models.generation import PregeneratedPost
+from app.models.user import User
+from app.services.llm_gateway import gateway
+from app.services.llm_providers import LLMResult
+from app.services.pregeneration_service import run_pregeneration, split_usage
+from app.services.usage_ledger import usage_ledger
+
+def _scheduled_user(db, linkedin_id):
+    user = User(
+        linkedin_id=linkedin_id,
+        email=f"{linkedin_id}@example.com",
+        access_token="token",
+        auto_posting=True,
+        schedule_settings={"mode": "daily", "timezone": "UTC+0", "settings": {"dailyTime": "12:00"}},
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+def _count_calls(monkeypatch):
+    calls = []
+    complete = gateway.complete
+
+    def counting_complete(*args, **kwargs):
+        calls.append(kwargs)
+        return complete(*args, **kwargs)
+
+    monkeypatch.setattr(gateway, "complete", counting_complete)
+    return calls
+
+def test_identical_parameters_share_calls_and_split_usage(db, monkeypatch):
+    first, second = _scheduled_user(db, "li-a"), _scheduled_user(db, "li-b")
+    calls = _count_calls(monkeypatch)
+    usage_ledger._pending.clear()
+
+    stored = run_pregeneration(db, hours=48)
+
+    assert stored == db.query(PregeneratedPost).count() > 0
+    assert {row.user_id for row in db.query(PregeneratedPost)} == {first.id, second.id}
+    # Both users' slots fit in one call of the shared group
+    assert len(calls) == 1 and calls[0]["n"] == stored
+    today = datetime.now(timezone.utc).date()
+    for user in (first, second):
+        assert usage_ledger._pending[(user.id, "pregeneration", today)]["completion_tokens"] > 0
+    usage_ledger._pending.clear()
+
+def test_unfilled_slots_are_logged(db, monkeypatch, caplog):
+    _scheduled_user(db, "li-a")
+    monkeypatch.setattr(gateway, "complete", lambda *args, **kwargs: LLMResult(texts=[""], usage={"prompt_tokens": 5}))
+
+    with caplog.at_level(logging.WARNING, logger="app.services.pregeneration_service"):
+        assert run_pregeneration(db, hours=48) == 0
+
+    assert "will be generated live" in caplog.text
+
+def test_usage_is_split_by_filled_slots():
+    shares = split_usage({"prompt_tokens": 90, "completion_tokens": 301}, [1, 1, 2])
+
+    assert shares == {1: {"prompt_tokens": 60, "completion_tokens": 201}, 2: {"prompt_tokens": 30, "completion_tokens": 101}}
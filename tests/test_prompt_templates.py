@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+
+from app.services import prompt_templates
+from app.services.prompt_templates import persona_fragment
+
+def _user(user_id, industry="Software"):
+    return SimpleNamespace(id=user_id, personality_type="thought_leader", engagement_style=None,
+                           industry=industry, updated_at=None)
+
+def test_persona_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(prompt_templates, "PERSONA_CACHE_MAX_ENTRIES", 2)
+    monkeypatch.setattr(prompt_templates, "_persona_cache", prompt_templates.OrderedDict())
+
+    persona_fragment(_user(1))
+    persona_fragment(_user(2))
+    persona_fragment(_user(1))
+    persona_fragment(_user(3))
+
+    assert list(prompt_templates._persona_cache) == [1, 3]
+
+def test_persona_is_rebuilt_when_the_user_changes():
+    user = _user(10)
+    assert "Works in: Software" in persona_fragment(user)
+
+    user.industry, user.updated_at = "Finance", "later"
+    assert "Works in: Finance" in persona_fragment(user)
@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core.query_plans import check_query_plans
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+@pytest.fixture(scope="module")
+def migrated_db(tmp_path_factory):
+    """A fresh SQLite database built by the alembic migrations, not by create_all"""
+    url = f"sqlite:///{tmp_path_factory.mktemp('migrations') / 'migrated.db'}"
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=REPO_ROOT, env={**os.environ, "DATABASE_URL": url},
+        check=True, capture_output=True
+    )
+    engine = create_engine(url)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+def test_hot_queries_use_their_indexes(migrated_db):
+    report = check_query_plans(migrated_db)
+
+    assert set(report["queries"]) == {"scheduler_scan", "require_subscription", "billing_email_lookup"}
+    assert report["ok"], report
+
+def test_query_plan_endpoint_requires_auth():
+    from app.main import app
+
+    assert TestClient(app).get("/debug/query-plans").status_code == 401
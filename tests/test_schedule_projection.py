@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+
+import app.core.scheduler as scheduler
+from app.models.user import User, schedule_projection, timezone_offset_minutes, utc_offset
+
+def _frozen_now(value: datetime):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return value
+    return FrozenDatetime
+
+def test_timezone_offsets():
+    assert timezone_offset_minutes("UTC") == 0
+    assert timezone_offset_minutes("UTC+2") == 120
+    assert timezone_offset_minutes("UTC-5") == -300
+    assert timezone_offset_minutes("UTC+5:30") == 330
+    assert timezone_offset_minutes("Europe/Kyiv") == 0
+
+def test_daily_projection_is_utc_minute_of_day():
+    schedule = {"mode": "daily", "timezone": "UTC+5:30", "settings": {"dailyTime": "09:00"}}
+    assert schedule_projection(schedule) == {
+        "schedule_mode": "daily",
+        "schedule_utc_offset_minutes": 330,
+        "schedule_daily_minute_utc": 3 * 60 + 30,
+    }
+
+def test_scheduler_uses_the_projected_offset(db, user, monkeypatch):
+    user.schedule_settings = {"mode": "daily", "timezone": "UTC+5:30", "settings": {"dailyTime": "09:00"}}
+    db.commit()
+    assert user.schedule_daily_minute_utc == 210
+    assert utc_offset(user).total_seconds() == 330 * 60
+
+    monkeypatch.setattr(scheduler, "datetime", _frozen_now(datetime(2026, 10, 19, 3, 30, tzinfo=timezone.utc)))
+    assert scheduler.should_user_post_now(user)
+
+    monkeypatch.setattr(scheduler, "datetime", _frozen_now(datetime(2026, 10, 19, 4, 0, tzinfo=timezone.utc)))
+    assert not scheduler.should_user_post_now(user)
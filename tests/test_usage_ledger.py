@@ -0,0 +1,117 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models.usage import TokenUsageLedger
+from app.models.subscription import Subscription
+from app.services.usage_ledger import PLAN_MONTHLY_TOKENS, QuotaExceededError, UsageLedger, plan_tier
+
+USAGE = {"prompt_tokens": 10, "completion_tokens": 5}
+
+def test_flush_writes_one_row_per_user_feature_and_day(db, user):
+    ledger = UsageLedger()
+    ledger.record(user.id, "post_generation", USAGE)
+    ledger.record(user.id, "post_generation", USAGE)
+
+    assert ledger.flush() == 1
+    row = db.query(TokenUsageLedger).one()
+    assert (row.requests, row.prompt_tokens, row.completion_tokens) == (2, 20, 10)
+
+def test_invalid_row_is_dropped_without_blocking_the_rest(db, user):
+    ledger = UsageLedger()
+    ledger.record(user.id, "post_generation", USAGE)
+    # feature is NOT NULL: this row can never be written
+    ledger.record(user.id, None, USAGE)
+
+    assert ledger.flush() == 1
+    assert ledger.stats()["pending_keys"] == 0
+    assert ledger.stats()["dropped"] == 1
+    assert db.query(TokenUsageLedger).count() == 1
+
+def test_threshold_flushes_run_on_one_background_thread(db, user):
+    ledger = UsageLedger(flush_threshold=1)
+    flushers = set()
+    for feature in ("post_generation", "content_post", "content_comment"):
+        ledger.record(user.id, feature, USAGE)
+        flushers.add(ledger._thread)
+        deadline = time.monotonic() + 5
+        while db.query(TokenUsageLedger).filter_by(feature=feature).count() == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    assert len(flushers) == 1
+    assert db.query(TokenUsageLedger).count() == 3
+    assert ledger.stats()["pending_keys"] == 0
+
+def test_requeued_backlog_is_capped():
+    ledger = UsageLedger(max_pending=2)
+    today = datetime.now(timezone.utc).date()
+    ledger._requeue([
+        ((user_id, "post_generation", today), {"requests": 1, "prompt_tokens": 1, "completion_tokens": 1})
+        for user_id in (1, 2, 3)
+    ])
+
+    assert ledger.stats()["pending_keys"] == 2
+    assert ledger.stats()["dropped"] == 1
+
+def test_quota_sees_usage_written_by_other_workers(db, user):
+    ledger = UsageLedger(monthly_ttl=0)
+    ledger.check_quota(user)
+
+    db.add(TokenUsageLedger(
+        user_id=user.id, feature="post_generation", day=datetime.now(timezone.utc).date(),
+        requests=1, prompt_tokens=PLAN_MONTHLY_TOKENS["free"], completion_tokens=0
+    ))
+    db.commit()
+
+    with pytest.raises(QuotaExceededError) as error:
+        ledger.check_quota(user)
+    assert error.value.status_code == 402
+
+def test_plan_comes_from_the_billing_subscription_row(db, user):
+    assert plan_tier(user) == "free"
+
+    # /billing/callback records the payment only as a subscriptions row
+    db.add(Subscription(user_id=user.id, plan="pro", status="active"))
+    db.commit()
+
+    assert plan_tier(user) == "pro"
+    ledger = UsageLedger(monthly_ttl=0)
+    db.add(TokenUsageLedger(
+        user_id=user.id, feature="post_generation", day=datetime.now(timezone.utc).date(),
+        requests=1, prompt_tokens=PLAN_MONTHLY_TOKENS["free"], completion_tokens=0
+    ))
+    db.commit()
+    ledger.check_quota(user)
+
+CONTENT_REQUESTS = [
+    ("/generate/post", {"industry": "Software", "topic": "Hiring"}),
+    ("/generate/comment", {"post_text": "Great post"}),
+]
+
+@pytest.mark.parametrize("path, payload", CONTENT_REQUESTS)
+def test_content_generation_requires_a_signed_in_user(db, path, payload):
+    from app.main import app
+
+    assert TestClient(app).post(path, json=payload).status_code == 401
+
+@pytest.mark.parametrize("path, payload", CONTENT_REQUESTS)
+def test_content_generation_is_charged_to_the_caller(client, user, path, payload):
+    from app.services.usage_ledger import usage_ledger
+
+    usage_ledger._pending.clear()
+    # A user_id in the body is not part of the contract any more and is ignored
+    response = client.post(path, json={"user_id": user.id + 1, **payload})
+
+    assert response.status_code == 200
+    assert {key[0] for key in usage_ledger._pending} == {user.id}
+    usage_ledger._pending.clear()
+
+def test_generation_requires_a_signed_in_user(db):
+    from app.main import app
+
+    payload = {"topic": "Hiring", "industry": "Software", "tone": "Professional", "post_type": "tips"}
+    response = TestClient(app).post("/post-generator/generate-post", json=payload)
+
+    assert response.status_code == 401
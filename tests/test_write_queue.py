@@ -0,0 +1,42 @@
+from concurrent.futures import wait
+
+import pytest
+
+from app.core.write_queue import WriteQueue
+from app.models.user import User
+
+def _add_user(linkedin_id):
+    def write(db):
+        db.add(User(linkedin_id=linkedin_id, email=f"{linkedin_id}@example.com"))
+        return linkedin_id
+    return write
+
+@pytest.fixture
+def queue():
+    write_queue = WriteQueue(max_batch=10, batch_wait=0.05)
+    yield write_queue
+    write_queue.stop()
+
+def test_queued_writes_share_one_transaction(db, queue):
+    futures = [queue.submit(_add_user(f"li-{i}")) for i in range(5)]
+    wait(futures, timeout=5)
+
+    assert [future.result() for future in futures] == [f"li-{i}" for i in range(5)]
+    assert db.query(User).count() == 5
+    stats = queue.stats()
+    assert stats["writes"] == 5
+    assert stats["batches"] < 5
+    assert stats["failed"] == 0
+
+def test_failed_write_is_not_counted_as_committed(db, queue):
+    def broken(db):
+        raise ValueError("bad write")
+
+    futures = [queue.submit(_add_user("li-ok")), queue.submit(broken), queue.submit(_add_user("li-ok-2"))]
+    wait(futures, timeout=5)
+
+    assert isinstance(futures[1].exception(), ValueError)
+    assert db.query(User).count() == 2
+    stats = queue.stats()
+    assert stats["writes"] == 2
+    assert stats["failed"] == 1